@@ -0,0 +1,5 @@
+import sys
+from pathlib import Path
+
+SRC_DIR = Path(__file__).resolve().parent.parent / 'src'
+sys.path.append(str(SRC_DIR))
@@ -0,0 +1,238 @@
+"""Корпус страниц docs.python.org и peps.python.org для бенчмарков.
+
+Разметка повторяет структуру настоящих страниц (Sphinx-тема docs и
+тема peps.python.org), объём страниц близок к реальному. Корпус
+строится детерминированно, поэтому результаты разных запусков
+сравнимы между собой.
+"""
+import random
+from urllib.parse import urljoin
+
+from constants import (
+    DOWNLOADS_URL, EXPECTED_STATUS, MAIN_DOC_URL, PEP_SITE_URL, WHATS_NEW_URL
+)
+
+PEP_COUNT = 700
+WHATS_NEW_VERSIONS = [f'3.{minor}' for minor in range(13, -1, -1)] + [
+    '2.7', '2.6', '2.5', '2.4', '2.3', '2.2', '2.1', '2.0'
+]
+DOC_VERSIONS = (
+    ('3.14', 'in development'), ('3.13', 'stable'), ('3.12', 'stable'),
+    ('3.11', 'security-fixes'), ('3.10', 'security-fixes'),
+    ('3.9', 'security-fixes'), ('3.8', 'EOL'), ('3.7', 'EOL'),
+    ('3.6', 'EOL'), ('3.5', 'EOL'), ('2.7', 'EOL'),
+)
+ARCHIVE_FORMATS = ('pdf-a4', 'pdf-letter', 'html', 'text', 'epub')
+WORDS = (
+    'python interpreter module object function class method attribute '
+    'iterator generator coroutine exception keyword argument annotation '
+    'buffer protocol descriptor decorator metaclass runtime compiler '
+    'bytecode garbage collector reference count thread lock queue'
+).split()
+CARD_PARAGRAPHS = 60
+WHATS_NEW_SECTIONS = 40
+ARCHIVE_SIZE = 4 * 1024 * 1024
+
+
+def words(rng, count):
+    return ' '.join(rng.choice(WORDS) for _ in range(count))
+
+
+def paragraphs(rng, count):
+    return '\n'.join(
+        f'<p>{words(rng, 40)} <code class="docutils literal notranslate">'
+        f'<span class="pre">{rng.choice(WORDS)}()</span></code> '
+        f'<a class="reference internal" href="#{rng.choice(WORDS)}">'
+        f'{words(rng, 3)}</a> {words(rng, 30)}</p>'
+        for _ in range(count)
+    )
+
+
+def page(title, body, sidebar=''):
+    return (
+        '<!DOCTYPE html>\n<html lang="en"><head><meta charset="utf-8"/>'
+        f'<title>{title}</title>'
+        + '<link rel="stylesheet" href="_static/pydoctheme.css"/>' * 10
+        + '</head><body><div class="related" role="navigation"><ul>'
+        + ''.join(f'<li><a href="#{n}">{n}</a></li>' for n in range(20))
+        + '</ul></div><div class="document"><div class="body">'
+        f'{body}</div></div><div class="sphinxsidebar">'
+        f'<div class="sphinxsidebarwrapper">{sidebar}</div></div>'
+        '<div class="footer">&copy; Python Software Foundation</div>'
+        '</body></html>'
+    )
+
+
+def pep_status(number):
+    abbrs = sorted(EXPECTED_STATUS)
+    abbr = abbrs[number % len(abbrs)]
+    return abbr, EXPECTED_STATUS[abbr][number % len(EXPECTED_STATUS[abbr])]
+
+
+def pep_href(number):
+    return f'pep-{number:04d}/'
+
+
+def pep_index_page(pep_count=PEP_COUNT):
+    rng = random.Random(0)
+    rows = ''.join(
+        '<tr class="row-odd">'
+        f'<td><abbr title="Standards Track">S</abbr>'
+        f'<abbr title="{pep_status(number)[1]}">{pep_status(number)[0]}'
+        '</abbr></td>'
+        f'<td><a class="pep reference internal" href="{pep_href(number)}">'
+        f'{number}</a></td>'
+        f'<td><a class="pep reference internal" href="{pep_href(number)}">'
+        f'{words(rng, 6).title()}</a></td>'
+        f'<td>{words(rng, 2).title()}</td></tr>\n'
+        for number in range(1, pep_count + 1)
+    )
+    table = (
+        '<table class="pep-zero-table docutils align-default"><thead><tr>'
+        '<th>Type/Status</th><th>PEP</th><th>Title</th><th>Authors</th>'
+        f'</tr></thead><tbody>{rows}</tbody></table>'
+    )
+    return page('PEP 0', (
+        '<section id="introduction"><h1>Index of PEPs</h1>'
+        f'{paragraphs(rng, 5)}</section>'
+        f'<section id="index-by-category">{table}</section>'
+        f'<section id="numerical-index"><h2>Numerical Index</h2>{table}'
+        '</section>'
+    ))
+
+
+def pep_card_page(number):
+    rng = random.Random(number)
+    _, status = pep_status(number)
+    fields = (
+        ('Author', words(rng, 2).title()),
+        ('Discussions-To', 'https://discuss.python.org/'),
+        ('Status', f'<abbr title="{status}">{status}</abbr>'),
+        ('Type', '<abbr title="Standards Track">Standards Track</abbr>'),
+        ('Created', '01-Jan-2020'),
+        ('Python-Version', '3.12'),
+        ('Post-History', ', '.join(['01-Feb-2020'] * 5)),
+    )
+    header = ''.join(
+        f'<dt class="field-odd">{name}<span class="colon">:</span></dt>\n'
+        f'<dd class="field-odd">{value}</dd>\n'
+        for name, value in fields
+    )
+    return page(f'PEP {number}', (
+        f'<section id="pep-page-section"><h1 class="page-title">PEP {number}'
+        f' – {words(rng, 5).title()}</h1>'
+        f'<dl class="rfc2822 field-list simple">\n{header}</dl>'
+        f'<section id="abstract"><h2>Abstract</h2>'
+        f'{paragraphs(rng, CARD_PARAGRAPHS)}</section></section>'
+    ))
+
+
+def whats_new_index_page():
+    items = ''.join(
+        f'<li class="toctree-l1"><a class="reference internal" '
+        f'href="{version}.html">What’s New in Python {version}</a></li>'
+        for version in WHATS_NEW_VERSIONS
+    )
+    return page('What’s New in Python', (
+        '<section id="what-s-new-in-python"><h1>What’s New in Python</h1>'
+        f'<div class="toctree-wrapper compound"><ul>{items}'
+        '<li class="toctree-l1"><a class="reference internal" '
+        'href="changelog.html">Changelog</a></li></ul></div></section>'
+    ))
+
+
+def whats_new_page(version):
+    rng = random.Random(version)
+    sections = ''.join(
+        f'<section id="section-{number}"><h2>{words(rng, 4).title()}</h2>'
+        f'{paragraphs(rng, 6)}<dl class="py function"><dt>{words(rng, 1)}'
+        f'</dt><dd>{words(rng, 20)}</dd></dl></section>'
+        for number in range(WHATS_NEW_SECTIONS)
+    )
+    return page(f'What’s New In Python {version}', (
+        f'<section id="what-s-new-in-python-{version}">'
+        f'<h1>What’s New In Python {version}<a class="headerlink" '
+        'href="#">¶</a></h1><dl class="field-list simple">\n'
+        '<dt class="field-odd">Editor<span class="colon">:</span></dt>\n'
+        f'<dd class="field-odd"><p>{words(rng, 2).title()}</p>\n</dd>\n'
+        f'</dl>{sections}</section>'
+    ))
+
+
+def docs_sidebar():
+    versions = ''.join(
+        f'<li><a href="https://docs.python.org/{version}/">'
+        f'Python {version} ({status})</a></li>'
+        for version, status in DOC_VERSIONS
+    )
+    return (
+        '<h3>Download</h3><p><a href="download.html">Download these '
+        'documents</a></p><h3>Docs by version</h3>'
+        f'<ul>{versions}<li><a href="https://www.python.org/doc/versions/">'
+        'All versions</a></li></ul><h3>Other resources</h3><ul>'
+        + '<li><a href="https://peps.python.org/">PEP Index</a></li>' * 8
+        + '</ul>'
+    )
+
+
+def docs_main_page():
+    rng = random.Random('main')
+    return page(
+        'Python documentation', paragraphs(rng, 30), docs_sidebar()
+    )
+
+
+def downloads_page():
+    rng = random.Random('downloads')
+    links = ''.join(
+        f'<tr><td>{archive_format}</td><td><a href="archives/python-3.13-'
+        f'docs-{archive_format}.zip">Download</a> (ca. 17 MiB)</td></tr>'
+        for archive_format in ARCHIVE_FORMATS
+    )
+    return page('Download', (
+        f'<section id="download"><h1>Download</h1>{paragraphs(rng, 5)}'
+        f'<table class="docutils">{links}</table></section>'
+    ), docs_sidebar())
+
+
+def archive_url(archive_format='pdf-a4'):
+    return urljoin(
+        DOWNLOADS_URL, f'archives/python-3.13-docs-{archive_format}.zip'
+    )
+
+
+def archive(size=ARCHIVE_SIZE):
+    return random.Random('archive').randbytes(size)
+
+
+def pep_links(pep_count=PEP_COUNT):
+    return [
+        urljoin(PEP_SITE_URL, pep_href(number))
+        for number in range(1, pep_count + 1)
+    ]
+
+
+def whats_new_links():
+    return [
+        urljoin(WHATS_NEW_URL, f'{version}.html')
+        for version in WHATS_NEW_VERSIONS
+    ]
+
+
+def build_corpus(pep_count=PEP_COUNT):
+    """Возвращает словарь {URL: HTML} для всех режимов парсера."""
+    corpus = {
+        MAIN_DOC_URL: docs_main_page(),
+        DOWNLOADS_URL: downloads_page(),
+        WHATS_NEW_URL: whats_new_index_page(),
+        PEP_SITE_URL: pep_index_page(pep_count),
+    }
+    corpus.update(
+        (url, whats_new_page(version))
+        for url, version in zip(whats_new_links(), WHATS_NEW_VERSIONS)
+    )
+    corpus.update(
+        (url, pep_card_page(number))
+        for number, url in enumerate(pep_links(pep_count), 1)
+    )
+    return corpus
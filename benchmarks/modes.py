@@ -0,0 +1,370 @@
+"""Пропускная способность, задержка страниц и пик памяти режимов парсера.
+
+Запуск из корня проекта:
+
+    python -m benchmarks.modes
+    python -m benchmarks.modes -m pep --latency 50 --bandwidth 2048
+    python -m benchmarks.modes --save-baseline
+
+Страницы корпуса benchmarks.corpus отдаёт локальный HTTP-сервер в
+отдельном процессе с заданной задержкой ответа и пропускной способностью
+соединения, сеть не используется. Сессия собирается configure_session,
+как при запуске парсера: планировщик запросов, кеш ответов с бюджетом и
+сжатием и кеш результатов разбора. Каждый прогон начинается с пустых
+кешей. Результаты сравниваются с сохранённым benchmarks/baseline.json,
+при регрессии больше допуска или другом стенде (задержка, скорость,
+потоки, размер корпуса) команда завершается с кодом 1.
+"""
+import argparse
+import json
+import statistics
+import sys
+import tempfile
+import time
+import tracemalloc
+from collections import deque
+from contextlib import contextmanager
+from functools import partial
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from multiprocessing import Process, Queue
+from pathlib import Path
+
+from requests.adapters import DEFAULT_POOLSIZE
+
+import configs
+import main
+from constants import CACHE_NAME
+from profiling import PROFILER, STAGE_PAGE
+from transport import TransportAdapter
+
+from benchmarks.corpus import archive, archive_url, build_corpus
+
+BASELINE_PATH = Path(__file__).parent / 'baseline.json'
+MODES = ('whats-new', 'latest-versions', 'download', 'pep')
+DEFAULT_LATENCY = 20
+DEFAULT_BANDWIDTH = 10 * 1024
+DEFAULT_REPEAT = 5
+DEFAULT_WORKERS = 8
+DEFAULT_PEP_COUNT = 300
+DEFAULT_TOLERANCE = 0.3
+WRITE_CHUNK_SIZE = 16 * 1024
+HEADER = (
+    'Режим', 'Страниц', 'Страниц/с', 'p50, мс', 'p99, мс', 'Пик памяти, КБ'
+)
+# Для пропускной способности регрессия - падение, для остальных - рост.
+METRICS = (
+    ('throughput', -1), ('p50_ms', 1), ('p99_ms', 1), ('peak_kb', 1)
+)
+REGRESSION = '{mode}: {metric} {value:.2f} против {baseline:.2f} в базе'
+BASELINE_SAVED = 'Базовые результаты сохранены в файл: {path}'
+BASELINE_MISSING = 'Нет сохранённых базовых результатов: {path}'
+BASELINE_MISMATCH = (
+    'Базовые результаты сняты с другими параметрами стенда: {settings}'
+)
+NO_REGRESSIONS = 'Регрессий нет.'
+
+
+class StandInHandler(BaseHTTPRequestHandler):
+    """Отдаёт страницу по пути /<хост>/<путь> с задержкой и ограничением
+    скорости записи в соединение."""
+
+    protocol_version = 'HTTP/1.1'
+    disable_nagle_algorithm = True
+
+    def __init__(self, pages, latency, bandwidth, *args, **kwargs):
+        self.pages = pages
+        self.latency = latency
+        self.bandwidth = bandwidth
+        super().__init__(*args, **kwargs)
+
+    def do_GET(self):
+        time.sleep(self.latency)
+        body = self.pages.get(self.path)
+        if body is None:
+            self.send_error(404)
+            return
+        self.send_response(200)
+        self.send_header('Content-Type', 'text/html; charset=utf-8')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        for start in range(0, len(body), WRITE_CHUNK_SIZE):
+            chunk = body[start:start + WRITE_CHUNK_SIZE]
+            self.wfile.write(chunk)
+            if self.bandwidth:
+                time.sleep(len(chunk) / self.bandwidth)
+
+    def log_message(self, *args):
+        pass
+
+
+class StandInServer(ThreadingHTTPServer):
+    request_queue_size = 128
+    daemon_threads = True
+
+
+def stand_in_path(url):
+    return '/' + url.split('://', 1)[1]
+
+
+def serve_corpus(pep_count, latency, bandwidth, addresses):
+    pages = {
+        stand_in_path(url): text.encode('utf-8')
+        for url, text in build_corpus(pep_count).items()
+    }
+    pages[stand_in_path(archive_url())] = archive()
+    server = StandInServer(
+        ('127.0.0.1', 0),
+        partial(StandInHandler, pages, latency, bandwidth)
+    )
+    addresses.put(server.server_address)
+    server.serve_forever()
+
+
+@contextmanager
+def stand_in(pep_count, latency, bandwidth):
+    """Запускает сервер в отдельном процессе, чтобы его потоки не делили
+    GIL и память с измеряемым парсером. Отдаёт адрес сервера."""
+    addresses = Queue()
+    process = Process(
+        target=serve_corpus,
+        args=(pep_count, latency, bandwidth, addresses),
+        daemon=True
+    )
+    process.start()
+    try:
+        host, port = addresses.get()
+        yield f'http://{host}:{port}/'
+    finally:
+        process.terminate()
+        process.join()
+
+
+class StandInAdapter(TransportAdapter):
+    """Перенаправляет соединения сессии на локальный сервер корпуса.
+
+    Кеш, планировщик запросов и ответы видят исходные адреса
+    docs.python.org и peps.python.org.
+    """
+
+    def __init__(self, stand_in_url, **kwargs):
+        self.stand_in_url = stand_in_url
+        super().__init__(**kwargs)
+
+    def get_connection_with_tls_context(self, request, *args, **kwargs):
+        stand_in_request = request.copy()
+        stand_in_request.url = self.stand_in_url + stand_in_path(
+            request.url
+        )[1:]
+        return super().get_connection_with_tls_context(
+            stand_in_request, *args, **kwargs
+        )
+
+    def request_url(self, request, proxies):
+        return stand_in_path(request.url)
+
+
+def make_session(stand_in_url, cli_args, cache_dir):
+    """Сессия парсера из configure_session с тем же кешем ответов и
+    планировщиком, запросы которой уходят на локальный сервер."""
+    session = configs.configure_session(
+        cli_args, cache_name=str(Path(cache_dir) / CACHE_NAME)
+    )
+    adapter = StandInAdapter(
+        stand_in_url,
+        pool_size=max(cli_args.workers, DEFAULT_POOLSIZE),
+        scheduler=session.get_adapter('https://').scheduler
+    )
+    for prefix in ('http://', 'https://'):
+        session.mount(prefix, adapter)
+    return session
+
+
+def page_latencies(events):
+    """Время обработки каждой страницы по событиям профилировщика.
+
+    В режимах с fetch_pages это этап страницы целиком, для страниц,
+    разобранных вне fetch_pages, - сумма их этапов.
+    """
+    pages = {}
+    latencies = {}
+    for event in events:
+        if event['name'] == STAGE_PAGE:
+            pages[event['url']] = event['duration']
+        else:
+            latencies[event['url']] = (
+                latencies.get(event['url'], 0) + event['duration']
+            )
+    latencies.update(pages)
+    return list(latencies.values())
+
+
+def run_mode(mode, stand_in_url, workers):
+    """Прогон режима на пустом кеше: (время, задержки страниц)."""
+    cli_args = configs.configure_argument_parser(
+        main.MODE_TO_FUNCTION.keys()
+    ).parse_args([mode, '--workers', str(workers)])
+    base_dir = main.BASE_DIR
+    with tempfile.TemporaryDirectory() as temp_dir:
+        main.BASE_DIR = Path(temp_dir)
+        session = make_session(stand_in_url, cli_args, temp_dir)
+        PROFILER.start()
+        try:
+            started = time.perf_counter()
+            results = main.MODE_TO_FUNCTION[mode](session, cli_args)
+            if results is not None:
+                deque(results, maxlen=0)
+            elapsed = time.perf_counter() - started
+        finally:
+            PROFILER.enabled = False
+            main.BASE_DIR = base_dir
+            session.close()
+    return elapsed, page_latencies(PROFILER.events)
+
+
+def measure_peak(mode, stand_in_url, workers):
+    tracemalloc.start()
+    try:
+        run_mode(mode, stand_in_url, workers)
+        return tracemalloc.get_traced_memory()[1] / 1024
+    finally:
+        tracemalloc.stop()
+
+
+def percentile(values, percent):
+    if len(values) < 2:
+        return values[0]
+    return statistics.quantiles(values, n=100, method='inclusive')[
+        percent - 1
+    ]
+
+
+def measure(mode, stand_in_url, workers, repeat):
+    """Медианы по прогонам: перцентили отдельного прогона шумят меньше,
+    чем перцентили по всем страницам всех прогонов вместе."""
+    runs = [run_mode(mode, stand_in_url, workers) for _ in range(repeat)]
+    pages = len(runs[0][1])
+    return {
+        'pages': pages,
+        'throughput': pages / statistics.median(
+            elapsed for elapsed, _ in runs
+        ),
+        'p50_ms': statistics.median(
+            percentile(latencies, 50) for _, latencies in runs
+        ) * 1000,
+        'p99_ms': statistics.median(
+            percentile(latencies, 99) for _, latencies in runs
+        ) * 1000,
+        'peak_kb': measure_peak(mode, stand_in_url, workers),
+    }
+
+
+def run(settings, repeat, modes=MODES):
+    with stand_in(
+        settings['pep_count'],
+        settings['latency'] / 1000,
+        settings['bandwidth'] * 1024
+    ) as stand_in_url:
+        return {
+            mode: measure(mode, stand_in_url, settings['workers'], repeat)
+            for mode in modes
+        }
+
+
+def find_regressions(results, baseline, tolerance):
+    regressions = []
+    for mode, metrics in results.items():
+        if mode not in baseline:
+            continue
+        for metric, direction in METRICS:
+            value, expected = metrics[metric], baseline[mode][metric]
+            if (value - expected) * direction > expected * tolerance:
+                regressions.append(REGRESSION.format(
+                    mode=mode, metric=metric, value=value, baseline=expected
+                ))
+    return regressions
+
+
+def format_rows(results):
+    yield HEADER
+    for mode, metrics in results.items():
+        yield (
+            mode,
+            metrics['pages'],
+            f'{metrics["throughput"]:.1f}',
+            f'{metrics["p50_ms"]:.1f}',
+            f'{metrics["p99_ms"]:.1f}',
+            f'{metrics["peak_kb"]:.0f}',
+        )
+
+
+def configure_argument_parser():
+    parser = argparse.ArgumentParser(description='Бенчмарк режимов парсера')
+    parser.add_argument(
+        '-m', '--mode', dest='modes', action='append', choices=MODES,
+        help='Режим для замера, можно повторять; по умолчанию все'
+    )
+    parser.add_argument(
+        '--latency', type=float, default=DEFAULT_LATENCY,
+        help='Задержка ответа сервера, мс'
+    )
+    parser.add_argument(
+        '--bandwidth', type=int, default=DEFAULT_BANDWIDTH,
+        help='Скорость одного соединения, КБ/с, 0 - без ограничения'
+    )
+    parser.add_argument(
+        '--workers', type=int, default=DEFAULT_WORKERS,
+        help='Количество параллельных загрузок страниц'
+    )
+    parser.add_argument(
+        '--peps', type=int, default=DEFAULT_PEP_COUNT,
+        help='Количество карточек PEP в корпусе'
+    )
+    parser.add_argument(
+        '--repeat', type=int, default=DEFAULT_REPEAT,
+        help='Количество прогонов каждого режима'
+    )
+    parser.add_argument(
+        '--tolerance', type=float, default=DEFAULT_TOLERANCE,
+        help='Допустимое отклонение от базовых результатов, доля'
+    )
+    parser.add_argument(
+        '--save-baseline', action='store_true',
+        help='Сохранить результаты как базовые'
+    )
+    return parser
+
+
+def main_benchmark():
+    args = configure_argument_parser().parse_args()
+    settings = dict(
+        latency=args.latency, bandwidth=args.bandwidth,
+        workers=args.workers, pep_count=args.peps
+    )
+    results = run(settings, args.repeat, args.modes or MODES)
+    for row in format_rows(results):
+        print('{:<17}{:>9}{:>11}{:>10}{:>10}{:>16}'.format(*row))
+    if args.save_baseline:
+        BASELINE_PATH.write_text(json.dumps(
+            {'settings': settings, 'results': results}, indent=2
+        ), encoding='utf-8')
+        print(BASELINE_SAVED.format(path=BASELINE_PATH))
+        return 0
+    if not BASELINE_PATH.exists():
+        print(BASELINE_MISSING.format(path=BASELINE_PATH))
+        return 0
+    baseline = json.loads(BASELINE_PATH.read_text(encoding='utf-8'))
+    if baseline['settings'] != settings:
+        print(BASELINE_MISMATCH.format(settings=baseline['settings']))
+        return 1
+    regressions = find_regressions(
+        results, baseline['results'], args.tolerance
+    )
+    for regression in regressions:
+        print(regression)
+    if not regressions:
+        print(NO_REGRESSIONS)
+    return 1 if regressions else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main_benchmark())
@@ -0,0 +1,124 @@
+"""Время разбора и пик памяти на страницу для каждого режима парсера.
+
+Запуск из корня проекта:
+
+    python -m benchmarks.parsing
+
+Страницы отдаются из корпуса benchmarks.corpus через requests_mock,
+сеть не используется. Вариант "full" воспроизводит разбор всей страницы
+в BeautifulSoup, "strainer" - частичный разбор через SoupStrainer,
+"lxml" - извлечение напрямую из дерева lxml.
+"""
+import statistics
+import time
+import tracemalloc
+
+import requests
+import requests_mock
+
+import main
+from constants import DOWNLOADS_URL, MAIN_DOC_URL, PEP_SITE_URL, WHATS_NEW_URL
+from utils import cook_soup, get_text
+
+from benchmarks.corpus import build_corpus, pep_links, whats_new_links
+
+PAGES_PER_CASE = 20
+REPEAT = 3
+BENCHMARK_PEP_COUNT = 100
+HEADER = ('Режим', 'Вариант', 'мс/страница', 'Пик памяти, КБ')
+
+
+def mocked_session(corpus):
+    adapter = requests_mock.Adapter()
+    for url, text in corpus.items():
+        adapter.register_uri('GET', url, text=text)
+    session = requests.Session()
+    session.mount('https://', adapter)
+    return session
+
+
+def full_pep_card_status(session, url):
+    return cook_soup(session, url).find(
+        lambda tag: tag.name == 'dt' and 'Status' in tag.text
+    ).next_sibling.next_sibling.text
+
+
+def full_whats_new_row(session, url):
+    soup = cook_soup(session, url)
+    return url, soup.find('h1').text, soup.find('dl').text
+
+
+def full_page(session, url):
+    return cook_soup(session, url)
+
+
+def strained_page(strainer_name):
+    strainer = main.get_strainer(strainer_name)
+
+    def extract(session, url):
+        return cook_soup(session, url, parse_only=strainer)
+    return extract
+
+
+def parsed_page(parse):
+    def extract(session, url):
+        return parse(get_text(session, url))
+    return extract
+
+
+def cases():
+    peps = pep_links(BENCHMARK_PEP_COUNT)[:PAGES_PER_CASE]
+    whats_new_pages = whats_new_links()[:PAGES_PER_CASE]
+    return (
+        ('pep', 'full', full_pep_card_status, peps),
+        ('pep', 'strainer', parsed_page(main.parse_pep_card_status), peps),
+        ('pep', 'lxml',
+         parsed_page(main.parse_pep_card_status_lxml), peps),
+        ('pep index', 'full', full_page, [PEP_SITE_URL]),
+        ('pep index', 'strainer',
+         strained_page(main.PEP_INDEX_STRAINER), [PEP_SITE_URL]),
+        ('whats-new', 'full', full_whats_new_row, whats_new_pages),
+        ('whats-new', 'strainer',
+         parsed_page(main.parse_whats_new_page), whats_new_pages),
+        ('whats-new', 'lxml',
+         parsed_page(main.parse_whats_new_page_lxml), whats_new_pages),
+        ('latest-versions', 'full', full_page, [MAIN_DOC_URL]),
+        ('latest-versions', 'strainer',
+         strained_page(main.SIDEBAR_STRAINER), [MAIN_DOC_URL]),
+        ('download', 'full', full_page, [DOWNLOADS_URL]),
+        ('download', 'strainer',
+         strained_page(main.DOWNLOADS_STRAINER), [DOWNLOADS_URL]),
+        ('whats-new index', 'full', full_page, [WHATS_NEW_URL]),
+        ('whats-new index', 'strainer',
+         strained_page(main.WHATS_NEW_INDEX_STRAINER), [WHATS_NEW_URL]),
+    )
+
+
+def measure(session, extract, urls):
+    timings = []
+    for _ in range(REPEAT):
+        for url in urls:
+            started = time.perf_counter()
+            extract(session, url)
+            timings.append(time.perf_counter() - started)
+    peaks = []
+    for url in urls:
+        tracemalloc.start()
+        extract(session, url)
+        peaks.append(tracemalloc.get_traced_memory()[1])
+        tracemalloc.stop()
+    return statistics.median(timings) * 1000, max(peaks) / 1024
+
+
+def run():
+    session = mocked_session(build_corpus(BENCHMARK_PEP_COUNT))
+    results = [HEADER]
+    for mode, variant, extract, urls in cases():
+        milliseconds, peak = measure(session, extract, urls)
+        results.append((mode, variant, f'{milliseconds:.2f}', f'{peak:.0f}'))
+    return results
+
+
+if __name__ == '__main__':
+    for row in run():
+        print('{:<18}{:<10}{:>14}{:>16}'.format(*row))
@@ -0,0 +1,74 @@
+"""Стоимость извлечения статуса из одной карточки PEP.
+
+Запуск из корня проекта:
+
+    python -m benchmarks.pep_card
+
+Сравниваются исходный поиск лямбдой по всему дереву BeautifulSoup,
+разбор всей страницы с SoupStrainer и текущие извлекатели main, которые
+разбирают только список полей dl.rfc2822 из начала карточки.
+"""
+import statistics
+import time
+
+from bs4 import BeautifulSoup
+
+import main
+
+from benchmarks.corpus import pep_card_page
+
+CARDS = 50
+REPEAT = 5
+HEADER = ('Вариант', 'мкс/карточка', 'Ускорение')
+
+
+def lambda_status(text):
+    return BeautifulSoup(text, 'lxml').find(
+        lambda tag: tag.name == 'dt' and 'Status' in tag.text
+    ).next_sibling.next_sibling.text
+
+
+def strainer_status(text):
+    return BeautifulSoup(
+        text, 'lxml', parse_only=main.PEP_CARD_STRAINER
+    ).find(
+        lambda tag: tag.name == 'dt' and 'Status' in tag.text
+    ).next_sibling.next_sibling.text
+
+
+CASES = (
+    ('lambda, всё дерево', lambda_status),
+    ('SoupStrainer', strainer_status),
+    ('bs4, заголовок', main.parse_pep_card_status),
+    ('lxml, заголовок', main.parse_pep_card_status_lxml),
+)
+
+
+def measure(extract, texts):
+    timings = []
+    for _ in range(REPEAT):
+        started = time.perf_counter()
+        for text in texts:
+            extract(text)
+        timings.append((time.perf_counter() - started) / len(texts))
+    return statistics.median(timings) * 10 ** 6
+
+
+def run():
+    texts = [pep_card_page(number) for number in range(1, CARDS + 1)]
+    expected = [lambda_status(text) for text in texts]
+    results = [HEADER]
+    baseline = None
+    for name, extract in CASES:
+        assert [extract(text) for text in texts] == expected, name
+        microseconds = measure(extract, texts)
+        baseline = baseline or microseconds
+        results.append(
+            (name, f'{microseconds:.0f}', f'{baseline / microseconds:.1f}x')
+        )
+    return results
+
+
+if __name__ == '__main__':
+    for row in run():
+        print('{:<22}{:>14}{:>12}'.format(*row))
@@ -0,0 +1,92 @@
+"""Время импорта main.py по python -X importtime.
+
+Запуск из корня проекта:
+
+    python -m benchmarks.startup
+    python -m benchmarks.startup --top 20 --budget 250
+
+Импорт выполняется в отдельном интерпретаторе REPEAT раз, берётся
+медиана совокупного времени модуля main. Команда завершается с кодом 1,
+если оно превышает бюджет или при импорте загрузились модули, которые
+режимы должны загружать сами, только когда они нужны.
+"""
+import argparse
+import re
+import statistics
+import subprocess
+import sys
+
+from benchmarks import SRC_DIR
+
+STARTUP_BUDGET_MS = 300
+REPEAT = 3
+DEFAULT_TOP = 10
+# Загружаются режимами по мере надобности: кеш ответов - при создании
+# сессии, bs4 и lxml - при первом разборе страницы, форматы - выбранным
+# --output, tqdm - только в терминале.
+LAZY_MODULES = (
+    'aiohttp', 'bs4', 'lxml', 'prettytable', 'pyarrow', 'redis',
+    'requests_cache', 'tqdm', 'zstandard'
+)
+IMPORT_LINE = re.compile(r'import time:\s+\d+ \|\s+(\d+) \| *(\S+)')
+OVER_BUDGET = 'Импорт main: {elapsed:.0f} мс при бюджете {budget} мс'
+EAGER_MODULES = 'Импорт main загружает модули: {modules}'
+WITHIN_BUDGET = 'Импорт main: {elapsed:.0f} мс, бюджет {budget} мс'
+
+
+def measure_imports(statement='import main'):
+    """Совокупное время импорта каждого загруженного модуля, мс."""
+    completed = subprocess.run(
+        [sys.executable, '-X', 'importtime', '-c', statement],
+        cwd=SRC_DIR, capture_output=True, text=True, check=True
+    )
+    timings = {}
+    for line in completed.stderr.splitlines():
+        match = IMPORT_LINE.match(line)
+        if match is not None:
+            cumulative, module = match.groups()
+            timings[module] = int(cumulative) / 1000
+    return timings
+
+
+def find_eager_modules(timings):
+    return sorted({
+        module.split('.')[0] for module in timings
+        if module.split('.')[0] in LAZY_MODULES
+    })
+
+
+def configure_argument_parser():
+    parser = argparse.ArgumentParser(description='Время импорта main.py')
+    parser.add_argument(
+        '--budget', type=float, default=STARTUP_BUDGET_MS,
+        help='Допустимое время импорта main, мс'
+    )
+    parser.add_argument(
+        '--top', type=int, default=DEFAULT_TOP,
+        help='Количество самых долгих импортов в отчёте'
+    )
+    return parser
+
+
+def main_benchmark():
+    args = configure_argument_parser().parse_args()
+    runs = [measure_imports() for _ in range(REPEAT)]
+    elapsed = statistics.median(timings['main'] for timings in runs)
+    for module, milliseconds in sorted(
+        runs[-1].items(), key=lambda item: item[1], reverse=True
+    )[:args.top]:
+        print('{:<40}{:>10.1f}'.format(module, milliseconds))
+    eager_modules = find_eager_modules(runs[-1])
+    if eager_modules:
+        print(EAGER_MODULES.format(modules=', '.join(eager_modules)))
+    if elapsed > args.budget:
+        print(OVER_BUDGET.format(elapsed=elapsed, budget=args.budget))
+    if eager_modules or elapsed > args.budget:
+        return 1
+    print(WITHIN_BUDGET.format(elapsed=elapsed, budget=args.budget))
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main_benchmark())
@@ -0,0 +1,120 @@
+import mmap
+import sqlite3
+import struct
+import zipfile
+import zlib
+from collections import namedtuple
+
+ArchiveMember = namedtuple(
+    'ArchiveMember', 'archive name offset size compressed_size method crc'
+)
+
+CREATE_TABLES = (
+    'CREATE TABLE IF NOT EXISTS archive ('
+    'path TEXT PRIMARY KEY, size INTEGER, mtime INTEGER)',
+    'CREATE TABLE IF NOT EXISTS member ('
+    'archive TEXT, name TEXT, offset INTEGER, size INTEGER, '
+    'compressed_size INTEGER, method INTEGER, crc INTEGER, '
+    'PRIMARY KEY (archive, name))',
+)
+SELECT_ARCHIVE = 'SELECT size, mtime FROM archive WHERE path = ?'
+DELETE_ARCHIVE = (
+    'DELETE FROM archive WHERE path = ?',
+    'DELETE FROM member WHERE archive = ?',
+)
+INSERT_ARCHIVE = 'INSERT INTO archive VALUES (?, ?, ?)'
+INSERT_MEMBER = 'INSERT INTO member VALUES (?, ?, ?, ?, ?, ?, ?)'
+SELECT_MEMBERS = (
+    'SELECT * FROM member WHERE archive = ? AND name GLOB ? ORDER BY name'
+)
+# Локальный заголовок файла zip, длины имени и доп. поля - последние.
+LOCAL_HEADER = struct.Struct('<4s5H3L2H')
+CRC_MISMATCH = 'Неверная контрольная сумма файла {name} в архиве {archive}'
+
+
+def read_members(mapped):
+    """Файлы архива по центральному каталогу и локальным заголовкам.
+
+    Смещение указывает на начало сжатых данных файла.
+    """
+    with zipfile.ZipFile(mapped) as archive:
+        for info in archive.infolist():
+            if info.is_dir():
+                continue
+            header = LOCAL_HEADER.unpack_from(mapped, info.header_offset)
+            yield (
+                info.filename,
+                info.header_offset + LOCAL_HEADER.size + sum(header[-2:]),
+                info.file_size,
+                info.compress_size,
+                info.compress_type,
+                info.CRC,
+            )
+
+
+class ArchiveIndex:
+    """Оглавления zip-архивов в SQLite и чтение отдельных файлов через mmap.
+
+    Оглавление архива перестраивается, только если изменились его размер
+    или время изменения. Файл читается срезом отображения по сохранённому
+    смещению, остальной архив в память не загружается.
+    """
+
+    def __init__(self, path):
+        self.connection = sqlite3.connect(str(path))
+        with self.connection:
+            for statement in CREATE_TABLES:
+                self.connection.execute(statement)
+        self.maps = {}
+
+    def open_archive(self, archive_path):
+        key = str(archive_path.resolve())
+        if key not in self.maps:
+            with open(key, 'rb') as file:
+                self.maps[key] = mmap.mmap(
+                    file.fileno(), 0, access=mmap.ACCESS_READ
+                )
+        stat = archive_path.stat()
+        saved = self.connection.execute(SELECT_ARCHIVE, (key,)).fetchone()
+        if saved != (stat.st_size, stat.st_mtime_ns):
+            self.update(key, stat)
+        return key
+
+    def update(self, key, stat):
+        with self.connection:
+            for statement in DELETE_ARCHIVE:
+                self.connection.execute(statement, (key,))
+            self.connection.execute(
+                INSERT_ARCHIVE, (key, stat.st_size, stat.st_mtime_ns)
+            )
+            self.connection.executemany(INSERT_MEMBER, (
+                (key, *member) for member in read_members(self.maps[key])
+            ))
+
+    def members(self, archive_path, pattern='*'):
+        """Файлы архива, имена которых подходят под шаблон GLOB."""
+        key = self.open_archive(archive_path)
+        return [
+            ArchiveMember(*row)
+            for row in self.connection.execute(SELECT_MEMBERS, (key, pattern))
+        ]
+
+    def read(self, member):
+        """Распакованное содержимое файла с проверкой CRC."""
+        mapped = self.maps[member.archive]
+        if member.method not in (zipfile.ZIP_STORED, zipfile.ZIP_DEFLATED):
+            with zipfile.ZipFile(mapped) as archive:
+                return archive.read(member.name)
+        content = mapped[member.offset:member.offset + member.compressed_size]
+        if member.method == zipfile.ZIP_DEFLATED:
+            content = zlib.decompress(content, -zlib.MAX_WBITS)
+        if zlib.crc32(content) != member.crc:
+            raise zipfile.BadZipFile(CRC_MISMATCH.format(
+                name=member.name, archive=member.archive
+            ))
+        return content
+
+    def close(self):
+        for mapped in self.maps.values():
+            mapped.close()
+        self.connection.close()
@@ -0,0 +1,176 @@
+import asyncio
+import time
+from contextlib import contextmanager
+from io import BytesIO
+from urllib.parse import urlparse
+
+import aiohttp
+from requests import Request
+from requests.adapters import HTTPAdapter
+from requests_cache import (
+    BaseCache, get_expiration_datetime, get_url_expiration
+)
+from urllib3 import HTTPResponse
+from urllib3._collections import HTTPHeaderDict
+
+from constants import CONNECT_TIMEOUT, HOST_CONNECTIONS_LIMIT, READ_TIMEOUT
+from profiling import PROFILER, STAGE_PREFETCH
+from scheduler import THROTTLE_STATUSES
+from transport import get_priority
+
+CONDITIONAL_HEADERS = (
+    ('ETag', 'If-None-Match'),
+    ('Last-Modified', 'If-Modified-Since'),
+)
+
+
+def build_response(request, status, headers, body):
+    raw = HTTPResponse(
+        body=BytesIO(body),
+        headers=headers,
+        status=status,
+        preload_content=False,
+        decode_content=True,
+        request_url=request.url,
+    )
+    response = HTTPAdapter().build_response(request, raw)
+    response.content
+    return response
+
+
+def get_expiration(session, url):
+    expire_after = get_url_expiration(url, session.settings.urls_expire_after)
+    if expire_after is None:
+        expire_after = session.settings.expire_after
+    return get_expiration_datetime(expire_after)
+
+
+def peek_response(session, cache_key):
+    """Ответ из кеша сессии без учёта в статистике кеша.
+
+    Страницу затем прочитает session.get(), и попадание будет учтено
+    там один раз.
+    """
+    return BaseCache.get_response(session.cache, cache_key)
+
+
+def get_stale_requests(session, urls):
+    """Подготовленные запросы для ссылок, которых нет в кеше или они устарели.
+
+    Для устаревших ответов добавляются заголовки условного запроса.
+    """
+    stale_requests = []
+    for url in dict.fromkeys(urls):
+        request = session.prepare_request(Request('GET', url))
+        cache_key = session.cache.create_key(request)
+        cached = peek_response(session, cache_key)
+        if cached is not None and not (
+            cached.is_expired or session.settings.always_revalidate
+        ):
+            continue
+        for header, conditional_header in CONDITIONAL_HEADERS:
+            if cached is not None and header in cached.headers:
+                request.headers[conditional_header] = cached.headers[header]
+        stale_requests.append((request, cache_key, cached))
+    return stale_requests
+
+
+async def fetch(client, session, request, cache_key, cached):
+    """Загружает один запрос и сохраняет ответ в кеше сессии.
+
+    Темп запросов к хосту задаёт тот же Scheduler, что и у
+    TransportAdapter сессии: ожидание очереди идёт в потоке исполнителя,
+    а задержка, 429/503 и Retry-After ответа передаются планировщику.
+    """
+    loop = asyncio.get_running_loop()
+    host = urlparse(request.url).hostname
+    scheduler = getattr(session.get_adapter(request.url), 'scheduler', None)
+    if scheduler is not None:
+        await loop.run_in_executor(
+            None, scheduler.acquire, host, get_priority(request)
+        )
+    started = time.perf_counter()
+    async with client.get(request.url, headers=request.headers) as reply:
+        body = await reply.read()
+        headers = HTTPHeaderDict([
+            (name.decode('latin-1'), value.decode('latin-1'))
+            for name, value in reply.raw_headers
+        ])
+        status = reply.status
+    elapsed = time.perf_counter() - started
+    PROFILER.record(
+        STAGE_PREFETCH, request.url, started, elapsed, status=status
+    )
+    if scheduler is not None:
+        if status in THROTTLE_STATUSES:
+            scheduler.throttled(host, headers.get('Retry-After'))
+        scheduler.observe(host, elapsed, status)
+    if status == 304 and cached is not None:
+        response = cached
+    elif status in session.settings.allowable_codes:
+        response = build_response(request, status, headers, body)
+    else:
+        return
+    await loop.run_in_executor(
+        None,
+        session.cache.save_response,
+        response,
+        cache_key,
+        get_expiration(session, request.url),
+    )
+
+
+async def fetch_all(session, stale_requests, workers, host_limit):
+    connector = aiohttp.TCPConnector(limit=workers, limit_per_host=host_limit)
+    async with aiohttp.ClientSession(
+        connector=connector,
+        timeout=aiohttp.ClientTimeout(
+            sock_connect=CONNECT_TIMEOUT, sock_read=READ_TIMEOUT
+        ),
+        auto_decompress=False
+    ) as client:
+        replies = await asyncio.gather(
+            *(
+                fetch(client, session, *stale_request)
+                for stale_request in stale_requests
+            ),
+            return_exceptions=True
+        )
+    errors = {}
+    for (request, *_), reply in zip(stale_requests, replies):
+        if isinstance(reply, (aiohttp.ClientError, asyncio.TimeoutError)):
+            errors[request.url] = reply
+        elif isinstance(reply, Exception):
+            raise reply
+    return errors
+
+
+def prefetch(session, urls, workers, host_limit=HOST_CONNECTIONS_LIMIT):
+    """Асинхронно загружает urls в кеш сессии requests_cache.
+
+    Свежие записи кеша не запрашиваются, устаревшие перепроверяются
+    условным запросом. Возвращает словарь {url: ошибка подключения}.
+    """
+    stale_requests = get_stale_requests(session, urls)
+    if not stale_requests:
+        return {}
+    return asyncio.run(
+        fetch_all(session, stale_requests, max(workers, 1), host_limit)
+    )
+
+
+@contextmanager
+def prefetched(session, urls, workers, host_limit=HOST_CONNECTIONS_LIMIT):
+    """Загружает urls через prefetch и отдаёт словарь ошибок.
+
+    Внутри блока страницы читаются из кеша обычными session.get(), уже
+    перепроверенные ответы не запрашиваются повторно: always_revalidate
+    сессии на это время отключается и затем восстанавливается.
+    """
+    errors = prefetch(session, urls, workers, host_limit)
+    always_revalidate = session.settings.always_revalidate
+    session.settings.always_revalidate = False
+    try:
+        yield errors
+    finally:
+        session.settings.always_revalidate = always_revalidate
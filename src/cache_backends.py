@@ -0,0 +1,208 @@
+import sqlite3
+import threading
+import time
+import zlib
+from collections import namedtuple
+
+from redis import Redis
+from requests_cache import FileCache, RedisCache, SQLiteCache
+from requests_cache.serializers import (
+    SerializerPipeline, Stage, pickle_serializer
+)
+
+from constants import (
+    CACHE_FILESYSTEM, CACHE_MAX_SIZE, CACHE_REDIS, CACHE_USAGE_SUFFIX,
+    EVICTION_LFU, EVICTION_LRU, REDIS_URL
+)
+
+CacheStats = namedtuple(
+    'CacheStats', 'hits misses size evicted evicted_size'
+)
+
+CREATE_USAGE = (
+    'CREATE TABLE IF NOT EXISTS usage ('
+    'key TEXT PRIMARY KEY, hits INTEGER, used_at REAL)'
+)
+UPSERT_USAGE = (
+    'INSERT INTO usage VALUES (?, ?, ?) ON CONFLICT (key) DO UPDATE SET '
+    'hits = hits + excluded.hits, used_at = excluded.used_at'
+)
+SELECT_USAGE = 'SELECT key, hits, used_at FROM usage'
+DELETE_USAGE = 'DELETE FROM usage WHERE key = ?'
+CLEAR_USAGE = 'DELETE FROM usage'
+# Порядок вытеснения по (попадания, время использования) записи.
+EVICTION_ORDER = {
+    EVICTION_LRU: lambda hits, used_at: used_at,
+    EVICTION_LFU: lambda hits, used_at: (hits, used_at),
+}
+
+
+def decompress(data):
+    """Распаковывает тело записи; записи без сжатия отдаются как есть."""
+    try:
+        return zlib.decompress(data)
+    except zlib.error:
+        return data
+
+
+COMPRESSED_SERIALIZER = SerializerPipeline(
+    [*pickle_serializer.stages, Stage(dumps=zlib.compress, loads=decompress)],
+    name='pickle_zlib',
+    is_binary=True,
+)
+
+
+class CacheUsage:
+    """Попадания и время последнего использования записей кеша ответов.
+
+    Отметки копятся в памяти и пишутся в SQLite при вытеснении.
+    """
+
+    def __init__(self, path):
+        self.connection = sqlite3.connect(str(path), check_same_thread=False)
+        self.connection.execute(CREATE_USAGE)
+        self.lock = threading.Lock()
+        self.pending = {}
+        self.hits = 0
+        self.misses = 0
+
+    def record(self, key, found):
+        with self.lock:
+            if found:
+                self.hits += 1
+            else:
+                self.misses += 1
+            hits, _ = self.pending.get(key, (0, 0))
+            self.pending[key] = (hits + found, time.time())
+
+    def select_evicted(self, sizes, max_size, eviction):
+        """Ключи, которые нужно вытеснить, чтобы уложиться в max_size.
+
+        Записи без отметок (сохранённые до учёта) вытесняются первыми.
+        """
+        with self.lock, self.connection:
+            self.connection.executemany(UPSERT_USAGE, (
+                (key, hits, used_at)
+                for key, (hits, used_at) in self.pending.items()
+            ))
+            self.pending.clear()
+            usage = {
+                key: (hits, used_at)
+                for key, hits, used_at in self.connection.execute(SELECT_USAGE)
+            }
+            order = EVICTION_ORDER[eviction]
+            total = sum(sizes.values())
+            evicted = []
+            for key in sorted(
+                sizes, key=lambda key: order(*usage.get(key, (0, 0)))
+            ):
+                if total <= max_size:
+                    break
+                total -= sizes[key]
+                evicted.append(key)
+            self.connection.executemany(DELETE_USAGE, (
+                (key,) for key in set(usage) - set(sizes) | set(evicted)
+            ))
+        return evicted
+
+    def clear(self):
+        with self.lock, self.connection:
+            self.pending.clear()
+            self.connection.execute(CLEAR_USAGE)
+
+    def close(self):
+        self.connection.close()
+
+
+class BoundedCacheMixin:
+    """Кеш ответов с бюджетом объёма и вытеснением LRU или LFU.
+
+    Подкласс для каждого хранилища определяет get_sizes(): словарь
+    {ключ записи: размер в хранилище, байт}.
+    """
+
+    def __init__(
+        self, *args, usage, max_size=CACHE_MAX_SIZE, eviction=EVICTION_LRU,
+        **kwargs
+    ):
+        super().__init__(*args, **kwargs)
+        self.usage = usage
+        self.max_size = max_size
+        self.eviction = eviction
+
+    def get_response(self, key, default=None):
+        response = super().get_response(key, default)
+        self.usage.record(key, response is not None)
+        return response
+
+    def enforce_budget(self):
+        """Вытесняет записи сверх бюджета, возвращает CacheStats."""
+        sizes = self.get_sizes()
+        evicted = self.usage.select_evicted(
+            sizes, self.max_size, self.eviction
+        )
+        if evicted:
+            self.responses.bulk_delete(evicted)
+        evicted_size = sum(sizes[key] for key in evicted)
+        return CacheStats(
+            self.usage.hits, self.usage.misses,
+            sum(sizes.values()) - evicted_size, len(evicted), evicted_size
+        )
+
+    def clear(self):
+        super().clear()
+        self.usage.clear()
+
+    def close(self):
+        super().close()
+        self.usage.close()
+
+
+class BoundedSQLiteCache(BoundedCacheMixin, SQLiteCache):
+    def get_sizes(self):
+        with self.responses.connection() as connection:
+            return dict(connection.execute(
+                f'SELECT key, length(value) FROM {self.responses.table_name}'
+            ))
+
+
+class BoundedFileCache(BoundedCacheMixin, FileCache):
+    def get_sizes(self):
+        extension = len(self.responses.extension)
+        return {
+            path.name[:len(path.name) - extension]: path.stat().st_size
+            for path in self.responses.paths()
+        }
+
+
+class BoundedRedisCache(BoundedCacheMixin, RedisCache):
+    def get_sizes(self):
+        keys = list(self.responses.keys())
+        pipeline = self.responses.connection.pipeline(transaction=False)
+        for key in keys:
+            pipeline.strlen(self.responses._bkey(key))
+        return dict(zip(keys, pipeline.execute()))
+
+
+def make_cache(
+    backend, cache_name, max_size=CACHE_MAX_SIZE, eviction=EVICTION_LRU,
+    redis_url=REDIS_URL
+):
+    """Хранилище кеша ответов со сжатием тел и бюджетом объёма.
+
+    Отметки использования записей всех хранилищ лежат в локальном
+    файле cache_name + CACHE_USAGE_SUFFIX.
+    """
+    options = dict(
+        usage=CacheUsage(f'{cache_name}{CACHE_USAGE_SUFFIX}'),
+        max_size=max_size,
+        eviction=eviction,
+        serializer=COMPRESSED_SERIALIZER,
+    )
+    if backend == CACHE_REDIS:
+        return BoundedRedisCache(
+            str(cache_name), connection=Redis.from_url(redis_url), **options
+        )
+    if backend == CACHE_FILESYSTEM:
+        return BoundedFileCache(cache_name, **options)
+    return BoundedSQLiteCache(cache_name, wal=True, **options)
@@ -1,11 +1,31 @@
 import argparse
 import logging
 from logging.handlers import RotatingFileHandler
+from pathlib import Path
 
-from constants import CHOICE_FILE, CHOICE_PRETTY, LOG_DIR, LOG_FILE
+from constants import (
+    CACHE_BACKENDS, CACHE_EXPIRE_AFTER, CACHE_MAX_SIZE, CACHE_NAME,
+    CACHE_SQLITE, CACHE_STALE_WHILE_REVALIDATE,
+    CACHE_URLS_EXPIRE_AFTER, CHOICE_ARROW, CHOICE_CSV_GZIP, CHOICE_CSV_ZSTD,
+    CHOICE_FILE, CHOICE_JSONL, CHOICE_PARQUET, CHOICE_PRETTY,
+    DEFAULT_BANDWIDTH, DEFAULT_PROCESSES, DEFAULT_WORKERS, DOWNLOAD_FORMATS,
+    ENGINE_ASYNC, ENGINE_THREADS, EVICTION_LFU, EVICTION_LRU, HOST_RATE,
+    LOG_DIR, LOG_FILE, PARSER_BS4, PARSER_LXML, REDIS_URL, SERVE_HOST,
+    SERVE_PORT, SERVE_REFRESH_INTERVAL, SHARED_LOCKS_DIR_NAME, SNAPSHOT_MODES
+)
 
 LOG_FORMAT = '"%(asctime)s - [%(levelname)s] - %(message)s"'
 DT_FORMAT = '%d.%m.%Y %H:%M:%S'
+FIELD_FILTER_ERROR = 'Фильтр должен иметь вид Поле=Значение: {value}'
+
+
+def parse_field_filter(value):
+    field, separator, field_value = value.partition('=')
+    if not separator or not field.strip():
+        raise argparse.ArgumentTypeError(
+            FIELD_FILTER_ERROR.format(value=value)
+        )
+    return field.strip(), field_value.strip()
 
 
 def configure_argument_parser(available_modes):
@@ -22,12 +42,177 @@ def configure_argument_parser(available_modes):
         action='store_true',
         help='Очистка кеша'
     )
+    parser.add_argument(
+        '-r',
+        '--refresh',
+        action='store_true',
+        help='Проверка актуальности кеша на сервере'
+    )
+    parser.add_argument(
+        '--cache-backend',
+        choices=CACHE_BACKENDS,
+        default=CACHE_SQLITE,
+        help='Хранилище кеша ответов'
+    )
+    parser.add_argument(
+        '--cache-size',
+        type=int,
+        default=CACHE_MAX_SIZE // 2 ** 20,
+        help='Бюджет объёма кеша ответов, МБ'
+    )
+    parser.add_argument(
+        '--cache-eviction',
+        choices=(EVICTION_LRU, EVICTION_LFU),
+        default=EVICTION_LRU,
+        help='Порядок вытеснения записей сверх бюджета кеша'
+    )
+    parser.add_argument(
+        '--redis-url',
+        default=REDIS_URL,
+        help='Адрес redis-совместимого сервера для хранилища redis'
+    )
+    parser.add_argument(
+        '--shared-cache',
+        metavar='КАТАЛОГ',
+        help=(
+            'Общий для нескольких запусков каталог кеша ответов: '
+            'одинаковые одновременные запросы загружаются один раз'
+        )
+    )
     parser.add_argument(
         '-o',
         '--output',
-        choices=(CHOICE_PRETTY, CHOICE_FILE),
+        choices=(
+            CHOICE_PRETTY, CHOICE_FILE, CHOICE_JSONL, CHOICE_CSV_GZIP,
+            CHOICE_CSV_ZSTD, CHOICE_PARQUET, CHOICE_ARROW
+        ),
         help='Дополнительные способы вывода данных'
     )
+    parser.add_argument(
+        '-w',
+        '--workers',
+        type=int,
+        default=DEFAULT_WORKERS,
+        help='Количество параллельных загрузок страниц'
+    )
+    parser.add_argument(
+        '-p',
+        '--processes',
+        type=int,
+        default=DEFAULT_PROCESSES,
+        help='Количество процессов для разбора загруженных страниц'
+    )
+    parser.add_argument(
+        '--rate',
+        type=float,
+        default=HOST_RATE,
+        help=(
+            'Начальная скорость запросов к одному хосту, запросов/с; '
+            'подстраивается под ответы хоста, 0 - без ограничения'
+        )
+    )
+    parser.add_argument(
+        '-e',
+        '--engine',
+        choices=(ENGINE_THREADS, ENGINE_ASYNC),
+        default=ENGINE_THREADS,
+        help='Движок параллельной загрузки страниц'
+    )
+    parser.add_argument(
+        '--parser',
+        choices=(PARSER_BS4, PARSER_LXML),
+        default=PARSER_BS4,
+        help='Движок разбора страниц PEP и What\'s New'
+    )
+    parser.add_argument(
+        '--no-parsed-cache',
+        dest='parsed_cache',
+        action='store_false',
+        help='Разбирать страницы заново, не используя кеш результатов разбора'
+    )
+    parser.add_argument(
+        '-i',
+        '--incremental',
+        action='store_true',
+        help='Разбирать только изменившиеся карточки PEP'
+    )
+    parser.add_argument(
+        '--snapshot',
+        action='store_true',
+        help='Сохранить снимок результатов pep и latest-versions для diff'
+    )
+    parser.add_argument(
+        '--diff-mode',
+        dest='diff_modes',
+        action='append',
+        choices=SNAPSHOT_MODES,
+        help='Режим для diff, можно повторять; по умолчанию все'
+    )
+    parser.add_argument(
+        '-f',
+        '--filter',
+        action='append',
+        type=parse_field_filter,
+        metavar='ПОЛЕ=ЗНАЧЕНИЕ',
+        help='Фильтр pep-search по полю карточки PEP, можно повторять'
+    )
+    parser.add_argument(
+        '-q',
+        '--query',
+        help='Полнотекстовый запрос pep-search (синтаксис SQLite FTS5)'
+    )
+    parser.add_argument(
+        '--format',
+        dest='formats',
+        action='append',
+        choices=DOWNLOAD_FORMATS,
+        help='Формат архива download, можно повторять; по умолчанию pdf-a4'
+    )
+    parser.add_argument(
+        '--doc-version',
+        dest='versions',
+        action='append',
+        metavar='ВЕРСИЯ',
+        help='Версия документации download (например, 3.12), можно повторять'
+    )
+    parser.add_argument(
+        '--bandwidth',
+        type=int,
+        default=DEFAULT_BANDWIDTH,
+        help='Общая скорость загрузки архивов, КБ/с, 0 - без ограничения'
+    )
+    parser.add_argument(
+        '--member',
+        metavar='ШАБЛОН',
+        help='Шаблон имени файла в архивах для режима archive (GLOB)'
+    )
+    parser.add_argument(
+        '--text',
+        action='store_true',
+        help='Вывести текст найденных файлов архива вместо их списка'
+    )
+    parser.add_argument(
+        '--host',
+        default=SERVE_HOST,
+        help='Адрес, на котором режим serve принимает запросы'
+    )
+    parser.add_argument(
+        '--port',
+        type=int,
+        default=SERVE_PORT,
+        help='Порт режима serve'
+    )
+    parser.add_argument(
+        '--refresh-interval',
+        type=int,
+        default=SERVE_REFRESH_INTERVAL,
+        help='Период фонового обновления данных режима serve, с'
+    )
+    parser.add_argument(
+        '--profile',
+        action='store_true',
+        help='Замер времени этапов обработки каждой страницы'
+    )
     return parser
 
 
@@ -42,3 +227,44 @@ def configure_logging():
             LOG_FILE, maxBytes=10 ** 6, backupCount=5
         ), logging.StreamHandler())
     )
+
+
+def configure_session(cli_args, cache_name=CACHE_NAME):
+    """Сессия с кешем ответов и транспортом парсера.
+
+    requests_cache и хранилища кеша загружаются только здесь, при первом
+    режиме, которому нужна сеть.
+    """
+    from cache_backends import make_cache
+    from shared_cache import KeyLocks, SharedCachedSession
+    from transport import mount_transport
+
+    shared_dir = getattr(cli_args, 'shared_cache', None)
+    locks = None
+    if shared_dir:
+        cache_name = str(Path(shared_dir) / CACHE_NAME)
+        locks = KeyLocks(Path(shared_dir) / SHARED_LOCKS_DIR_NAME)
+    session = SharedCachedSession(
+        locks=locks,
+        backend=make_cache(
+            getattr(cli_args, 'cache_backend', CACHE_SQLITE),
+            cache_name,
+            max_size=getattr(
+                cli_args, 'cache_size', CACHE_MAX_SIZE // 2 ** 20
+            ) * 2 ** 20,
+            eviction=getattr(cli_args, 'cache_eviction', EVICTION_LRU),
+            redis_url=getattr(cli_args, 'redis_url', REDIS_URL),
+        ),
+        expire_after=CACHE_EXPIRE_AFTER,
+        urls_expire_after=CACHE_URLS_EXPIRE_AFTER,
+        stale_while_revalidate=CACHE_STALE_WHILE_REVALIDATE,
+        always_revalidate=cli_args.refresh,
+    )
+    mount_transport(
+        session,
+        getattr(cli_args, 'workers', DEFAULT_WORKERS),
+        getattr(cli_args, 'rate', HOST_RATE)
+    )
+    if cli_args.clear_cache:
+        session.cache.clear()
+    return session
@@ -1,17 +1,66 @@
+from datetime import timedelta
 from pathlib import Path
 from urllib.parse import urljoin
 
 
+CACHE_FILESYSTEM = 'filesystem'
+CACHE_REDIS = 'redis'
+CACHE_SQLITE = 'sqlite'
+CACHE_BACKENDS = (CACHE_SQLITE, CACHE_FILESYSTEM, CACHE_REDIS)
+EVICTION_LFU = 'lfu'
+EVICTION_LRU = 'lru'
+CHOICE_ARROW = 'arrow'
+CHOICE_CSV_GZIP = 'csv-gz'
+CHOICE_CSV_ZSTD = 'csv-zst'
 CHOICE_FILE = 'file'
+CHOICE_JSONL = 'jsonl'
+CHOICE_PARQUET = 'parquet'
 CHOICE_PRETTY = 'pretty'
+ENGINE_ASYNC = 'async'
+ENGINE_THREADS = 'threads'
+PARSER_BS4 = 'bs4'
+PARSER_LXML = 'lxml'
+ARCHIVE_INDEX_FILE_NAME = 'archive_index.sqlite'
 DATETIME_FORMAT = '%Y-%m-%d_%H-%M-%S'
 DOWNLOADS_DIR_NAME = 'downloads'
+DOWNLOAD_FORMATS = ('pdf-a4', 'pdf-letter', 'html', 'text', 'epub')
+DEFAULT_DOWNLOAD_FORMAT = 'pdf-a4'
 DOWNLOAD_URL_PART = 'download.html'
 LOG_DIR_NAME = 'logs'
 LOG_FILE_NAME = 'parser.log'
+PARSED_CACHE_FILE_NAME = 'parsed_cache.sqlite'
+PEP_INDEX_FILE_NAME = 'pep_index.sqlite'
+PEP_STATE_FILE_NAME = 'pep_state.sqlite'
+PROFILES_DIR_NAME = 'profiles'
+PROFILE_MODE_SUFFIX = '-profile'
 RESULTS_PART = 'results'
+SHARED_LOCKS_DIR_NAME = 'locks'
+SNAPSHOTS_FILE_NAME = 'snapshots.sqlite'
+SNAPSHOT_MODES = ('pep', 'latest-versions')
 WHATS_NEW_URL_PART = 'whatsnew/'
 
+DEFAULT_WORKERS = 1
+DEFAULT_PROCESSES = 1
+HOST_CONNECTIONS_LIMIT = 8
+CONNECT_TIMEOUT = 5
+READ_TIMEOUT = 30
+RETRY_TOTAL = 3
+RETRY_BACKOFF_FACTOR = 0.5
+RETRY_JITTER = 0.5
+RETRY_STATUSES = (429, 500, 502, 503, 504)
+HOST_RATE = 10
+HOST_BURST = 10
+HOST_MIN_RATE = 0.5
+HOST_MAX_RATE = 100
+
+OUTPUT_BATCH_SIZE = 1000
+PARSED_CACHE_MAX_ENTRIES = 20000
+PARSED_CACHE_MAX_SIZE = 32 * 1024 * 1024
+DOWNLOAD_CHUNK_SIZE = 64 * 1024
+DEFAULT_BANDWIDTH = 0
+PARTIAL_SUFFIX = '.part'
+VALIDATORS_SUFFIX = '.json'
+
 BASE_DIR = Path(__file__).parent
 DOWNLOADS_DIR = BASE_DIR / DOWNLOADS_DIR_NAME
 LOG_DIR = BASE_DIR / LOG_DIR_NAME
@@ -23,6 +72,26 @@ PEP_SITE_URL = 'https://peps.python.org/'
 DOWNLOADS_URL = urljoin(MAIN_DOC_URL, DOWNLOAD_URL_PART)
 WHATS_NEW_URL = urljoin(MAIN_DOC_URL, WHATS_NEW_URL_PART)
 
+CACHE_NAME = 'http_cache'
+CACHE_USAGE_SUFFIX = '_usage.sqlite'
+CACHE_MAX_SIZE = 256 * 1024 * 1024
+REDIS_URL = 'redis://localhost:6379/0'
+LOCK_STRIPES = 1024
+SERVE_HOST = '127.0.0.1'
+SERVE_PORT = 8000
+SERVE_REFRESH_INTERVAL = 60 * 60
+CACHE_EXPIRE_AFTER = timedelta(days=1)
+PEP_CARD_EXPIRE_AFTER = timedelta(days=1)
+CACHE_STALE_WHILE_REVALIDATE = timedelta(days=1)
+# Шаблоны проверяются по порядку, срабатывает первый подходящий.
+CACHE_URLS_EXPIRE_AFTER = {
+    urljoin(PEP_SITE_URL, 'pep-'): PEP_CARD_EXPIRE_AFTER,
+    PEP_SITE_URL: timedelta(hours=1),
+    urljoin(WHATS_NEW_URL, '2.'): timedelta(days=365),
+    urljoin(WHATS_NEW_URL, '3.'): timedelta(days=30),
+    WHATS_NEW_URL: timedelta(days=1),
+}
+
 EXPECTED_STATUS = {
     'A': ['Active', 'Accepted'],
     'D': ['Deferred'],
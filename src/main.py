@@ -1,18 +1,46 @@
+import datetime as dt
+import hashlib
 import logging
 import re
+import time
+import zipfile
+from argparse import Namespace
 from collections import defaultdict
+from contextlib import contextmanager
+from functools import lru_cache, partial
+from itertools import islice
 from urllib.parse import urljoin
 
-import requests_cache
-from tqdm import tqdm
-
-from configs import configure_argument_parser, configure_logging
+from archive_index import ArchiveIndex
+from configs import (
+    configure_argument_parser, configure_logging, configure_session
+)
+from exceptions import ParserFindTagException
 from outputs import control_output
-from utils import cook_soup, get_response, find_tag
+from parsed_cache import ParsedCache
+from pep_index import PepCard, PepIndex
+from profiling import PROFILER
+from snapshots import SnapshotStore
+from state import PepState, PepStateStore
+from transport import (
+    BandwidthLimiter, get_scheduler_stats, get_transport_stats
+)
+from utils import (
+    cook_soup, download_file, fetch_pages, fetch_parsed_pages, find_node,
+    find_tag, get_response, get_response_validator, list_archive, make_soup,
+    make_tree, progress
+)
 from constants import (
-    BASE_DIR, EXPECTED_STATUS, DOWNLOADS_URL,
-    MAIN_DOC_URL, PEP_SITE_URL, DOWNLOADS_DIR_NAME,
-    WHATS_NEW_URL
+    ARCHIVE_INDEX_FILE_NAME, BASE_DIR, DATETIME_FORMAT, DEFAULT_BANDWIDTH,
+    DEFAULT_DOWNLOAD_FORMAT,
+    DEFAULT_PROCESSES, DEFAULT_WORKERS, ENGINE_THREADS, EXPECTED_STATUS,
+    DOWNLOADS_URL,
+    MAIN_DOC_URL, PARSED_CACHE_FILE_NAME, PARSER_BS4, PARSER_LXML,
+    PEP_CARD_EXPIRE_AFTER,
+    PEP_INDEX_FILE_NAME, PEP_SITE_URL, PEP_STATE_FILE_NAME,
+    PROFILE_MODE_SUFFIX, PROFILES_DIR_NAME, SERVE_HOST, SERVE_PORT,
+    SERVE_REFRESH_INTERVAL, SNAPSHOTS_FILE_NAME, SNAPSHOT_MODES,
+    DOWNLOADS_DIR_NAME, DOWNLOAD_URL_PART, WHATS_NEW_URL, WHATS_NEW_URL_PART
 )
 
 STATUS_PEP_NOT_MATCHED = (
@@ -22,6 +50,21 @@ STATUS_PEP_NOT_MATCHED = (
     'Ожидаемые статусы: {table_status}'
 )
 ARCHIVE_LOADED_SAVED = ('Архив был загружен и сохранён: {archive_path}')
+ARCHIVE_UP_TO_DATE = ('Архив уже загружен и актуален: {archive_path}')
+ARCHIVE_TITLE = ('Архив документации: {name}')
+ARCHIVE_MEMBERS = ('Файлов в архиве {archive_path}: {count}')
+ARCHIVE_NOT_FOUND = ('Нет архива в формате {archive_format} на странице {url}')
+BROKEN_ARCHIVE = ('Повреждённый архив: {error} URL: {url}')
+CHECKSUM_UNAVAILABLE = (
+    'Контрольная сумма недоступна, архив загружается без проверки: {url}'
+)
+NO_ARCHIVES = (
+    'Нет загруженных архивов, сначала выполните режим download.'
+)
+SNAPSHOT_SAVED = ('Сохранён снимок {mode} №{snapshot_id}')
+NO_SNAPSHOTS = (
+    'Нет снимков режима {mode}, запустите его с параметром --snapshot.'
+)
 UNKNOWN_STATUS = (
     'Неизвестный статус {a_tag_link} '
     'в таблице Numerical Index'
@@ -31,41 +74,186 @@ PARSER_LAUNCHED = ('Парсер запущен!')
 PARSER_FINISHED = ('Парсер завершил работу.')
 PARSER_FAILURE = ('Ошибка работы программы: {error}')
 URL_FAILURE = ('Ошибка загрузки: {error}')
+PROFILE_SAVED = ('Профиль сохранён в файл: {file_path}')
+TRANSPORT_STATS = (
+    'Запросов по сети: {requests}, новых соединений: {connections}, '
+    'переиспользовано соединений: {reused}'
+)
+SCHEDULER_STATS = (
+    'Хост {host}: запросов {completed} ({throughput:.1f} в секунду), '
+    'скорость {rate:.1f} запросов/с, ограничений {throttled}, '
+    'в очереди {queue}'
+)
+CACHE_STATS = (
+    'Кеш ответов: попаданий {hits}, промахов {misses} ({hit_rate:.0%}), '
+    'занято {size} байт, вытеснено записей {evicted} ({evicted_size} байт)'
+)
+SHARED_CACHE_STATS = (
+    'Общий кеш: ожиданий чужих запросов {waited}, '
+    'из них получено из кеша {coalesced}'
+)
 SEARCH_FAILURE = ('Ничего не нашлось.')
+PARSED_CACHE_STATS = (
+    'Кеш результатов разбора: попаданий {hits}, промахов {misses}'
+)
+PEP_STATUS_NOT_FOUND = ('В карточке PEP нет поля Status')
+PEP_INDEX_EMPTY = (
+    'Индекс карточек PEP пуст, сначала запустите режим pep-dataset.'
+)
+
+WHATS_NEW_INDEX_STRAINER = 'whats-new-index'
+WHATS_NEW_PAGE_STRAINER = 'whats-new-page'
+SIDEBAR_STRAINER = 'sidebar'
+DOWNLOADS_STRAINER = 'downloads'
+DOWNLOAD_FORMAT_PATTERNS = {
+    'pdf-a4': r'pdf-a4\.zip$',
+    'pdf-letter': r'pdf-letter\.zip$',
+    'html': r'html\.zip$',
+    'text': r'text\.zip$',
+    'epub': r'\.epub$',
+}
+# Опубликованная контрольная сумма архива лежит рядом с ним.
+CHECKSUM_SUFFIX = '.sha256'
+CHECKSUM_PATTERN = r'[0-9a-fA-F]{64}'
+ARCHIVE_SUFFIXES = ('.zip', '.epub')
+HTML_SUFFIXES = ('.html', '.htm', '.xhtml')
+PEP_INDEX_STRAINER = 'pep-index'
+PEP_CARD_STRAINER = 'pep-card'
+WHATS_NEW_LINKS_SELECTOR = (
+    '#what-s-new-in-python div.toctree-wrapper li.toctree-l1 '
+    'a[href!="changelog.html"][href$=".html"]'
+)
+WHATS_NEW_LINKS_XPATH = (
+    '//*[@id="what-s-new-in-python"]//div[contains(@class, "toctree-wrapper")]'
+    '//li[contains(concat(" ", @class, " "), " toctree-l1 ")]/a/@href'
+)
+DOC_VERSION_PATTERN = r'\d+\.\d+'
+PEP_CARD_HEADER_START = re.compile(r'<dl\b[^>]*\brfc2822\b[^>]*>')
+PEP_CARD_HEADER_END = '</dl>'
+PEP_CARD_FIELDS_STRAINER = 'pep-card-fields'
+# Аргументы SoupStrainer частичного разбора страниц по именам выше.
+STRAINERS = {
+    WHATS_NEW_INDEX_STRAINER: dict(attrs={'id': 'what-s-new-in-python'}),
+    WHATS_NEW_PAGE_STRAINER: dict(name=['h1', 'dl']),
+    SIDEBAR_STRAINER: dict(
+        name='div', attrs={'class': 'sphinxsidebarwrapper'}
+    ),
+    DOWNLOADS_STRAINER: dict(name='a'),
+    PEP_INDEX_STRAINER: dict(attrs={'id': 'numerical-index'}),
+    PEP_CARD_STRAINER: dict(
+        name='dl', attrs={'class': re.compile(r'\brfc2822\b')}
+    ),
+    PEP_CARD_FIELDS_STRAINER: dict(name=['h1', 'dl']),
+}
+PEP_FIELDS_XPATH = '//dl[contains(concat(" ", @class, " "), " rfc2822 ")]'
+PEP_STATUS_XPATH = (
+    PEP_FIELDS_XPATH + '/dt[contains(., "Status")]/following-sibling::dd[1]'
+)
+PEP_SEARCH_FIELDS = ('Status', 'Type', 'Python-Version')
+# Увеличивается при изменении разбора страниц, чтобы сбросить записи
+# ParsedCache, сохранённые прежними версиями.
+PARSED_RESULTS_VERSION = 1
+
+
+@lru_cache(maxsize=None)
+def get_strainer(name):
+    """SoupStrainer из STRAINERS: bs4 загружается при первом разборе,
+    а не при импорте."""
+    from bs4 import SoupStrainer
+
+    return SoupStrainer(**STRAINERS[name])
+
+
+def get_fetch_options(cli_args):
+    return dict(
+        workers=getattr(cli_args, 'workers', DEFAULT_WORKERS),
+        engine=getattr(cli_args, 'engine', ENGINE_THREADS),
+    )
+
+
+def get_parse_options(cli_args):
+    return dict(
+        get_fetch_options(cli_args),
+        processes=getattr(cli_args, 'processes', DEFAULT_PROCESSES),
+    )
+
+
+def parse_whats_new_page(text):
+    soup = make_soup(
+        text, parse_only=get_strainer(WHATS_NEW_PAGE_STRAINER)
+    )
+    return (
+        find_tag(soup, 'h1').text,
+        find_tag(soup, 'dl').text.replace('\n', ' ')
+    )
+
+
+def parse_whats_new_page_lxml(text):
+    tree = make_tree(text)
+    return (
+        find_node(tree, '//h1').text_content(),
+        find_node(tree, '//dl').text_content().replace('\n', ' ')
+    )
+
 
+@contextmanager
+def open_parsed_cache(cli_args):
+    """Кеш результатов разбора страниц или None.
 
-def whats_new(session):
+    Включается аргументом parsed_cache (в командной строке включён по
+    умолчанию), очищается вместе с кешем ответов по --clear-cache.
+    """
+    if not getattr(cli_args, 'parsed_cache', False):
+        yield None
+        return
+    memo = ParsedCache(
+        BASE_DIR / PARSED_CACHE_FILE_NAME, PARSED_RESULTS_VERSION
+    )
+    if getattr(cli_args, 'clear_cache', False):
+        memo.clear()
+    try:
+        yield memo
+    finally:
+        memo.close()
+        logging.info(PARSED_CACHE_STATS.format(
+            hits=memo.hits, misses=memo.misses
+        ))
+
+
+def whats_new(session, cli_args=None):
     errors = []
-    results = [('Ссылка на статью', 'Заголовок', 'Редактор, автор')]
-    for a_tag in tqdm(
-        cook_soup(
-            session, WHATS_NEW_URL
-        ).select(
-            '#what-s-new-in-python div.toctree-wrapper li.toctree-l1 '
-            'a[href!="changelog.html"][href$=".html"]'
-        ), desc='Загрузка из кеша'
-    ):
-        version_link = urljoin(WHATS_NEW_URL, a_tag['href'])
-        try:
-            soup = cook_soup(session, version_link)
-        except ConnectionError as error:
-            errors.append(
-                URL_FAILURE.format(error=error)
-            )
-            continue
-        results.append(
-            (version_link,
-             find_tag(soup, 'h1').text,
-             find_tag(soup, 'dl').text.replace('\n', ' '))
-        )
-    map(lambda error: logging.info(error), errors)
-    return results
+    yield ('Ссылка на статью', 'Заголовок', 'Редактор, автор')
+    version_links = [
+        urljoin(WHATS_NEW_URL, a_tag['href'])
+        for a_tag in cook_soup(
+            session, WHATS_NEW_URL,
+            parse_only=get_strainer(WHATS_NEW_INDEX_STRAINER)
+        ).select(WHATS_NEW_LINKS_SELECTOR)
+    ]
+    with open_parsed_cache(cli_args) as memo:
+        for version_link, (page, error) in zip(version_links, progress(
+            fetch_parsed_pages(
+                session,
+                version_links,
+                WHATS_NEW_PARSERS[getattr(cli_args, 'parser', PARSER_BS4)],
+                memo=memo,
+                **get_parse_options(cli_args)
+            ),
+            total=len(version_links),
+            desc='Загрузка из кеша'
+        )):
+            if error is not None:
+                errors.append(URL_FAILURE.format(error=error))
+                continue
+            yield (version_link, *page)
+    for error in errors:
+        logging.info(error)
 
 
-def latest_versions(session):
+def latest_versions(session, cli_args=None):
     sidebar = find_tag(
         cook_soup(
-            session, MAIN_DOC_URL
+            session, MAIN_DOC_URL, parse_only=get_strainer(SIDEBAR_STRAINER)
         ), 'div', attrs={'class': 'sphinxsidebarwrapper'}
     )
     ul_tags = sidebar.find_all('ul')
@@ -77,87 +265,639 @@ def latest_versions(session):
     else:
         raise NameError(SEARCH_FAILURE)
 
-    results = [('Ссылка на документацию', 'Версия', 'Статус')]
+    yield ('Ссылка на документацию', 'Версия', 'Статус')
     pattern = r'Python (?P<version>\d\.\d+) \((?P<status>.*)\)'
+    statuses = {}
     for a_tag in a_tags:
         text_match = re.search(pattern, a_tag.text)
         if text_match is not None:
             version, status = text_match.groups()
         else:
             version, status = a_tag.text, ''
-        results.append((a_tag['href'], version, status))
-    return results
+        statuses[version] = status
+        yield (a_tag['href'], version, status)
+    if getattr(cli_args, 'snapshot', False):
+        save_snapshot('latest-versions', statuses)
+
+
+def get_doc_versions(session):
+    """Пары (версия, ссылка на документацию) из боковой панели."""
+    return [
+        (version, link)
+        for link, version, _ in islice(latest_versions(session), 1, None)
+        if re.fullmatch(DOC_VERSION_PATTERN, version)
+    ]
 
 
-def download(session):
-    pdf_a4_tag = find_tag(
-        cook_soup(session, DOWNLOADS_URL),
-        'a',
-        {'href': re.compile(r'.+pdf-a4\.zip$')}
+def parse_version_page(text):
+    """Ссылки на статьи What's New и на архивы со страницы версии."""
+    tree = make_tree(text)
+    return (
+        [
+            href for href in tree.xpath(WHATS_NEW_LINKS_XPATH)
+            if href.endswith('.html') and href != 'changelog.html'
+        ],
+        [href for href in tree.xpath('//a/@href') if href.endswith('.zip')],
     )
-    archive_url = urljoin(DOWNLOADS_URL, pdf_a4_tag['href'])
-    downloads_dir = BASE_DIR / DOWNLOADS_DIR_NAME
-    downloads_dir.mkdir(exist_ok=True)
-    archive_path = downloads_dir / archive_url.split('/')[-1]
-    with open(archive_path, 'wb') as file:
-        file.write(get_response(session, archive_url).content)
-    logging.info(ARCHIVE_LOADED_SAVED.format(archive_path=archive_path))
 
 
-def pep(session):
-    status_dict_count = defaultdict(int)
+def collect_version_links(session, versions, cli_args):
+    """Ссылки на статьи What's New и архивы всех версий документации.
+
+    Страницы whatsnew/ и download.html всех версий загружаются вместе.
+    """
+    version_pages = [
+        (version, urljoin(link, part))
+        for version, link in versions
+        for part in (WHATS_NEW_URL_PART, DOWNLOAD_URL_PART)
+    ]
+    articles = []
+    archives = []
     errors = []
-    pattern = r'^\d+$'
+    for (version, page_url), (links, error) in zip(
+        version_pages,
+        fetch_parsed_pages(
+            session,
+            [page_url for _, page_url in version_pages],
+            parse_version_page,
+            **get_parse_options(cli_args)
+        )
+    ):
+        if error is not None:
+            errors.append(URL_FAILURE.format(error=error))
+            continue
+        article_hrefs, archive_hrefs = links
+        articles.extend(
+            (version, urljoin(page_url, href)) for href in article_hrefs
+        )
+        archives.extend(
+            (version, urljoin(page_url, href)) for href in archive_hrefs
+        )
+    return articles, archives, errors
+
+
+def all_versions(session, cli_args=None):
+    """Статьи What's New и архивы документации всех версий за один запуск.
+
+    Версии берутся из боковой панели, как в latest-versions. Копии
+    статьи в разных версиях различаются обвязкой страницы (заголовок
+    окна, переключатель версий), поэтому совпадение определяется по
+    разобранным заголовку и авторам: одинаковые статьи выводятся одной
+    строкой со списком версий.
+    """
+    yield ('Версии документации', 'Ссылка', 'Заголовок', 'Редактор, автор')
+    articles, archives, errors = collect_version_links(
+        session, get_doc_versions(session), cli_args
+    )
+    unique_articles = {}
+    with open_parsed_cache(cli_args) as memo:
+        for (version, url), (article, error) in zip(articles, progress(
+            fetch_parsed_pages(
+                session,
+                [url for _, url in articles],
+                WHATS_NEW_PARSERS[getattr(cli_args, 'parser', PARSER_BS4)],
+                memo=memo,
+                **get_parse_options(cli_args)
+            ),
+            total=len(articles)
+        )):
+            if error is not None:
+                errors.append(URL_FAILURE.format(error=error))
+                continue
+            unique_articles.setdefault(article, ([], url))[0].append(version)
+    for article, (article_versions, url) in unique_articles.items():
+        yield (', '.join(article_versions), url, *article)
+    for version, url in archives:
+        yield (
+            version, url, ARCHIVE_TITLE.format(name=url.split('/')[-1]), ''
+        )
+    for error in errors:
+        logging.info(error)
+
+
+def parse_download_links(text):
+    return [
+        a_tag['href'] for a_tag in make_soup(
+            text, parse_only=get_strainer(DOWNLOADS_STRAINER)
+        ).find_all('a', href=True)
+    ]
+
+
+def get_downloads_urls(versions):
+    if not versions:
+        return [DOWNLOADS_URL]
+    return [
+        urljoin(MAIN_DOC_URL, f'../{version}/{DOWNLOAD_URL_PART}')
+        for version in versions
+    ]
+
+
+def collect_archives(session, downloads_urls, formats, cli_args):
+    """Ссылки на архивы форматов formats со страниц загрузки.
+
+    Возвращает словарь {ссылка на архив: ссылка на опубликованную
+    контрольную сумму или None} и список ошибок.
+    """
+    archives = {}
+    errors = []
+    for page_url, (links, error) in zip(downloads_urls, fetch_parsed_pages(
+        session, downloads_urls, parse_download_links,
+        **get_parse_options(cli_args)
+    )):
+        if error is not None:
+            errors.append(URL_FAILURE.format(error=error))
+            continue
+        for archive_format in formats:
+            href = next((
+                href for href in links
+                if re.search(DOWNLOAD_FORMAT_PATTERNS[archive_format], href)
+            ), None)
+            if href is None:
+                errors.append(ARCHIVE_NOT_FOUND.format(
+                    archive_format=archive_format, url=page_url
+                ))
+                continue
+            archives[urljoin(page_url, href)] = (
+                urljoin(page_url, href + CHECKSUM_SUFFIX)
+                if href + CHECKSUM_SUFFIX in links else None
+            )
+    return archives, errors
+
+
+def get_checksum(session, url):
+    """Опубликованный SHA-256 архива или None, если его не получить."""
+    try:
+        response = get_response(session, url)
+    except ConnectionError:
+        response = None
+    words = []
+    if response is not None and response.ok:
+        words = response.text.split()
+    if not words or not re.fullmatch(CHECKSUM_PATTERN, words[0]):
+        logging.warning(CHECKSUM_UNAVAILABLE.format(url=url))
+        return None
+    return words[0].lower()
+
 
-    for tr_tag in tqdm(
-        cook_soup(session, PEP_SITE_URL).select('#numerical-index tbody tr')
+def download_archive(session, archive_url, checksums, downloads_dir, limiter):
+    checksum = None
+    if checksums[archive_url] is not None:
+        checksum = get_checksum(session, checksums[archive_url])
+    archive_path = downloads_dir / archive_url.split('/')[-1]
+    loaded = download_file(
+        session, archive_url, archive_path, checksum=checksum, limiter=limiter
+    )
+    try:
+        members = list_archive(archive_path)
+    except zipfile.BadZipFile as error:
+        archive_path.unlink()
+        raise ConnectionError(
+            BROKEN_ARCHIVE.format(error=error, url=archive_url)
+        )
+    return archive_path, loaded, len(members)
+
+
+def download(session, cli_args=None):
+    archives, errors = collect_archives(
+        session,
+        get_downloads_urls(getattr(cli_args, 'versions', None)),
+        getattr(cli_args, 'formats', None) or [DEFAULT_DOWNLOAD_FORMAT],
+        cli_args
+    )
+    downloads_dir = BASE_DIR / DOWNLOADS_DIR_NAME
+    downloads_dir.mkdir(exist_ok=True)
+    bandwidth = getattr(cli_args, 'bandwidth', DEFAULT_BANDWIDTH)
+    for result, error in fetch_pages(
+        session,
+        list(archives),
+        partial(
+            download_archive,
+            checksums=archives,
+            downloads_dir=downloads_dir,
+            limiter=BandwidthLimiter(bandwidth * 1024) if bandwidth else None
+        ),
+        workers=getattr(cli_args, 'workers', DEFAULT_WORKERS)
     ):
-        abbr_status_short = find_tag(tr_tag, 'td').text[1:]
+        if error is not None:
+            errors.append(URL_FAILURE.format(error=error))
+            continue
+        archive_path, loaded, members_count = result
+        logging.info((
+            ARCHIVE_LOADED_SAVED if loaded else ARCHIVE_UP_TO_DATE
+        ).format(archive_path=archive_path))
+        logging.info(ARCHIVE_MEMBERS.format(
+            archive_path=archive_path, count=members_count
+        ))
+    for error in errors:
+        logging.info(error)
+
 
+def get_member_text(name, content):
+    text = content.decode('utf-8', errors='replace')
+    if name.endswith(HTML_SUFFIXES):
+        return normalize_text(make_tree(text).text_content())
+    return text
+
+
+def archive(session, cli_args=None):
+    """Файлы загруженных архивов документации без распаковки.
+
+    Оглавления архивов из downloads/ хранятся в индексе между запусками,
+    --member отбирает файлы по шаблону имени, --text выводит их текст.
+    """
+    pattern = getattr(cli_args, 'member', None) or '*'
+    with_text = getattr(cli_args, 'text', False)
+    archive_paths = sorted(
+        path for path in (BASE_DIR / DOWNLOADS_DIR_NAME).glob('*')
+        if path.suffix in ARCHIVE_SUFFIXES
+    )
+    if not archive_paths:
+        logging.info(NO_ARCHIVES)
+    index = ArchiveIndex(BASE_DIR / ARCHIVE_INDEX_FILE_NAME)
+    try:
+        if with_text:
+            yield ('Архив', 'Файл', 'Текст')
+        else:
+            yield ('Архив', 'Файл', 'Размер', 'Сжатый размер', 'CRC')
+        for archive_path in archive_paths:
+            for member in index.members(archive_path, pattern):
+                if with_text:
+                    yield (archive_path.name, member.name, get_member_text(
+                        member.name, index.read(member)
+                    ))
+                else:
+                    yield (
+                        archive_path.name, member.name, member.size,
+                        member.compressed_size, f'{member.crc:08x}'
+                    )
+    finally:
+        index.close()
+
+
+def get_pep_card_header(text):
+    """Разметка списка полей карточки PEP или None, если его нет.
+
+    Поля идут в начале карточки, поэтому разбирать остальную страницу
+    для поиска статуса не нужно.
+    """
+    match = PEP_CARD_HEADER_START.search(text)
+    if match is None:
+        return None
+    end = text.find(PEP_CARD_HEADER_END, match.end())
+    if end == -1:
+        return None
+    return text[match.start():end + len(PEP_CARD_HEADER_END)]
+
+
+def parse_pep_card_status(text):
+    header = get_pep_card_header(text)
+    if header is None:
+        soup = make_soup(text, parse_only=get_strainer(PEP_CARD_STRAINER))
+    else:
+        soup = make_soup(header)
+    for dt_tag in find_tag(soup, 'dl').find_all('dt'):
+        if 'Status' not in dt_tag.text:
+            continue
+        dd_tag = dt_tag.find_next_sibling('dd')
+        if dd_tag is not None:
+            return dd_tag.text
+    raise ParserFindTagException(PEP_STATUS_NOT_FOUND)
+
+
+def parse_pep_card_status_lxml(text):
+    header = get_pep_card_header(text)
+    return find_node(
+        make_tree(text if header is None else header), PEP_STATUS_XPATH
+    ).text_content()
+
+
+def get_pep_card_state(session, pep_link, known, parse):
+    response = get_response(session, pep_link)
+    validator = get_response_validator(response)
+    if known is None:
+        known = PepState(pep_link, None, None, None, None, None)
+    known = known._replace(checked_at=time.time())
+    if validator is not None and validator == known.validator:
+        return known
+    content_hash = hashlib.sha1(response.content).hexdigest()
+    if content_hash == known.content_hash:
+        return known._replace(validator=validator)
+    return known._replace(
+        validator=validator,
+        content_hash=content_hash,
+        card_status=parse(response.text)
+    )
+
+
+def is_pep_state_fresh(known, abbr_status_short):
+    return (
+        known is not None
+        and known.abbr_status == abbr_status_short
+        and time.time() - known.checked_at
+        < PEP_CARD_EXPIRE_AFTER.total_seconds()
+    )
+
+
+def collect_pep_rows(session):
+    pattern = r'^\d+$'
+    pep_rows = []
+    for tr_tag in cook_soup(
+        session, PEP_SITE_URL, parse_only=get_strainer(PEP_INDEX_STRAINER)
+    ).select('#numerical-index tbody tr'):
+        abbr_status_short = find_tag(tr_tag, 'td').text[1:]
         a_tags = tr_tag.find_all(
             'a', attrs={'class': 'pep reference internal'}
         )
         for a_tag in a_tags:
             if re.search(pattern, a_tag.text):
                 continue
-            pep_link = urljoin(PEP_SITE_URL, a_tag['href'])
-            try:
-                soup = cook_soup(session, pep_link)
-            except ConnectionError as error:
-                errors.append(
-                    URL_FAILURE.format(error=error)
+            pep_rows.append((
+                urljoin(PEP_SITE_URL, a_tag['href']),
+                a_tag['href'],
+                abbr_status_short
+            ))
+    return pep_rows
+
+
+def count_pep_statuses(pep_rows, card_statuses, statuses=None):
+    """Количество PEP по статусам и ошибки проверки.
+
+    Если передан словарь statuses, в него записываются статусы из
+    карточек всех PEP по ссылкам, включая не совпавшие с таблицей;
+    для карточек, которые не удалось загрузить, - None.
+    """
+    status_dict_count = defaultdict(int)
+    errors = []
+    for (pep_link, href, abbr_status_short), (card_status, error) in progress(
+        zip(pep_rows, card_statuses), total=len(pep_rows)
+    ):
+        if statuses is not None:
+            statuses[pep_link] = card_status
+        if error is not None:
+            errors.append(URL_FAILURE.format(error=error))
+            continue
+        if abbr_status_short not in EXPECTED_STATUS:
+            errors.append(UNKNOWN_STATUS.format(a_tag_link=href))
+        elif card_status not in EXPECTED_STATUS[abbr_status_short]:
+            errors.append(
+                STATUS_PEP_NOT_MATCHED.format(
+                    pep_link=pep_link,
+                    card_status=card_status,
+                    table_status=EXPECTED_STATUS[abbr_status_short]
                 )
+            )
+        else:
+            status_dict_count[card_status] += 1
+    return status_dict_count, errors
+
+
+def count_pep_statuses_incremental(
+    session, pep_rows, parse, fetch_options, recheck=False, statuses=None
+):
+    store = PepStateStore(BASE_DIR / PEP_STATE_FILE_NAME)
+    known_states = store.load()
+    abbr_statuses = {
+        pep_link: abbr_status_short
+        for pep_link, _, abbr_status_short in pep_rows
+    }
+    fetched_states = {}
+
+    def get_card_status(session, pep_link):
+        known = known_states.get(pep_link)
+        if recheck or not is_pep_state_fresh(known, abbr_statuses[pep_link]):
+            known = get_pep_card_state(session, pep_link, known, parse)
+        fetched_states[pep_link] = known
+        return known.card_status
+
+    try:
+        counted = count_pep_statuses(pep_rows, fetch_pages(
+            session,
+            [pep_link for pep_link, *_ in pep_rows],
+            get_card_status,
+            **fetch_options
+        ), statuses)
+        store.save(
+            fetched_states[pep_link]._replace(abbr_status=abbr_status_short)
+            for pep_link, _, abbr_status_short in pep_rows
+            if pep_link in fetched_states
+        )
+    finally:
+        store.close()
+    return counted
+
+
+def normalize_text(text):
+    return ' '.join(text.split())
+
+
+def get_field_pairs(names, values):
+    return [
+        (normalize_text(name).rstrip(':').strip(), normalize_text(value))
+        for name, value in zip(names, values)
+    ]
+
+
+def parse_pep_card_fields(text):
+    soup = make_soup(
+        text, parse_only=get_strainer(PEP_CARD_FIELDS_STRAINER)
+    )
+    fields_tag = find_tag(
+        soup, 'dl', attrs={'class': re.compile(r'\brfc2822\b')}
+    )
+    title_tag = soup.find('h1')
+    return (
+        '' if title_tag is None else normalize_text(title_tag.text),
+        get_field_pairs(
+            (tag.text for tag in fields_tag.find_all('dt')),
+            (tag.text for tag in fields_tag.find_all('dd'))
+        )
+    )
+
+
+def parse_pep_card_fields_lxml(text):
+    tree = make_tree(text)
+    fields_node = find_node(tree, PEP_FIELDS_XPATH)
+    title_nodes = tree.xpath('//h1')
+    return (
+        normalize_text(title_nodes[0].text_content()) if title_nodes else '',
+        get_field_pairs(
+            (node.text_content() for node in fields_node.xpath('dt')),
+            (node.text_content() for node in fields_node.xpath('dd'))
+        )
+    )
+
+
+def make_pep_card(pep_link, title, fields):
+    number = int(re.search(r'pep-(\d+)', pep_link).group(1))
+    return PepCard(number, pep_link, title, fields)
+
+
+def pep_dataset(session, cli_args=None):
+    """Сохраняет все заголовочные поля карточек PEP в локальный индекс.
+
+    Индекс заменяется целиком после загрузки всех карточек, при сбое
+    остаётся предыдущий. Отдаёт число карточек с каждым полем.
+    """
+    pep_links = [pep_link for pep_link, *_ in collect_pep_rows(session)]
+    parse = PEP_CARD_FIELD_PARSERS[getattr(cli_args, 'parser', PARSER_BS4)]
+    errors = []
+
+    def get_cards(memo):
+        for pep_link, (card, error) in zip(pep_links, progress(
+            fetch_parsed_pages(
+                session, pep_links, parse, memo=memo,
+                **get_parse_options(cli_args)
+            ),
+            total=len(pep_links)
+        )):
+            if error is not None:
+                errors.append(URL_FAILURE.format(error=error))
                 continue
+            yield make_pep_card(pep_link, *card)
+
+    index = PepIndex(BASE_DIR / PEP_INDEX_FILE_NAME)
+    try:
+        with open_parsed_cache(cli_args) as memo:
+            index.replace(get_cards(memo))
+        for error in errors:
+            logging.info(error)
+        yield ('Поле', 'Карточек')
+        yield from index.count_fields()
+        yield ('Всего', index.count())
+    finally:
+        index.close()
+
+
+def pep_search(session, cli_args=None):
+    """Ищет карточки в индексе pep-dataset без обращения к сети.
+
+    Фильтры --filter Поле=Значение объединяются через И, --query -
+    полнотекстовый запрос FTS5 по заголовку и всем полям карточки.
+    """
+    index = PepIndex(BASE_DIR / PEP_INDEX_FILE_NAME)
+    try:
+        if not index.count():
+            logging.info(PEP_INDEX_EMPTY)
+        rows = index.search(
+            PEP_SEARCH_FIELDS,
+            getattr(cli_args, 'filter', None) or (),
+            getattr(cli_args, 'query', None)
+        )
+    finally:
+        index.close()
+    yield (
+        'Номер', 'Заголовок', 'Ссылка', 'Статус', 'Тип', 'Версия Python'
+    )
+    yield from rows
+
 
-            dt_status_head_tag = soup.find(
-                lambda tag: tag.name == 'dt' and 'Status' in tag.text
+def pep(session, cli_args=None):
+    yield ('Статус', 'Количество')
+    pep_rows = collect_pep_rows(session)
+    parse = PEP_CARD_PARSERS[getattr(cli_args, 'parser', PARSER_BS4)]
+    fetch_options = get_fetch_options(cli_args)
+    statuses = {}
+    if getattr(cli_args, 'incremental', False):
+        status_dict_count, errors = count_pep_statuses_incremental(
+            session, pep_rows, parse, fetch_options,
+            recheck=getattr(cli_args, 'refresh', False), statuses=statuses
+        )
+    else:
+        with open_parsed_cache(cli_args) as memo:
+            status_dict_count, errors = count_pep_statuses(
+                pep_rows,
+                fetch_parsed_pages(
+                    session,
+                    [pep_link for pep_link, *_ in pep_rows],
+                    parse,
+                    memo=memo,
+                    **get_parse_options(cli_args)
+                ),
+                statuses
             )
-            dt_status_tag = dt_status_head_tag.next_sibling.next_sibling
-
-            try:
-                if dt_status_tag.text not in EXPECTED_STATUS[
-                    abbr_status_short
-                ]:
-                    errors.append(
-                        STATUS_PEP_NOT_MATCHED.format(
-                            pep_link=pep_link,
-                            card_status=dt_status_tag.text,
-                            table_status=EXPECTED_STATUS[abbr_status_short]
-                        )
-                    )
-                else:
-                    status_dict_count[dt_status_tag.text] += 1
-            except KeyError:
-                errors.append(
-                    UNKNOWN_STATUS.format(a_tag_link=a_tag['href'])
-                )
     for error in errors:
         logging.info(error)
-    return [
-            ('Статус', 'Количество'),
-            *status_dict_count.items(),
-            ('Всего', sum(status_dict_count.values())),
-        ]
+    if getattr(cli_args, 'snapshot', False):
+        save_snapshot('pep', statuses)
+    yield from status_dict_count.items()
+    yield ('Всего', sum(status_dict_count.values()))
+
+
+WHATS_NEW_PARSERS = {
+    PARSER_BS4: parse_whats_new_page,
+    PARSER_LXML: parse_whats_new_page_lxml,
+}
+PEP_CARD_PARSERS = {
+    PARSER_BS4: parse_pep_card_status,
+    PARSER_LXML: parse_pep_card_status_lxml,
+}
+PEP_CARD_FIELD_PARSERS = {
+    PARSER_BS4: parse_pep_card_fields,
+    PARSER_LXML: parse_pep_card_fields_lxml,
+}
+
+
+def downloaded_archives(session, cli_args=None):
+    """Загружает архивы как download и перечисляет загруженные."""
+    download(session, cli_args)
+    yield ('Архив', 'Размер, байт')
+    for archive_path in sorted((BASE_DIR / DOWNLOADS_DIR_NAME).glob('*')):
+        if archive_path.suffix in ARCHIVE_SUFFIXES:
+            yield archive_path.name, archive_path.stat().st_size
+
+
+SERVE_MODES = {
+    'pep': pep,
+    'whats-new': whats_new,
+    'latest-versions': latest_versions,
+    'download': downloaded_archives,
+}
+
+
+def serve(session, cli_args=None):
+    """Отдаёт результаты SERVE_MODES в JSON по HTTP, обновляя их в фоне."""
+    from service import ParserService, serve as serve_service
+
+    serve_service(
+        ParserService(
+            session,
+            cli_args,
+            SERVE_MODES,
+            getattr(cli_args, 'refresh_interval', SERVE_REFRESH_INTERVAL),
+            after_refresh=lambda: log_cache_stats(session)
+        ),
+        getattr(cli_args, 'host', SERVE_HOST),
+        getattr(cli_args, 'port', SERVE_PORT)
+    )
+
+
+def save_snapshot(mode, values):
+    store = SnapshotStore(BASE_DIR / SNAPSHOTS_FILE_NAME)
+    try:
+        snapshot = store.save(mode, values)
+    finally:
+        store.close()
+    logging.info(SNAPSHOT_SAVED.format(mode=mode, snapshot_id=snapshot.id))
+
+
+def diff(session, cli_args=None):
+    """Изменения последнего снимка режимов по сравнению с предыдущим.
+
+    Снимки сохраняют pep и latest-versions с --snapshot. Изменения
+    читаются по индексу снимка, без сравнения полных результатов.
+    """
+    yield ('Режим', 'Ключ', 'Было', 'Стало')
+    store = SnapshotStore(BASE_DIR / SNAPSHOTS_FILE_NAME)
+    try:
+        for mode in getattr(cli_args, 'diff_modes', None) or SNAPSHOT_MODES:
+            snapshot = store.get_latest(mode)
+            if snapshot is None:
+                logging.info(NO_SNAPSHOTS.format(mode=mode))
+                continue
+            for key, old, new in store.changes(snapshot):
+                yield (mode, key, old or '', new or '')
+    finally:
+        store.close()
 
 
 MODE_TO_FUNCTION = {
@@ -165,7 +905,61 @@ MODE_TO_FUNCTION = {
     'latest-versions': latest_versions,
     'download': download,
     'pep': pep,
+    'pep-dataset': pep_dataset,
+    'pep-search': pep_search,
+    'all-versions': all_versions,
+    'archive': archive,
+    'serve': serve,
+    'diff': diff,
 }
+# Режимы без обращения к сети: сессия с кешем для них не создаётся.
+OFFLINE_MODES = ('archive', 'diff', 'pep-search')
+
+
+def log_transport_stats(session):
+    transport_stats = get_transport_stats(session)
+    if transport_stats is None:
+        return
+    requests_count, connections = transport_stats
+    logging.info(TRANSPORT_STATS.format(
+        requests=requests_count,
+        connections=connections,
+        reused=requests_count - connections
+    ))
+    for host_stats in get_scheduler_stats(session) or ():
+        logging.info(SCHEDULER_STATS.format(**host_stats._asdict()))
+
+
+def log_cache_stats(session):
+    enforce_budget = getattr(session.cache, 'enforce_budget', None)
+    if enforce_budget is None:
+        return
+    cache_stats = enforce_budget()
+    logging.info(CACHE_STATS.format(
+        hit_rate=cache_stats.hits / max(
+            cache_stats.hits + cache_stats.misses, 1
+        ),
+        **cache_stats._asdict()
+    ))
+    if getattr(session, 'locks', None) is not None:
+        logging.info(SHARED_CACHE_STATS.format(
+            waited=session.waited, coalesced=session.coalesced
+        ))
+
+
+def report_profile(cli_args):
+    control_output(
+        PROFILER.summary(),
+        Namespace(**{
+            **vars(cli_args), 'mode': cli_args.mode + PROFILE_MODE_SUFFIX
+        })
+    )
+    profiles_dir = BASE_DIR / PROFILES_DIR_NAME
+    profiles_dir.mkdir(exist_ok=True)
+    now_formatted = dt.datetime.now().strftime(DATETIME_FORMAT)
+    file_path = profiles_dir / f'{cli_args.mode}_{now_formatted}.json'
+    PROFILER.save_trace(file_path)
+    logging.info(PROFILE_SAVED.format(file_path=file_path))
 
 
 def main():
@@ -177,15 +971,21 @@ def main():
     logging.info(COMMAND_ARGUMENTS.format(args=args))
 
     try:
-        session = requests_cache.CachedSession()
-        if args.clear_cache:
-            session.cache.clear()
-
+        if args.profile:
+            PROFILER.start()
         parser_mode = args.mode
-        results = MODE_TO_FUNCTION[parser_mode](session)
+        session = None
+        if parser_mode not in OFFLINE_MODES:
+            session = configure_session(args)
+        results = MODE_TO_FUNCTION[parser_mode](session, args)
 
         if results is not None:
             control_output(results, args)
+        if session is not None:
+            log_transport_stats(session)
+            log_cache_stats(session)
+        if args.profile:
+            report_profile(args)
     except Exception as error:
         logging.exception(
             PARSER_FAILURE.format(error=error)
@@ -1,48 +1,174 @@
 import csv
 import datetime as dt
+import gzip
+import json
 import logging
-
-from prettytable import PrettyTable
+from itertools import chain, islice
 
 from constants import (
-    BASE_DIR, CHOICE_FILE,
-    CHOICE_PRETTY, DATETIME_FORMAT, RESULTS_PART
+    BASE_DIR, CHOICE_ARROW, CHOICE_CSV_GZIP, CHOICE_CSV_ZSTD, CHOICE_FILE,
+    CHOICE_JSONL, CHOICE_PARQUET, CHOICE_PRETTY, DATETIME_FORMAT,
+    OUTPUT_BATCH_SIZE, RESULTS_PART
 )
 
 
 RESULTS_SAVED_TO_FILE = ('Результаты сохранены в файл: {file_path}')
+COLUMNAR_COMPRESSION = 'zstd'
 
 
 def default_output(results, *args):
     for row in results:
-        print(*row)
+        print(*row, flush=True)
 
 
+# Библиотеки форматов импортируются в функциях вывода, чтобы запуск
+# загружал только выбранную --output.
 def pretty_output(results, *args):
+    from prettytable import PrettyTable
+
+    rows = iter(results)
     table = PrettyTable()
-    table.field_names = results[0]
+    table.field_names = next(rows)
     table.align = 'l'
-    table.add_rows(results[1:])
+    for row in rows:
+        table.add_row(row)
     print(table)
 
 
-def file_output(results, cli_args):
+def get_results_path(cli_args, extension):
     results_dir = BASE_DIR / RESULTS_PART
     results_dir.mkdir(exist_ok=True)
 
     parser_mode = cli_args.mode
     now = dt.datetime.now()
     now_formatted = now.strftime(DATETIME_FORMAT)
-    file_path = results_dir / f'{parser_mode}_{now_formatted}.csv'
+    return results_dir / f'{parser_mode}_{now_formatted}.{extension}'
 
-    with open(file_path, 'w', encoding='utf-8') as f:
+
+def file_output(results, cli_args):
+    """Пишет строки в CSV по мере их получения от режима.
+
+    Каждая строка сразу сбрасывается на диск, поэтому при сбое
+    посреди загрузки в файле остаются все полученные до него строки.
+    """
+    file_path = get_results_path(cli_args, 'csv')
+    try:
+        with open(file_path, 'w', encoding='utf-8') as f:
+            writer = csv.writer(f, dialect=csv.unix_dialect)
+            for row in results:
+                writer.writerow(row)
+                f.flush()
+    finally:
+        logging.info(RESULTS_SAVED_TO_FILE.format(file_path=file_path))
+
+
+def jsonl_output(results, cli_args):
+    """Пишет каждую строку объектом JSON {колонка: значение}.
+
+    Числа остаются числами, строки сбрасываются на диск по мере получения.
+    """
+    file_path = get_results_path(cli_args, 'jsonl')
+    rows = iter(results)
+    header = next(rows)
+    try:
+        with open(file_path, 'w', encoding='utf-8') as f:
+            for row in rows:
+                f.write(
+                    json.dumps(dict(zip(header, row)), ensure_ascii=False)
+                    + '\n'
+                )
+                f.flush()
+    finally:
+        logging.info(RESULTS_SAVED_TO_FILE.format(file_path=file_path))
+
+
+def csv_gzip_output(results, cli_args):
+    file_path = get_results_path(cli_args, 'csv.gz')
+    with gzip.open(file_path, 'wt', encoding='utf-8', newline='') as f:
         csv.writer(f, dialect=csv.unix_dialect).writerows(results)
     logging.info(RESULTS_SAVED_TO_FILE.format(file_path=file_path))
 
 
+def csv_zstd_output(results, cli_args):
+    import zstandard
+
+    file_path = get_results_path(cli_args, 'csv.zst')
+    with zstandard.open(file_path, 'wt', encoding='utf-8', newline='') as f:
+        csv.writer(f, dialect=csv.unix_dialect).writerows(results)
+    logging.info(RESULTS_SAVED_TO_FILE.format(file_path=file_path))
+
+
+def iter_record_batches(results, batch_size):
+    """Отдаёт строки пачками pyarrow.RecordBatch.
+
+    Типы колонок выводятся по первой пачке (например, int64 для
+    количества PEP), следующие пачки приводятся к той же схеме.
+    """
+    import pyarrow as pa
+
+    rows = iter(results)
+    names = list(next(rows))
+    schema = None
+    while True:
+        batch = list(islice(rows, batch_size))
+        if schema is not None and not batch:
+            return
+        columns = list(zip(*batch)) or [()] * len(names)
+        record_batch = pa.RecordBatch.from_arrays(
+            [
+                pa.array(
+                    column,
+                    type=None if schema is None else schema.field(index).type
+                )
+                for index, column in enumerate(columns)
+            ],
+            names=names
+        )
+        schema = record_batch.schema
+        yield record_batch
+        if len(batch) < batch_size:
+            return
+
+
+def parquet_output(results, cli_args):
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+
+    file_path = get_results_path(cli_args, 'parquet')
+    batches = iter_record_batches(results, OUTPUT_BATCH_SIZE)
+    first_batch = next(batches)
+    with pq.ParquetWriter(
+        str(file_path), first_batch.schema, compression=COLUMNAR_COMPRESSION
+    ) as writer:
+        for batch in chain([first_batch], batches):
+            writer.write_table(pa.Table.from_batches([batch]))
+    logging.info(RESULTS_SAVED_TO_FILE.format(file_path=file_path))
+
+
+def arrow_output(results, cli_args):
+    import pyarrow as pa
+
+    file_path = get_results_path(cli_args, 'arrow')
+    batches = iter_record_batches(results, OUTPUT_BATCH_SIZE)
+    first_batch = next(batches)
+    with pa.OSFile(str(file_path), 'wb') as sink, pa.ipc.new_file(
+        sink,
+        first_batch.schema,
+        options=pa.ipc.IpcWriteOptions(compression=COLUMNAR_COMPRESSION)
+    ) as writer:
+        for batch in chain([first_batch], batches):
+            writer.write_batch(batch)
+    logging.info(RESULTS_SAVED_TO_FILE.format(file_path=file_path))
+
+
 OUTPUT_VARIANTS = {
     CHOICE_PRETTY: pretty_output,
     CHOICE_FILE: file_output,
+    CHOICE_JSONL: jsonl_output,
+    CHOICE_CSV_GZIP: csv_gzip_output,
+    CHOICE_CSV_ZSTD: csv_zstd_output,
+    CHOICE_PARQUET: parquet_output,
+    CHOICE_ARROW: arrow_output,
     None: default_output
 }
 
@@ -0,0 +1,93 @@
+import hashlib
+import pickle
+import sqlite3
+import threading
+import time
+
+from constants import PARSED_CACHE_MAX_ENTRIES, PARSED_CACHE_MAX_SIZE
+
+CREATE_TABLE = (
+    'CREATE TABLE IF NOT EXISTS parsed ('
+    'key TEXT PRIMARY KEY, value BLOB, size INTEGER, used_at REAL)'
+)
+SELECT_VALUE = 'SELECT value FROM parsed WHERE key = ?'
+UPSERT = 'INSERT OR REPLACE INTO parsed VALUES (?, ?, ?, ?)'
+TOUCH = 'UPDATE parsed SET used_at = ? WHERE key = ?'
+CLEAR = 'DELETE FROM parsed'
+EVICT_BY_COUNT = (
+    'DELETE FROM parsed WHERE key IN ('
+    'SELECT key FROM parsed ORDER BY used_at DESC LIMIT -1 OFFSET ?)'
+)
+EVICT_BY_SIZE = (
+    'DELETE FROM parsed WHERE key IN (SELECT key FROM ('
+    'SELECT key, sum(size) OVER (ORDER BY used_at DESC, key) AS total '
+    'FROM parsed) WHERE total > ?)'
+)
+
+
+class ParsedCache:
+    """Результаты разбора страниц между запусками в SQLite.
+
+    Ключ складывается из версии разбора, имени функции разбора, ссылки
+    и валидатора закешированного ответа, поэтому изменившаяся страница
+    или новая версия разбора дают промах. Записи и отметки использования
+    копятся в памяти и пишутся одной транзакцией в close(), после чего
+    давно не использованные записи вытесняются по числу и объёму.
+    """
+
+    def __init__(
+        self, path, version, max_entries=PARSED_CACHE_MAX_ENTRIES,
+        max_size=PARSED_CACHE_MAX_SIZE
+    ):
+        self.version = version
+        self.max_entries = max_entries
+        self.max_size = max_size
+        self.connection = sqlite3.connect(str(path), check_same_thread=False)
+        self.connection.execute(CREATE_TABLE)
+        self.lock = threading.Lock()
+        self.pending = {}
+        self.used = set()
+        self.hits = 0
+        self.misses = 0
+
+    def get_key(self, extractor, url, validator):
+        return hashlib.sha1(
+            f'{self.version}\n{extractor}\n{url}\n{validator}'.encode()
+        ).hexdigest()
+
+    def get(self, key):
+        """Возвращает (найдено ли, значение)."""
+        with self.lock:
+            if key in self.pending:
+                return True, pickle.loads(self.pending[key])
+            row = self.connection.execute(SELECT_VALUE, (key,)).fetchone()
+            if row is None:
+                self.misses += 1
+                return False, None
+            self.hits += 1
+            self.used.add(key)
+        return True, pickle.loads(row[0])
+
+    def put(self, key, value):
+        with self.lock:
+            self.pending[key] = pickle.dumps(value)
+
+    def clear(self):
+        with self.lock, self.connection:
+            self.pending.clear()
+            self.used.clear()
+            self.connection.execute(CLEAR)
+
+    def close(self):
+        now = time.time()
+        with self.lock, self.connection:
+            self.connection.executemany(
+                TOUCH, ((now, key) for key in self.used)
+            )
+            self.connection.executemany(UPSERT, (
+                (key, value, len(value), now)
+                for key, value in self.pending.items()
+            ))
+            self.connection.execute(EVICT_BY_COUNT, (self.max_entries,))
+            self.connection.execute(EVICT_BY_SIZE, (self.max_size,))
+        self.connection.close()
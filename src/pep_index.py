@@ -0,0 +1,112 @@
+import sqlite3
+from collections import namedtuple
+
+PepCard = namedtuple('PepCard', 'number link title fields')
+
+CREATE_TABLES = (
+    'CREATE TABLE IF NOT EXISTS pep ('
+    'number INTEGER PRIMARY KEY, link TEXT, title TEXT)',
+    'CREATE TABLE IF NOT EXISTS pep_field ('
+    'number INTEGER, field TEXT COLLATE NOCASE, value TEXT COLLATE NOCASE)',
+    'CREATE INDEX IF NOT EXISTS pep_field_value '
+    'ON pep_field (field, value, number)',
+    'CREATE INDEX IF NOT EXISTS pep_field_number '
+    'ON pep_field (number, field)',
+    'CREATE VIRTUAL TABLE IF NOT EXISTS pep_text USING fts5(title, fields)',
+)
+CLEAR_TABLES = (
+    'DELETE FROM pep',
+    'DELETE FROM pep_field',
+    'DELETE FROM pep_text',
+)
+INSERT_PEP = 'INSERT INTO pep VALUES (?, ?, ?)'
+INSERT_FIELD = 'INSERT INTO pep_field VALUES (?, ?, ?)'
+INSERT_TEXT = 'INSERT INTO pep_text (rowid, title, fields) VALUES (?, ?, ?)'
+COUNT_FIELDS = (
+    'SELECT field, count(DISTINCT number) FROM pep_field '
+    'GROUP BY field ORDER BY count(DISTINCT number) DESC, field'
+)
+COUNT_PEPS = 'SELECT count(*) FROM pep'
+SELECT_FIELD_VALUES = (
+    "(SELECT group_concat(value, ', ') "
+    'FROM pep_field INDEXED BY pep_field_number '
+    'WHERE pep_field.number = pep.number AND field = ?)'
+)
+FILTER_FIELD = (
+    'number IN (SELECT number FROM pep_field WHERE field = ? AND value = ?)'
+)
+FILTER_TEXT = 'number IN (SELECT rowid FROM pep_text WHERE pep_text MATCH ?)'
+# Поля с перечислениями через запятую хранятся по одному значению в строке.
+VALUES_SEPARATOR = ','
+
+
+def split_values(value):
+    return [item.strip() for item in value.split(VALUES_SEPARATOR)]
+
+
+class PepIndex:
+    """Заголовочные поля карточек PEP в SQLite с полнотекстовым поиском.
+
+    Каждое значение поля хранится отдельной строкой pep_field, поэтому
+    фильтр "Python-Version=3.12" находит и карточки с "3.11, 3.12".
+    Заголовок и все поля карточки дополнительно индексируются FTS5.
+    """
+
+    def __init__(self, path):
+        self.connection = sqlite3.connect(str(path))
+        with self.connection:
+            for statement in CREATE_TABLES:
+                self.connection.execute(statement)
+
+    def replace(self, cards):
+        """Заменяет содержимое индекса карточками cards."""
+        with self.connection:
+            for statement in CLEAR_TABLES:
+                self.connection.execute(statement)
+            for card in cards:
+                self.add(card)
+
+    def add(self, card):
+        fields_text = '\n'.join(
+            f'{field}: {value}' for field, value in card.fields
+        )
+        self.connection.execute(
+            INSERT_PEP, (card.number, card.link, card.title)
+        )
+        self.connection.executemany(INSERT_FIELD, (
+            (card.number, field, item)
+            for field, value in card.fields
+            for item in split_values(value)
+        ))
+        self.connection.execute(
+            INSERT_TEXT, (card.number, card.title, fields_text)
+        )
+
+    def count(self):
+        return self.connection.execute(COUNT_PEPS).fetchone()[0]
+
+    def count_fields(self):
+        return self.connection.execute(COUNT_FIELDS).fetchall()
+
+    def search(self, fields, filters=(), text=None):
+        """Карточки, подходящие под все фильтры (поле, значение) и текст.
+
+        Отдаёт строки (номер, заголовок, ссылка, *значения fields).
+        """
+        conditions = [FILTER_FIELD] * len(filters)
+        parameters = [*fields]
+        for field, value in filters:
+            parameters.extend((field, value))
+        if text:
+            conditions.append(FILTER_TEXT)
+            parameters.append(text)
+        query = 'SELECT number, title, link{columns} FROM pep{where}'.format(
+            columns=''.join(', ' + SELECT_FIELD_VALUES for _ in fields),
+            where=' WHERE ' + ' AND '.join(conditions) if conditions else ''
+        )
+        return self.connection.execute(
+            query + ' ORDER BY number', parameters
+        ).fetchall()
+
+    def close(self):
+        self.connection.close()
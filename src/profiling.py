@@ -0,0 +1,128 @@
+import json
+import threading
+import time
+from collections import defaultdict
+from contextlib import contextmanager
+
+STAGE_NETWORK = 'network'
+STAGE_DECODE = 'decode'
+STAGE_DOWNLOAD = 'download'
+STAGE_PARSE = 'parse'
+STAGE_PAGE = 'page'
+STAGE_PREFETCH = 'prefetch'
+STAGE_EXTRACT = 'extract'
+NESTED_STAGES = (STAGE_NETWORK, STAGE_DECODE, STAGE_PARSE)
+SUMMARY_HEADER = (
+    'Этап', 'Страниц', 'Всего, с', 'Среднее, мс', 'Максимум, мс'
+)
+CACHE_HIT = 'cache hit'
+CACHE_MISS = 'cache miss'
+
+
+class Profiler:
+    """Собирает длительность этапов обработки каждой ссылки.
+
+    Ссылка запоминается для текущего потока при входе в этап с url,
+    последующие этапы этого потока без url относятся к ней же.
+    """
+
+    def __init__(self):
+        self.enabled = False
+        self.events = []
+        self.lock = threading.Lock()
+        self.context = threading.local()
+        self.started = time.perf_counter()
+
+    def start(self):
+        self.enabled = True
+        self.events = []
+        self.started = time.perf_counter()
+
+    @contextmanager
+    def stage(self, name, url=None, **details):
+        if not self.enabled:
+            yield details
+            return
+        if url is not None:
+            self.context.url = url
+        url = getattr(self.context, 'url', None)
+        start = time.perf_counter()
+        try:
+            yield details
+        finally:
+            self.record(
+                name, url, start, time.perf_counter() - start, **details
+            )
+
+    def record(self, name, url, start, duration, **details):
+        if not self.enabled:
+            return
+        event = dict(
+            name=name,
+            url=url,
+            start=start - self.started,
+            duration=duration,
+            thread=threading.get_ident(),
+            **details
+        )
+        with self.lock:
+            self.events.append(event)
+
+    def get_durations(self):
+        durations = defaultdict(list)
+        nested = defaultdict(float)
+        for event in self.events:
+            name = event['name']
+            if name == STAGE_NETWORK:
+                name = CACHE_HIT if event.get('from_cache') else CACHE_MISS
+                name = f'{STAGE_NETWORK} ({name})'
+            if event['name'] in NESTED_STAGES:
+                nested[event['url']] += event['duration']
+            if event['name'] != STAGE_PAGE:
+                durations[name].append(event['duration'])
+        durations[STAGE_EXTRACT] = [
+            max(event['duration'] - nested[event['url']], 0)
+            for event in self.events if event['name'] == STAGE_PAGE
+        ]
+        return durations
+
+    def summary(self):
+        rows = [SUMMARY_HEADER]
+        for name, durations in self.get_durations().items():
+            if not durations:
+                continue
+            rows.append((
+                name,
+                len(durations),
+                f'{sum(durations):.3f}',
+                f'{sum(durations) / len(durations) * 1000:.2f}',
+                f'{max(durations) * 1000:.2f}',
+            ))
+        return rows
+
+    def save_trace(self, path):
+        """Сохраняет события в формате Chrome Trace Event."""
+        trace = {
+            'traceEvents': [
+                {
+                    'name': event['name'],
+                    'cat': 'parser',
+                    'ph': 'X',
+                    'ts': event['start'] * 10 ** 6,
+                    'dur': event['duration'] * 10 ** 6,
+                    'pid': 1,
+                    'tid': event['thread'],
+                    'args': {
+                        key: value for key, value in event.items()
+                        if key not in ('name', 'start', 'duration', 'thread')
+                    },
+                }
+                for event in self.events
+            ],
+            'summary': self.summary(),
+        }
+        with open(path, 'w', encoding='utf-8') as file:
+            json.dump(trace, file, ensure_ascii=False)
+
+
+PROFILER = Profiler()
@@ -0,0 +1,163 @@
+import heapq
+import itertools
+import threading
+import time
+from collections import namedtuple
+from email.utils import parsedate_to_datetime
+
+from constants import HOST_BURST, HOST_MAX_RATE, HOST_MIN_RATE, HOST_RATE
+
+PRIORITY_FETCH = 0
+PRIORITY_REVALIDATE = 1
+THROTTLE_STATUSES = (429, 503)
+# Скорость растёт на RATE_INCREASE запроса/с после каждого быстрого ответа
+# и умножается на RATE_DECREASE при ограничении или росте задержки.
+RATE_INCREASE = 0.5
+RATE_DECREASE = 0.5
+# Задержка считается выросшей, когда её скользящее среднее превышает
+# лучшую наблюдавшуюся задержку хоста в LATENCY_FACTOR раз.
+LATENCY_FACTOR = 3
+LATENCY_SMOOTHING = 0.2
+
+HostStats = namedtuple(
+    'HostStats', 'host rate queue completed throttled throughput'
+)
+
+
+def parse_retry_after(value, now=None):
+    """Секунды ожидания из заголовка Retry-After (число или дата)."""
+    if value is None:
+        return None
+    if value.strip().isdigit():
+        return float(value)
+    try:
+        retry_at = parsedate_to_datetime(value)
+    except (TypeError, ValueError):
+        return None
+    return max(retry_at.timestamp() - (now or time.time()), 0)
+
+
+class HostState:
+    def __init__(self, rate, burst):
+        self.rate = rate
+        self.tokens = burst
+        self.updated = time.monotonic()
+        self.paused_until = 0
+        self.waiting = []
+        self.latency = None
+        self.best_latency = None
+        self.completed = 0
+        self.throttled = 0
+
+
+class Scheduler:
+    """Темп запросов к каждому хосту: корзина токенов с адаптивной скоростью.
+
+    Скорость хоста растёт, пока задержка ответов не увеличивается, и
+    падает при росте задержки и ответах 429/503; Retry-After
+    приостанавливает все запросы к хосту. Ожидающие токена запросы
+    обслуживаются по приоритету: новые страницы раньше перепроверок кеша.
+    """
+
+    def __init__(
+        self, rate=HOST_RATE, burst=HOST_BURST, min_rate=HOST_MIN_RATE,
+        max_rate=HOST_MAX_RATE
+    ):
+        self.rate = rate
+        self.burst = burst
+        self.min_rate = min_rate
+        self.max_rate = max_rate
+        self.condition = threading.Condition()
+        self.hosts = {}
+        self.tickets = itertools.count()
+        self.started = time.monotonic()
+
+    def get_host(self, host):
+        if host not in self.hosts:
+            self.hosts[host] = HostState(self.rate, self.burst)
+        return self.hosts[host]
+
+    def refill(self, state, now):
+        state.tokens = min(
+            self.burst, state.tokens + (now - state.updated) * state.rate
+        )
+        state.updated = now
+
+    def get_delay(self, state, now):
+        self.refill(state, now)
+        return max(
+            state.paused_until - now,
+            (1 - state.tokens) / state.rate if state.tokens < 1 else 0
+        )
+
+    def acquire(self, host, priority=PRIORITY_FETCH):
+        """Ждёт очереди и токена для запроса к host."""
+        with self.condition:
+            state = self.get_host(host)
+            ticket = (priority, next(self.tickets))
+            heapq.heappush(state.waiting, ticket)
+            while True:
+                if state.waiting[0] != ticket:
+                    self.condition.wait()
+                    continue
+                delay = self.get_delay(state, time.monotonic())
+                if delay <= 0:
+                    break
+                self.condition.wait(delay)
+            heapq.heappop(state.waiting)
+            state.tokens -= 1
+            self.condition.notify_all()
+
+    def observe(self, host, latency, status):
+        """Учитывает задержку завершённого запроса к host.
+
+        Ответы 429/503 учитываются отдельно, через throttled().
+        """
+        with self.condition:
+            state = self.get_host(host)
+            self.refill(state, time.monotonic())
+            state.completed += 1
+            if status not in THROTTLE_STATUSES:
+                self.adapt(state, latency)
+            self.condition.notify_all()
+
+    def throttled(self, host, retry_after=None):
+        """Снижает темп после ответа 429/503 и выдерживает Retry-After."""
+        with self.condition:
+            state = self.get_host(host)
+            now = time.monotonic()
+            self.refill(state, now)
+            state.throttled += 1
+            state.rate = max(self.min_rate, state.rate * RATE_DECREASE)
+            state.tokens = min(state.tokens, 0)
+            pause = parse_retry_after(retry_after)
+            if pause is not None:
+                state.paused_until = max(state.paused_until, now + pause)
+            self.condition.notify_all()
+
+    def adapt(self, state, latency):
+        state.best_latency = min(state.best_latency or latency, latency)
+        state.latency = latency if state.latency is None else (
+            state.latency + (latency - state.latency) * LATENCY_SMOOTHING
+        )
+        if state.latency > state.best_latency * LATENCY_FACTOR:
+            state.rate = max(self.min_rate, state.rate * RATE_DECREASE)
+            # Следующее снижение - только после нового роста задержки.
+            state.latency = state.best_latency
+        else:
+            state.rate = min(self.max_rate, state.rate + RATE_INCREASE)
+
+    def queue_depth(self):
+        with self.condition:
+            return sum(len(state.waiting) for state in self.hosts.values())
+
+    def get_stats(self):
+        elapsed = time.monotonic() - self.started
+        with self.condition:
+            return [
+                HostStats(
+                    host, state.rate, len(state.waiting), state.completed,
+                    state.throttled, state.completed / elapsed
+                )
+                for host, state in sorted(self.hosts.items())
+            ]
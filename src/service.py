@@ -0,0 +1,161 @@
+import datetime as dt
+import json
+import logging
+import threading
+from functools import partial
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import urlparse
+
+SERVICE_STARTED = 'Сервис запущен: http://{host}:{port}/'
+SERVICE_STOPPED = 'Сервис остановлен.'
+REFRESH_FAILURE = 'Ошибка обновления {mode}: {error}'
+REFRESHED = 'Обновлено {mode}: {count} строк за {elapsed:.1f} с'
+NOT_READY = 'Данные ещё загружаются'
+UNKNOWN_MODE = 'Нет такого режима: {mode}'
+NOT_READY_RETRY_AFTER = 5
+
+
+class ParserService:
+    """Результаты режимов парсера в памяти с фоновым обновлением.
+
+    Одна сессия с кешем и пулом соединений живёт всё время работы
+    сервиса. Режимы по очереди перезапускаются раз в interval секунд,
+    ответ каждого сразу сериализуется в JSON, поэтому запрос к сервису
+    только отдаёт готовые байты.
+    """
+
+    def __init__(
+        self, session, cli_args, modes, interval, after_refresh=None
+    ):
+        self.session = session
+        self.cli_args = cli_args
+        self.modes = modes
+        self.interval = interval
+        self.after_refresh = after_refresh
+        self.lock = threading.Lock()
+        self.results = {}
+        self.updated = {}
+        self.stopped = threading.Event()
+        self.thread = None
+
+    def refresh(self, mode):
+        started = dt.datetime.now()
+        rows = iter(self.modes[mode](self.session, self.cli_args))
+        header = next(rows)
+        records = [dict(zip(header, row)) for row in rows]
+        body = json.dumps(
+            {
+                'mode': mode,
+                'updated': started.isoformat(timespec='seconds'),
+                'rows': records,
+            },
+            ensure_ascii=False
+        ).encode('utf-8')
+        with self.lock:
+            self.results[mode] = body
+            self.updated[mode] = started.isoformat(timespec='seconds')
+        logging.info(REFRESHED.format(
+            mode=mode,
+            count=len(records),
+            elapsed=(dt.datetime.now() - started).total_seconds()
+        ))
+
+    def refresh_all(self):
+        for mode in self.modes:
+            try:
+                self.refresh(mode)
+            except Exception as error:
+                logging.exception(
+                    REFRESH_FAILURE.format(mode=mode, error=error)
+                )
+        if self.after_refresh is not None:
+            self.after_refresh()
+
+    def run(self):
+        while not self.stopped.is_set():
+            self.refresh_all()
+            self.stopped.wait(self.interval)
+
+    def start(self):
+        self.thread = threading.Thread(target=self.run, daemon=True)
+        self.thread.start()
+
+    def stop(self):
+        self.stopped.set()
+
+    def get(self, mode):
+        """Готовый JSON режима или None, пока данных ещё нет."""
+        with self.lock:
+            return self.results.get(mode)
+
+    def get_index(self):
+        with self.lock:
+            return json.dumps(
+                {mode: self.updated.get(mode) for mode in self.modes},
+                ensure_ascii=False
+            ).encode('utf-8')
+
+
+class ServiceHandler(BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'
+
+    def __init__(self, service, *args, **kwargs):
+        self.service = service
+        super().__init__(*args, **kwargs)
+
+    def do_GET(self):
+        mode = urlparse(self.path).path.strip('/')
+        if not mode:
+            self.send_json(200, self.service.get_index())
+        elif mode not in self.service.modes:
+            self.send_error_json(404, UNKNOWN_MODE.format(mode=mode))
+        elif self.service.get(mode) is None:
+            self.send_error_json(
+                503, NOT_READY, {'Retry-After': NOT_READY_RETRY_AFTER}
+            )
+        else:
+            self.send_json(200, self.service.get(mode))
+
+    def send_error_json(self, status, message, headers=None):
+        self.send_json(
+            status,
+            json.dumps({'error': message}, ensure_ascii=False).encode('utf-8'),
+            headers
+        )
+
+    def send_json(self, status, body, headers=None):
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json; charset=utf-8')
+        self.send_header('Content-Length', str(len(body)))
+        for name, value in (headers or {}).items():
+            self.send_header(name, str(value))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        logging.debug(format, *args)
+
+
+class ServiceServer(ThreadingHTTPServer):
+    daemon_threads = True
+
+
+def make_server(service, host, port):
+    return ServiceServer((host, port), partial(ServiceHandler, service))
+
+
+def serve(service, host, port):
+    """Запускает фоновое обновление и отвечает на запросы до Ctrl+C."""
+    server = make_server(service, host, port)
+    service.start()
+    logging.info(SERVICE_STARTED.format(
+        host=host, port=server.server_address[1]
+    ))
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        service.stop()
+        server.server_close()
+        logging.info(SERVICE_STOPPED)
@@ -0,0 +1,112 @@
+import hashlib
+import threading
+import time
+from contextlib import contextmanager
+from pathlib import Path
+
+import requests_cache
+
+from constants import LOCK_STRIPES
+
+try:
+    import fcntl
+except ImportError:
+    fcntl = None
+    import msvcrt
+
+LOCK_RETRY_DELAY = 0.05
+
+
+def try_lock(file, blocking):
+    if fcntl is not None:
+        try:
+            fcntl.flock(
+                file.fileno(),
+                fcntl.LOCK_EX if blocking else fcntl.LOCK_EX | fcntl.LOCK_NB
+            )
+        except BlockingIOError:
+            return False
+        return True
+    file.seek(0)
+    try:
+        msvcrt.locking(file.fileno(), msvcrt.LK_NBLCK, 1)
+    except OSError:
+        if not blocking:
+            return False
+        time.sleep(LOCK_RETRY_DELAY)
+        return try_lock(file, blocking)
+    return True
+
+
+def unlock(file):
+    if fcntl is not None:
+        fcntl.flock(file.fileno(), fcntl.LOCK_UN)
+        return
+    file.seek(0)
+    msvcrt.locking(file.fileno(), msvcrt.LK_UNLCK, 1)
+
+
+class KeyLocks:
+    """Блокировки ключей кеша между процессами на файлах общего каталога.
+
+    Ключи распределяются по stripes файлам блокировок, поэтому число
+    файлов не растёт с числом страниц. Каждый вход открывает файл заново,
+    так что блокировка действует и между потоками одного процесса.
+    """
+
+    def __init__(self, directory, stripes=LOCK_STRIPES):
+        self.directory = Path(directory)
+        self.directory.mkdir(parents=True, exist_ok=True)
+        self.stripes = stripes
+
+    def get_path(self, key):
+        stripe = int(hashlib.sha1(key.encode()).hexdigest(), 16) % self.stripes
+        return self.directory / f'{stripe:04d}.lock'
+
+    @contextmanager
+    def lock(self, key):
+        """Отдаёт True, если пришлось ждать, пока ключ освободится."""
+        with open(self.get_path(key), 'a+b') as file:
+            waited = not try_lock(file, blocking=False)
+            if waited:
+                try_lock(file, blocking=True)
+            try:
+                yield waited
+            finally:
+                unlock(file)
+
+
+class SharedCachedSession(requests_cache.CachedSession):
+    """CachedSession, согласующая запросы с другими процессами.
+
+    Запрос держит блокировку своего ключа кеша с поиска в кеше до
+    сохранения ответа. Одновременный запрос того же адреса из другого
+    процесса ждёт её и затем находит ответ в общем кеше, не обращаясь
+    к сети. Вложенные вызовы send() того же потока (переходы по
+    перенаправлениям) выполняются под блокировкой исходного запроса:
+    поток держит не больше одной блокировки и не ждёт сам себя.
+    """
+
+    def __init__(self, *args, locks=None, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.locks = locks
+        self.holding = threading.local()
+        self.stats_lock = threading.Lock()
+        self.waited = 0
+        self.coalesced = 0
+
+    def send(self, request, **kwargs):
+        if self.locks is None or getattr(self.holding, 'lock', False):
+            return super().send(request, **kwargs)
+        key = self.cache.create_key(request, **kwargs)
+        with self.locks.lock(key) as waited:
+            self.holding.lock = True
+            try:
+                response = super().send(request, **kwargs)
+            finally:
+                self.holding.lock = False
+        if waited:
+            with self.stats_lock:
+                self.waited += 1
+                self.coalesced += getattr(response, 'from_cache', False)
+        return response
@@ -0,0 +1,107 @@
+import sqlite3
+import time
+from collections import namedtuple
+
+Snapshot = namedtuple('Snapshot', 'id mode taken_at')
+SnapshotChange = namedtuple('SnapshotChange', 'key old new')
+
+CREATE_TABLES = (
+    'CREATE TABLE IF NOT EXISTS snapshot ('
+    'id INTEGER PRIMARY KEY, mode TEXT, taken_at REAL)',
+    'CREATE INDEX IF NOT EXISTS snapshot_mode ON snapshot (mode, id)',
+    'CREATE TABLE IF NOT EXISTS snapshot_value ('
+    'mode TEXT, key TEXT, value TEXT, added INTEGER, removed INTEGER)',
+    'CREATE INDEX IF NOT EXISTS snapshot_value_added '
+    'ON snapshot_value (added)',
+    'CREATE INDEX IF NOT EXISTS snapshot_value_removed '
+    'ON snapshot_value (removed)',
+    'CREATE INDEX IF NOT EXISTS snapshot_value_current '
+    'ON snapshot_value (mode, key) WHERE removed IS NULL',
+)
+INSERT_SNAPSHOT = 'INSERT INTO snapshot (mode, taken_at) VALUES (?, ?)'
+SELECT_LATEST = (
+    'SELECT * FROM snapshot WHERE mode = ? ORDER BY id DESC LIMIT 1'
+)
+SELECT_CURRENT = (
+    'SELECT key, value FROM snapshot_value '
+    'WHERE mode = ? AND removed IS NULL'
+)
+SELECT_AT = (
+    'SELECT key, value FROM snapshot_value '
+    'WHERE mode = ? AND added <= ? AND (removed IS NULL OR removed > ?)'
+)
+SELECT_ADDED = 'SELECT key, value FROM snapshot_value WHERE added = ?'
+SELECT_REMOVED = 'SELECT key, value FROM snapshot_value WHERE removed = ?'
+CLOSE_VALUE = (
+    'UPDATE snapshot_value SET removed = ? '
+    'WHERE mode = ? AND key = ? AND removed IS NULL'
+)
+INSERT_VALUE = 'INSERT INTO snapshot_value VALUES (?, ?, ?, ?, NULL)'
+
+
+class SnapshotStore:
+    """Снимки результатов режимов по запускам в SQLite.
+
+    Значение ключа хранится одной строкой с номерами снимков, в которых
+    оно появилось и сменилось, поэтому снимок записывает только изменения,
+    а изменения снимка читаются по индексу без просмотра остальных строк.
+    """
+
+    def __init__(self, path):
+        self.connection = sqlite3.connect(str(path))
+        with self.connection:
+            for statement in CREATE_TABLES:
+                self.connection.execute(statement)
+
+    def save(self, mode, values):
+        """Сохраняет снимок {ключ: значение} режима, возвращает Snapshot.
+
+        Значение None означает, что в этом запуске значение ключа
+        получить не удалось: ключ сохраняет прежнее значение.
+        """
+        with self.connection:
+            current = dict(self.connection.execute(SELECT_CURRENT, (mode,)))
+            values = {
+                key: current.get(key) if value is None else value
+                for key, value in values.items()
+            }
+            taken_at = time.time()
+            snapshot_id = self.connection.execute(
+                INSERT_SNAPSHOT, (mode, taken_at)
+            ).lastrowid
+            self.connection.executemany(CLOSE_VALUE, (
+                (snapshot_id, mode, key)
+                for key, value in current.items()
+                if values.get(key) != value
+            ))
+            self.connection.executemany(INSERT_VALUE, (
+                (mode, key, value, snapshot_id)
+                for key, value in values.items()
+                if value is not None and current.get(key) != value
+            ))
+        return Snapshot(snapshot_id, mode, taken_at)
+
+    def get_latest(self, mode):
+        row = self.connection.execute(SELECT_LATEST, (mode,)).fetchone()
+        return None if row is None else Snapshot(*row)
+
+    def load(self, snapshot):
+        """Все значения режима на момент снимка."""
+        return dict(self.connection.execute(
+            SELECT_AT, (snapshot.mode, snapshot.id, snapshot.id)
+        ))
+
+    def changes(self, snapshot):
+        """Изменения снимка относительно предыдущего снимка того же режима.
+
+        Для новых ключей old равно None, для пропавших - new.
+        """
+        old = dict(self.connection.execute(SELECT_REMOVED, (snapshot.id,)))
+        new = dict(self.connection.execute(SELECT_ADDED, (snapshot.id,)))
+        return [
+            SnapshotChange(key, old.get(key), new.get(key))
+            for key in sorted(old.keys() | new.keys())
+        ]
+
+    def close(self):
+        self.connection.close()
@@ -0,0 +1,36 @@
+import sqlite3
+from collections import namedtuple
+
+PepState = namedtuple(
+    'PepState',
+    'pep_link abbr_status validator content_hash card_status checked_at'
+)
+
+CREATE_TABLE = (
+    'CREATE TABLE IF NOT EXISTS pep_state ('
+    'pep_link TEXT PRIMARY KEY, abbr_status TEXT, validator TEXT, '
+    'content_hash TEXT, card_status TEXT, checked_at REAL)'
+)
+SELECT_ALL = 'SELECT * FROM pep_state'
+UPSERT = 'INSERT OR REPLACE INTO pep_state VALUES (?, ?, ?, ?, ?, ?)'
+
+
+class PepStateStore:
+    """Состояние карточек PEP с прошлых запусков в SQLite."""
+
+    def __init__(self, path):
+        self.connection = sqlite3.connect(str(path))
+        self.connection.execute(CREATE_TABLE)
+
+    def load(self):
+        return {
+            row[0]: PepState(*row)
+            for row in self.connection.execute(SELECT_ALL)
+        }
+
+    def save(self, states):
+        with self.connection:
+            self.connection.executemany(UPSERT, states)
+
+    def close(self):
+        self.connection.close()
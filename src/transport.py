@@ -0,0 +1,160 @@
+import random
+import threading
+import time
+
+from urllib.parse import urlparse
+
+from requests.adapters import DEFAULT_POOLSIZE, HTTPAdapter
+from urllib3.util.request import ACCEPT_ENCODING
+from urllib3.util.retry import Retry
+
+from constants import (
+    CONNECT_TIMEOUT, HOST_RATE, READ_TIMEOUT, RETRY_BACKOFF_FACTOR,
+    RETRY_JITTER, RETRY_STATUSES, RETRY_TOTAL
+)
+from scheduler import (
+    PRIORITY_FETCH, PRIORITY_REVALIDATE, THROTTLE_STATUSES, Scheduler
+)
+
+DEFAULT_TIMEOUT = (CONNECT_TIMEOUT, READ_TIMEOUT)
+
+
+REVALIDATION_HEADERS = ('If-None-Match', 'If-Modified-Since')
+
+
+class JitterRetry(Retry):
+    """Экспоненциальная задержка между повторами со случайной добавкой.
+
+    Каждый ответ 429/503, в том числе последний, передаётся scheduler.
+    """
+
+    def __init__(self, *args, scheduler=None, **kwargs):
+        self.scheduler = scheduler
+        super().__init__(*args, **kwargs)
+
+    def new(self, **kwargs):
+        return super().new(scheduler=self.scheduler, **kwargs)
+
+    def increment(
+        self, method=None, url=None, response=None, error=None, _pool=None,
+        _stacktrace=None
+    ):
+        if (
+            self.scheduler is not None and _pool is not None
+            and response is not None and response.status in THROTTLE_STATUSES
+        ):
+            self.scheduler.throttled(
+                _pool.host, response.headers.get('Retry-After')
+            )
+        return super().increment(
+            method, url, response, error, _pool, _stacktrace
+        )
+
+    def get_backoff_time(self):
+        backoff = super().get_backoff_time()
+        if not backoff:
+            return backoff
+        return backoff + random.uniform(0, RETRY_JITTER)
+
+
+def get_priority(request):
+    if any(header in request.headers for header in REVALIDATION_HEADERS):
+        return PRIORITY_REVALIDATE
+    return PRIORITY_FETCH
+
+
+class TransportAdapter(HTTPAdapter):
+    """HTTPAdapter с таймаутами по умолчанию, повторами и учётом соединений.
+
+    С scheduler каждый запрос по сети ждёт своей очереди к хосту, а
+    задержка и статус ответа подстраивают темп запросов к нему.
+    """
+
+    __attrs__ = HTTPAdapter.__attrs__ + ['timeout', 'scheduler']
+
+    def __init__(
+        self, pool_size=DEFAULT_POOLSIZE, timeout=DEFAULT_TIMEOUT,
+        retries=RETRY_TOTAL, backoff_factor=RETRY_BACKOFF_FACTOR,
+        scheduler=None
+    ):
+        self.timeout = timeout
+        self.scheduler = scheduler
+        super().__init__(
+            pool_maxsize=pool_size,
+            max_retries=JitterRetry(
+                total=retries,
+                backoff_factor=backoff_factor,
+                status_forcelist=RETRY_STATUSES,
+                raise_on_status=False,
+                scheduler=scheduler,
+            )
+        )
+
+    def send(self, request, timeout=None, **kwargs):
+        timeout = timeout or self.timeout
+        if self.scheduler is None:
+            return super().send(request, timeout=timeout, **kwargs)
+        host = urlparse(request.url).hostname
+        self.scheduler.acquire(host, get_priority(request))
+        started = time.monotonic()
+        response = super().send(request, timeout=timeout, **kwargs)
+        self.scheduler.observe(
+            host, time.monotonic() - started, response.status_code
+        )
+        return response
+
+    def get_stats(self):
+        """Возвращает (число запросов, число новых соединений)."""
+        pools = [
+            self.poolmanager.pools[key]
+            for key in self.poolmanager.pools.keys()
+        ]
+        return (
+            sum(pool.num_requests for pool in pools),
+            sum(pool.num_connections for pool in pools),
+        )
+
+
+class BandwidthLimiter:
+    """Общее для всех потоков ограничение скорости загрузки, байт/с.
+
+    Каждый полученный блок занимает следующий свободный интервал времени
+    длиной size / rate, поток ждёт окончания своего интервала.
+    """
+
+    def __init__(self, rate):
+        self.rate = rate
+        self.lock = threading.Lock()
+        self.available_at = time.monotonic()
+
+    def consume(self, size):
+        with self.lock:
+            now = time.monotonic()
+            self.available_at = max(self.available_at, now) + size / self.rate
+            delay = self.available_at - now
+        time.sleep(delay)
+
+
+def mount_transport(session, workers, rate=HOST_RATE):
+    adapter = TransportAdapter(
+        pool_size=max(workers, DEFAULT_POOLSIZE),
+        scheduler=Scheduler(rate) if rate else None
+    )
+    for prefix in ('http://', 'https://'):
+        session.mount(prefix, adapter)
+    session.headers['Accept-Encoding'] = ACCEPT_ENCODING
+    return adapter
+
+
+def get_transport_stats(session):
+    adapter = session.get_adapter('https://')
+    if not isinstance(adapter, TransportAdapter):
+        return None
+    return adapter.get_stats()
+
+
+def get_scheduler_stats(session):
+    adapter = session.get_adapter('https://')
+    if getattr(adapter, 'scheduler', None) is None:
+        return None
+    return adapter.scheduler.get_stats()
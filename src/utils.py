@@ -1,15 +1,45 @@
-from bs4 import BeautifulSoup
+import hashlib
+import json
+import os
+import sys
+import zipfile
+from collections import deque
+from concurrent.futures import (
+    Future, ProcessPoolExecutor, ThreadPoolExecutor
+)
+from functools import partial
+from threading import BoundedSemaphore
+from urllib.parse import urlparse
+
 from requests import RequestException
 
+from constants import (
+    DEFAULT_PROCESSES, DEFAULT_WORKERS, DOWNLOAD_CHUNK_SIZE, ENGINE_ASYNC,
+    ENGINE_THREADS, HOST_CONNECTIONS_LIMIT, PARTIAL_SUFFIX, VALIDATORS_SUFFIX
+)
 from exceptions import ParserFindTagException
+from profiling import (
+    PROFILER, STAGE_DECODE, STAGE_DOWNLOAD, STAGE_NETWORK, STAGE_PAGE,
+    STAGE_PARSE
+)
 
 CONNECTION_ERROR = ('Ошибка подключения: {error} URL: {url}')
 TAG_NOT_FOUND = ('Не найден тег {tag} {attrs}')
+INCOMPLETE_DOWNLOAD = (
+    'Загрузка прервана: получено {size} из {length} байт URL: {url}'
+)
+CHECKSUM_MISMATCH = (
+    'Контрольная сумма {checksum} не совпадает с опубликованной {expected} '
+    'URL: {url}'
+)
+DOWNLOAD_HEADERS = {'Cache-Control': 'no-store', 'Accept-Encoding': 'identity'}
 
 
-def get_response(session, url, coding='utf-8'):
+def get_response(session, url, coding='utf-8', **kwargs):
     try:
-        response = session.get(url)
+        with PROFILER.stage(STAGE_NETWORK, url) as details:
+            response = session.get(url, **kwargs)
+            details['from_cache'] = getattr(response, 'from_cache', False)
         response.encoding = coding
         return response
     except RequestException as error:
@@ -21,6 +51,12 @@ def get_response(session, url, coding='utf-8'):
         )
 
 
+def get_text(session, url):
+    response = get_response(session, url)
+    with PROFILER.stage(STAGE_DECODE):
+        return response.text
+
+
 def find_tag(soup, tag, attrs=None):
     searched_tag = soup.find(tag, attrs=(attrs or {}))
     if searched_tag is None:
@@ -30,5 +66,357 @@ def find_tag(soup, tag, attrs=None):
     return searched_tag
 
 
-def cook_soup(session, url, features='lxml'):
-    return BeautifulSoup(get_response(session, url).text, features)
+def make_soup(text, features='lxml', parse_only=None):
+    from bs4 import BeautifulSoup
+
+    with PROFILER.stage(STAGE_PARSE):
+        return BeautifulSoup(text, features, parse_only=parse_only)
+
+
+def make_tree(text):
+    from lxml import html
+
+    with PROFILER.stage(STAGE_PARSE):
+        return html.document_fromstring(text)
+
+
+def cook_soup(session, url, features='lxml', parse_only=None):
+    return make_soup(get_text(session, url), features, parse_only)
+
+
+def find_node(tree, xpath):
+    nodes = tree.xpath(xpath)
+    if not nodes:
+        raise ParserFindTagException(
+            TAG_NOT_FOUND.format(tag=xpath, attrs=None)
+        )
+    return nodes[0]
+
+
+def fetch_pages(
+    session, urls, extract, workers=DEFAULT_WORKERS,
+    host_limit=HOST_CONNECTIONS_LIMIT, engine=ENGINE_THREADS
+):
+    """Применяет extract(session, url) к каждой ссылке.
+
+    Отдаёт пары (результат, ошибка подключения) в порядке urls,
+    независимо от числа потоков. Движок ENGINE_ASYNC сначала загружает
+    все страницы в кеш сессии через asyncio, а extract затем читает их
+    из кеша в одном потоке.
+    """
+    host_semaphores = {
+        urlparse(url).netloc: BoundedSemaphore(host_limit) for url in urls
+    }
+    prefetch_errors = {}
+
+    def fetch(url):
+        if url in prefetch_errors:
+            return None, ConnectionError(CONNECTION_ERROR.format(
+                error=prefetch_errors[url], url=url
+            ))
+        with host_semaphores[urlparse(url).netloc]:
+            try:
+                with PROFILER.stage(STAGE_PAGE, url):
+                    return extract(session, url), None
+            except ConnectionError as error:
+                return None, error
+
+    if engine == ENGINE_ASYNC:
+        from async_engine import prefetched
+
+        with prefetched(session, urls, workers, host_limit) as errors:
+            prefetch_errors.update(errors)
+            yield from map(fetch, urls)
+        return
+    if workers <= 1:
+        yield from map(fetch, urls)
+        return
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        yield from executor.map(fetch, urls)
+
+
+def get_page_key(memo, parse, url, response):
+    validator = (
+        get_response_validator(response)
+        or hashlib.sha1(response.content).hexdigest()
+    )
+    return memo.get_key(
+        f'{parse.__module__}.{parse.__qualname__}', url, validator
+    )
+
+
+def cook_page(session, url, parse, memo=None):
+    if memo is None:
+        return parse(get_text(session, url))
+    response = get_response(session, url)
+    key = get_page_key(memo, parse, url, response)
+    found, result = memo.get(key)
+    if not found:
+        with PROFILER.stage(STAGE_DECODE):
+            text = response.text
+        result = parse(text)
+        memo.put(key, result)
+    return result
+
+
+def get_page_content(session, url, parse, memo=None):
+    """(ключ в memo, найден ли результат, результат или байты ответа)."""
+    response = get_response(session, url)
+    if memo is None:
+        return None, False, response.content
+    key = get_page_key(memo, parse, url, response)
+    found, result = memo.get(key)
+    return key, found, result if found else response.content
+
+
+def parse_content(parse, content):
+    return parse(content.decode('utf-8', errors='replace'))
+
+
+def get_completed(result):
+    future = Future()
+    future.set_result(result)
+    return future
+
+
+def get_parsed_page(memo, key, parsed, future, error):
+    if error is not None:
+        return None, error
+    result = future.result()
+    if parsed and key is not None:
+        memo.put(key, result)
+    return result, None
+
+
+def fetch_parsed_pages(
+    session, urls, parse, processes=DEFAULT_PROCESSES, memo=None,
+    **fetch_options
+):
+    """Загружает страницы как fetch_pages и применяет к тексту parse(text).
+
+    При processes > 1 загрузка остаётся в этом процессе, а байты ответов
+    разбираются в пуле процессов, обратно возвращается только результат
+    parse. parse должна быть функцией уровня модуля. С memo (ParsedCache)
+    страницы, чей ответ не изменился, не разбираются повторно. Пары
+    (результат, ошибка подключения) отдаются в порядке urls по мере
+    готовности.
+    """
+    if processes <= 1:
+        yield from fetch_pages(
+            session, urls, partial(cook_page, parse=parse, memo=memo),
+            **fetch_options
+        )
+        return
+    with ProcessPoolExecutor(max_workers=processes) as pool:
+        pending = deque()
+        for page, error in fetch_pages(
+            session, urls, partial(get_page_content, parse=parse, memo=memo),
+            **fetch_options
+        ):
+            key, found, value = (None, True, None) if error else page
+            pending.append((
+                key,
+                not found,
+                get_completed(value) if found
+                else pool.submit(parse_content, parse, value),
+                error
+            ))
+            while pending and pending[0][2].done():
+                yield get_parsed_page(memo, *pending.popleft())
+        while pending:
+            yield get_parsed_page(memo, *pending.popleft())
+
+
+def get_response_validator(response):
+    return response.headers.get('ETag') or response.headers.get(
+        'Last-Modified'
+    )
+
+
+def read_validators(path):
+    validators_path = path.with_name(path.name + VALIDATORS_SUFFIX)
+    if not path.exists() or not validators_path.exists():
+        return {}
+    return json.loads(validators_path.read_text(encoding='utf-8'))
+
+
+def write_validators(path, validators):
+    path.with_name(path.name + VALIDATORS_SUFFIX).write_text(
+        json.dumps(validators), encoding='utf-8'
+    )
+
+
+def get_validators(response):
+    return {
+        'etag': response.headers.get('ETag'),
+        'length': int(response.headers.get('Content-Length', -1)),
+    }
+
+
+def has_saved_file(file_path, saved):
+    """Файл на месте и его размер совпадает с сохранённым при загрузке."""
+    return bool(saved) and file_path.stat().st_size == saved['length']
+
+
+def is_up_to_date(file_path, saved, response):
+    if not has_saved_file(file_path, saved):
+        return False
+    if response.status_code == 304:
+        return True
+    return response.status_code == 200 and get_validators(response) == {
+        key: saved.get(key) for key in ('etag', 'length')
+    }
+
+
+def is_verified(file_path, saved, checksum):
+    return (
+        checksum is not None
+        and saved.get('sha256') == checksum
+        and file_path.stat().st_size == saved['length']
+    )
+
+
+def hash_file(path, chunk_size=DOWNLOAD_CHUNK_SIZE):
+    digest = hashlib.sha256()
+    with open(path, 'rb') as file:
+        for chunk in iter(partial(file.read, chunk_size), b''):
+            digest.update(chunk)
+    return digest
+
+
+def get_download_headers(file_path, saved, validators, part_path):
+    headers = dict(DOWNLOAD_HEADERS)
+    if saved.get('etag') and has_saved_file(file_path, saved):
+        headers['If-None-Match'] = saved['etag']
+    if validators.get('etag'):
+        headers['Range'] = f'bytes={part_path.stat().st_size}-'
+        headers['If-Range'] = validators['etag']
+    return headers
+
+
+def request_download(session, url, file_path, saved, headers):
+    """Ответ на запрос загрузки.
+
+    304 для файла, который не совпадает с сохранённым, не содержит
+    данных: запрос повторяется без условных заголовков и Range.
+    """
+    response = get_response(session, url, headers=headers, stream=True)
+    if (
+        response.status_code != 304
+        or is_up_to_date(file_path, saved, response)
+    ):
+        return response
+    response.close()
+    return get_response(
+        session, url, headers=dict(DOWNLOAD_HEADERS), stream=True
+    )
+
+
+def check_status(response, part_path, url):
+    """Переводит ошибку HTTP загрузки в ConnectionError.
+
+    Ответ 416 на Range-запрос означает, что временный файл не подходит
+    к архиву на сервере: он удаляется, следующий запуск начнёт заново.
+    """
+    try:
+        response.raise_for_status()
+    except RequestException as error:
+        if response.status_code == 416:
+            part_path.unlink(missing_ok=True)
+            part_path.with_name(
+                part_path.name + VALIDATORS_SUFFIX
+            ).unlink(missing_ok=True)
+        raise ConnectionError(CONNECTION_ERROR.format(error=error, url=url))
+
+
+def check_download(part_path, validators, digest, checksum, url):
+    size = part_path.stat().st_size
+    if validators['length'] not in (-1, size):
+        raise ConnectionError(INCOMPLETE_DOWNLOAD.format(
+            size=size, length=validators['length'], url=url
+        ))
+    if checksum is not None and digest.hexdigest() != checksum:
+        part_path.unlink()
+        raise ConnectionError(CHECKSUM_MISMATCH.format(
+            checksum=digest.hexdigest(), expected=checksum, url=url
+        ))
+    return size
+
+
+def download_file(
+    session, url, file_path, chunk_size=DOWNLOAD_CHUNK_SIZE, checksum=None,
+    limiter=None
+):
+    """Потоково скачивает url в file_path.
+
+    Данные пишутся во временный файл, который затем атомарно
+    переименовывается. Прерванная загрузка продолжается Range-запросом,
+    а совпадение ETag и Content-Length с уже скачанным файлом отменяет
+    загрузку. Ответ не сохраняется в кеше requests_cache.
+    SHA-256 считается по ходу загрузки и сверяется с checksum, если
+    он известен; файл с совпавшей суммой больше не запрашивается.
+    limiter (BandwidthLimiter) ограничивает скорость записи.
+    Возвращает False, если файл уже актуален.
+    """
+    part_path = file_path.with_name(file_path.name + PARTIAL_SUFFIX)
+    saved = read_validators(file_path)
+    if is_verified(file_path, saved, checksum):
+        return False
+    validators = read_validators(part_path)
+    headers = get_download_headers(file_path, saved, validators, part_path)
+
+    with request_download(
+        session, url, file_path, saved, headers
+    ) as response:
+        if is_up_to_date(file_path, saved, response):
+            return False
+        check_status(response, part_path, url)
+        if response.status_code == 206:
+            mode, digest = 'ab', hash_file(part_path, chunk_size)
+        else:
+            mode, digest = 'wb', hashlib.sha256()
+            validators = get_validators(response)
+            write_validators(part_path, validators)
+        try:
+            with PROFILER.stage(STAGE_DOWNLOAD), open(part_path, mode) as file:
+                for chunk in response.iter_content(chunk_size):
+                    file.write(chunk)
+                    digest.update(chunk)
+                    if limiter is not None:
+                        limiter.consume(len(chunk))
+        except RequestException as error:
+            raise ConnectionError(
+                CONNECTION_ERROR.format(error=error, url=url)
+            )
+
+    size = check_download(part_path, validators, digest, checksum, url)
+    validators.update(length=size, sha256=digest.hexdigest())
+    write_validators(part_path, validators)
+    os.replace(part_path, file_path)
+    os.replace(
+        part_path.with_name(part_path.name + VALIDATORS_SUFFIX),
+        file_path.with_name(file_path.name + VALIDATORS_SUFFIX)
+    )
+    return True
+
+
+def list_archive(path):
+    """Файлы zip-архива по его центральному каталогу, без распаковки:
+    (имя, размер, сжатый размер, CRC)."""
+    with zipfile.ZipFile(path) as archive:
+        return [
+            (info.filename, info.file_size, info.compress_size, info.CRC)
+            for info in archive.infolist()
+        ]
+
+
+def progress(iterable, total=None, desc=None):
+    """Полоса прогресса tqdm в терминале, без терминала - сам iterable.
+
+    tqdm импортируется только при выводе в терминал.
+    """
+    if not sys.stderr.isatty():
+        return iterable
+    from tqdm import tqdm
+
+    return tqdm(iterable, total=total, desc=desc)
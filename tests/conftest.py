@@ -1,6 +1,13 @@
+import hashlib
 import pytest
 import sys
+import time
+from fnmatch import fnmatchcase
+from functools import partial
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from socketserver import StreamRequestHandler, ThreadingTCPServer
 from pathlib import Path
+from threading import Thread
 from bs4 import BeautifulSoup
 import requests_mock
 from argparse import Namespace
@@ -72,6 +79,340 @@ def mock_session(tempfile_session) -> CachedSession:
     yield mount_mock_adapter(tempfile_session)
 
 
+class LocalSiteHandler(BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'
+    disable_nagle_algorithm = True
+
+    def __init__(self, pages, delay, requests_log, *args, **kwargs):
+        self.pages = pages
+        self.delay = delay
+        self.requests_log = requests_log
+        super().__init__(*args, **kwargs)
+
+    def do_GET(self):
+        self.requests_log.append((self.path, dict(self.headers)))
+        time.sleep(self.delay)
+        page = self.pages.get(self.path, 404)
+        if isinstance(page, list):
+            page = page.pop(0) if len(page) > 1 else page[0]
+        if isinstance(page, int):
+            self.send_error(page)
+            return
+        if isinstance(page, tuple):
+            status, location = page
+            self.send_response(status)
+            self.send_header('Location', location)
+            self.send_header('Content-Length', '0')
+            self.end_headers()
+            return
+        body = page if isinstance(page, bytes) else page.encode('utf-8')
+        etag = '"{}"'.format(hashlib.md5(body).hexdigest())
+        if self.headers.get('If-None-Match') == etag:
+            self.send_response(304)
+            self.send_header('ETag', etag)
+            self.end_headers()
+            return
+        start = 0
+        if (
+            'Range' in self.headers
+            and self.headers.get('If-Range', etag) == etag
+        ):
+            start = int(self.headers['Range'][len('bytes='):].split('-')[0])
+        self.send_response(206 if start else 200)
+        self.send_header('Content-Type', 'text/html; charset=utf-8')
+        self.send_header('Content-Length', str(len(body) - start))
+        self.send_header('ETag', etag)
+        if start:
+            self.send_header(
+                'Content-Range', f'bytes {start}-{len(body) - 1}/{len(body)}'
+            )
+        self.end_headers()
+        self.wfile.write(body[start:])
+
+    def log_message(self, *args):
+        pass
+
+
+class LocalSiteServer(ThreadingHTTPServer):
+    request_queue_size = 128
+    daemon_threads = True
+
+
+class LocalRedisHandler(StreamRequestHandler):
+    """Subset of the Redis protocol used by the requests_cache backend."""
+
+    def __init__(self, data, *args, **kwargs):
+        self.data = data
+        super().__init__(*args, **kwargs)
+
+    def read_command(self):
+        line = self.rfile.readline()
+        if not line:
+            return None
+        command = []
+        for _ in range(int(line[1:])):
+            size = int(self.rfile.readline()[1:])
+            command.append(self.rfile.read(size + 2)[:-2])
+        return command
+
+    def reply(self, value):
+        if value is None:
+            self.wfile.write(b'$-1\r\n')
+        elif isinstance(value, int):
+            self.wfile.write(b':%d\r\n' % value)
+        elif isinstance(value, list):
+            self.wfile.write(b'*%d\r\n' % len(value))
+            for item in value:
+                self.reply(item)
+        else:
+            self.wfile.write(b'$%d\r\n%s\r\n' % (len(value), value))
+
+    def handle(self):
+        while True:
+            command = self.read_command()
+            if command is None:
+                return
+            name, *args = command
+            self.reply(getattr(self, 'do_' + name.decode().upper())(*args))
+
+    def do_GET(self, key):
+        return self.data.get(key)
+
+    def do_SET(self, key, value, *options):
+        self.data[key] = value
+        return b'OK'
+
+    def do_SETEX(self, key, seconds, value):
+        return self.do_SET(key, value)
+
+    def do_DEL(self, *keys):
+        return sum(self.data.pop(key, None) is not None for key in keys)
+
+    def do_EXISTS(self, *keys):
+        return sum(key in self.data for key in keys)
+
+    def do_STRLEN(self, key):
+        return len(self.data.get(key, b''))
+
+    def do_SCAN(self, cursor, match, pattern, *options):
+        return [b'0', [
+            key for key in list(self.data)
+            if fnmatchcase(key.decode(), pattern.decode())
+        ]]
+
+    def do_HGET(self, name, key):
+        return self.data.get(name, {}).get(key)
+
+    def do_HSET(self, name, key, value):
+        self.data.setdefault(name, {})[key] = value
+        return 1
+
+    def do_HDEL(self, name, *keys):
+        return sum(
+            self.data.get(name, {}).pop(key, None) is not None
+            for key in keys
+        )
+
+    def do_HEXISTS(self, name, key):
+        return int(key in self.data.get(name, {}))
+
+    def do_HLEN(self, name):
+        return len(self.data.get(name, {}))
+
+    def do_HSCAN(self, name, cursor, *options):
+        return [b'0', [
+            item for pair in self.data.get(name, {}).items() for item in pair
+        ]]
+
+
+class LocalRedisServer(ThreadingTCPServer):
+    daemon_threads = True
+    allow_reuse_address = True
+
+
+@pytest.fixture
+def local_redis():
+    """Redis URL of a local stand-in server, data lives in a dict."""
+    server = LocalRedisServer(
+        ('127.0.0.1', 0), partial(LocalRedisHandler, {})
+    )
+    Thread(target=server.serve_forever, daemon=True).start()
+    yield 'redis://127.0.0.1:{}/0'.format(server.server_address[1])
+    server.shutdown()
+    server.server_close()
+
+
+@pytest.fixture
+def local_site():
+    """Local HTTP stand-in with ETag, If-None-Match and Range support.
+
+    Pages are {path: html, bytes, error status or (redirect status,
+    location)}; a list value is served one item per request, the last
+    item repeats. Delay is added to every
+    request, received (path, headers) pairs are appended to requests_log.
+    """
+    servers = []
+
+    def _local_site(pages, delay=0.0, requests_log=None):
+        server = LocalSiteServer(
+            ('127.0.0.1', 0),
+            partial(
+                LocalSiteHandler, pages, delay,
+                [] if requests_log is None else requests_log
+            )
+        )
+        Thread(target=server.serve_forever, daemon=True).start()
+        servers.append(server)
+        return 'http://127.0.0.1:{}/'.format(server.server_address[1])
+    yield _local_site
+    for server in servers:
+        server.shutdown()
+        server.server_close()
+
+
+def pep_site_type(number):
+    return ('Standards Track', 'Informational')[number % 2]
+
+
+def pep_site_version(number):
+    return ('3.11', '3.12', '3.11, 3.12', '3.10')[number % 4]
+
+
+def pep_site_pages(cards_count):
+    statuses = [('SF', 'Final'), ('IA', 'Active'), ('SR', 'Rejected')]
+    rows = []
+    pages = {}
+    for number in range(1, cards_count + 1):
+        abbr, status = statuses[number % len(statuses)]
+        href = f'pep-{number:04d}/'
+        rows.append(
+            f'<tr><td>{abbr}</td>'
+            f'<td><a class="pep reference internal" href="{href}">'
+            f'{number}</a></td>'
+            f'<td><a class="pep reference internal" href="{href}">'
+            f'PEP title {number}</a></td></tr>'
+        )
+        pages[f'/{href}'] = (
+            f'<html><body><h1 class="page-title">PEP {number} – '
+            f'PEP title {number}</h1>'
+            '<dl class="rfc2822 field-list simple">\n'
+            f'<dt class="field-odd">Author<span>:</span></dt>\n'
+            f'<dd class="field-odd">Author {number}</dd>\n'
+            '<dt class="field-even">Status<span>:</span></dt>\n'
+            f'<dd class="field-even"><abbr>{status}</abbr></dd>\n'
+            '<dt class="field-odd">Type<span>:</span></dt>\n'
+            f'<dd class="field-odd">{pep_site_type(number)}</dd>\n'
+            '<dt class="field-even">Python-Version<span>:</span></dt>\n'
+            f'<dd class="field-even">{pep_site_version(number)}</dd>\n'
+            '</dl></body></html>'
+        )
+    pages['/'] = (
+        '<html><body><section id="numerical-index"><table><tbody>'
+        + ''.join(rows) +
+        '</tbody></table></section></body></html>'
+    )
+    return pages
+
+
+@pytest.fixture
+def pep_site(local_site):
+    def _pep_site(cards_count=12, delay=0.0):
+        return local_site(pep_site_pages(cards_count), delay)
+    return _pep_site
+
+
+@pytest.fixture
+def pep_card_parser(monkeypatch):
+    """Подменяет разбор карточек PEP в main: разобранные тексты
+    добавляются в parsed, карточки со строкой failing не загружаются."""
+    state = Namespace(parsed=[], failing=None)
+
+    def parse(text):
+        if state.failing is not None and state.failing in text:
+            raise ConnectionError('Карточка недоступна')
+        state.parsed.append(text)
+        return main.parse_pep_card_status(text)
+
+    monkeypatch.setitem(main.PEP_CARD_PARSERS, 'bs4', parse)
+    return state
+
+
+def whats_new_site_pages(versions_count):
+    versions = [f'3.{minor}' for minor in range(versions_count, 0, -1)]
+    items = ''.join(
+        f'<li class="toctree-l1"><a href="{version}.html">{version}</a></li>'
+        for version in versions
+    )
+    pages = {
+        f'/{version}.html': (
+            f'<html><body><h1>What’s New In Python {version}</h1>'
+            f'<dl><dt>Editor</dt>\n<dd>Editor {version}</dd></dl>'
+            '<dl><dt>Unused</dt></dl></body></html>'
+        )
+        for version in versions
+    }
+    pages['/'] = (
+        '<html><body><section id="what-s-new-in-python">'
+        '<div class="toctree-wrapper"><ul>'
+        f'{items}<li class="toctree-l1"><a href="changelog.html">'
+        'Changelog</a></li></ul></div></section></body></html>'
+    )
+    return pages
+
+
+@pytest.fixture
+def whats_new_site(local_site):
+    def _whats_new_site(versions_count=8, delay=0.0):
+        return local_site(whats_new_site_pages(versions_count), delay)
+    return _whats_new_site
+
+
+def docs_site_pages(base_url, versions):
+    """Документация нескольких версий: версия видит статьи What's New
+    о себе и предыдущих версиях. Текст статьи во всех версиях один,
+    а обвязка страницы (заголовок окна, переключатель версий) своя."""
+    sidebar = ''.join(
+        f'<li><a href="{base_url}{version}/">Python {version} (stable)</a>'
+        '</li>'
+        for version in versions
+    )
+    pages = {'/': (
+        '<html><body><div class="sphinxsidebarwrapper"><ul>'
+        f'{sidebar}<li><a href="{base_url}versions/">All versions</a></li>'
+        '</ul></div></body></html>'
+    )}
+    for index, version in enumerate(versions):
+        articles = versions[index:]
+        pages[f'/{version}/whatsnew/'] = (
+            '<html><body><section id="what-s-new-in-python">'
+            '<div class="toctree-wrapper"><ul>'
+            + ''.join(
+                f'<li class="toctree-l1"><a href="{article}.html">'
+                f'{article}</a></li>'
+                for article in articles
+            )
+            + '<li class="toctree-l1"><a href="changelog.html">Changelog'
+            '</a></li></ul></div></section></body></html>'
+        )
+        pages.update(
+            (
+                f'/{version}/whatsnew/{article}.html',
+                f'<html><head><title>What’s New In Python {article} — '
+                f'Python {version} documentation</title></head><body>'
+                f'<div class="version_switcher">{version}</div>'
+                f'<h1>What’s New In Python {article}</h1>'
+                f'<dl><dt>Editor</dt>\n<dd>Editor {article}</dd></dl>'
+                '</body></html>'
+            )
+            for article in articles
+        )
+        pages[f'/{version}/download.html'] = (
+            '<html><body><a href="archives/python-'
+            f'{version}-docs-html.zip">HTML</a></body></html>'
+        )
+    return pages
+
+
 @pytest.fixture
 def response_page(mock_session):
     def _response_page(page):
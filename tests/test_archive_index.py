@@ -0,0 +1,65 @@
+import zipfile
+
+import pytest
+from src import archive_index
+
+MEMBERS = {
+    'docs/index.html': '<html><body>Python</body></html>' * 100,
+    'docs/stored.txt': 'stored text',
+    'docs/library/os.html': '<html><body>os</body></html>',
+}
+
+
+@pytest.fixture
+def archive_path(tmp_path):
+    path = tmp_path / 'docs.zip'
+    with zipfile.ZipFile(path, 'w', zipfile.ZIP_DEFLATED) as archive:
+        for name, text in MEMBERS.items():
+            archive.writestr(
+                name, text,
+                zipfile.ZIP_STORED if name.endswith('.txt') else None
+            )
+    return path
+
+
+def test_archive_index_read(tmp_path, archive_path):
+    index = archive_index.ArchiveIndex(tmp_path / 'index.sqlite')
+    try:
+        members = index.members(archive_path)
+        assert [member.name for member in members] == sorted(MEMBERS)
+        for member in members:
+            assert index.read(member).decode() == MEMBERS[member.name], (
+                'Файл должен читаться по смещению из оглавления'
+            )
+        assert [
+            member.name for member in index.members(archive_path, '*.html')
+        ] == ['docs/index.html', 'docs/library/os.html']
+    finally:
+        index.close()
+
+
+def test_archive_index_persistent(tmp_path, archive_path, monkeypatch):
+    index = archive_index.ArchiveIndex(tmp_path / 'index.sqlite')
+    index.members(archive_path)
+    index.close()
+
+    def fail(mapped):
+        raise AssertionError('Оглавление не должно перестраиваться')
+    monkeypatch.setattr(archive_index, 'read_members', fail)
+    index = archive_index.ArchiveIndex(tmp_path / 'index.sqlite')
+    try:
+        assert len(index.members(archive_path)) == len(MEMBERS), (
+            'Оглавление неизменившегося архива должно читаться из индекса'
+        )
+    finally:
+        index.close()
+
+
+def test_archive_index_crc(tmp_path, archive_path):
+    index = archive_index.ArchiveIndex(tmp_path / 'index.sqlite')
+    try:
+        member = index.members(archive_path, '*.txt')[0]
+        with pytest.raises(zipfile.BadZipFile):
+            index.read(member._replace(crc=member.crc ^ 1))
+    finally:
+        index.close()
@@ -0,0 +1,74 @@
+import random
+
+import pytest
+from requests_cache import CachedSession
+from src import cache_backends, utils
+
+PAGE_SIZE = 10000
+
+
+@pytest.fixture
+def pages_site(local_site):
+    noise = random.Random(0)
+    return local_site({
+        f'/{name}': bytes(noise.getrandbits(8) for _ in range(PAGE_SIZE))
+        for name in 'abc'
+    })
+
+
+def make_session(backend, tmp_path, redis_url, **options):
+    return CachedSession(backend=cache_backends.make_cache(
+        backend, str(tmp_path / 'http_cache'), redis_url=redis_url,
+        **options
+    ))
+
+
+@pytest.mark.parametrize('backend', ['sqlite', 'filesystem', 'redis'])
+@pytest.mark.parametrize('eviction, evicted', [('lru', 'a'), ('lfu', 'c')])
+def test_cache_eviction(
+    backend, eviction, evicted, tmp_path, pages_site, local_redis
+):
+    session = make_session(
+        backend, tmp_path, local_redis,
+        max_size=int(PAGE_SIZE * 2.5), eviction=eviction
+    )
+    for name in 'abaaacb':
+        session.get(pages_site + name)
+    got = session.cache.enforce_budget()
+    assert (got.hits, got.misses, got.evicted) == (4, 3, 1)
+    assert got.evicted_size > 0 and got.size <= PAGE_SIZE * 2.5
+    session.close()
+    session = make_session(backend, tmp_path, local_redis)
+    assert {
+        name for name in 'abc'
+        if not session.get(pages_site + name).from_cache
+    } == {evicted}, (
+        'LRU должен вытеснять давно не использованные записи, '
+        'LFU - редко используемые'
+    )
+    session.close()
+
+
+def test_cache_compression(tmp_path, local_site, local_redis):
+    url = local_site({'/': 'x' * 100000})
+    session = make_session('sqlite', tmp_path, local_redis)
+    session.get(url)
+    assert sum(session.cache.get_sizes().values()) < 10000, (
+        'Тела ответов должны храниться сжатыми'
+    )
+    assert session.get(url).text == 'x' * 100000
+    session.close()
+
+
+def test_cache_stats_async_engine(tmp_path, pages_site, local_redis):
+    session = make_session('sqlite', tmp_path, local_redis)
+    urls = [pages_site + name for name in 'abc']
+    for _ in range(2):
+        list(utils.fetch_pages(
+            session, urls, utils.get_response, engine='async'
+        ))
+    got = session.cache.enforce_budget()
+    assert (got.hits, got.misses) == (6, 0), (
+        'Проверка кеша движком async не должна учитываться как попадание'
+    )
+    session.close()
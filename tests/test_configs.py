@@ -29,7 +29,7 @@ def test_configs_file():
     ),
     (
         argparse._StoreAction, ['-o', '--output'], 'output',
-        ('pretty', 'file'),
+        ('pretty', 'file', 'jsonl', 'csv-gz', 'csv-zst', 'parquet', 'arrow'),
         'Дополнительные способы вывода данных'
     ),
 ])
@@ -64,3 +64,20 @@ def test_configure_argument_parser(
     assert got_action.help == help_str, (
         f'Укажите help-строку cli аргумента {got_action.dest}'
     )
+
+
+def test_configure_session_revalidates(tmp_path, local_site):
+    requests_log = []
+    url = local_site({'/': 'Cached page'}, requests_log=requests_log)
+    cli_args = argparse.Namespace(clear_cache=False, refresh=True)
+    session = configs.configure_session(
+        cli_args, cache_name=str(tmp_path / 'http_cache')
+    )
+    assert session.get(url).text == 'Cached page'
+    got = session.get(url)
+    assert got.text == 'Cached page' and got.from_cache, (
+        'При ответе 304 должен использоваться ответ из кеша'
+    )
+    assert 'If-None-Match' in requests_log[-1][1], (
+        'Повторный запрос должен быть условным (If-None-Match)'
+    )
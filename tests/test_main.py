@@ -1,5 +1,16 @@
+import hashlib
+import io
+import logging
+import time
+import zipfile
+from argparse import Namespace
+
 import pytest
 from pathlib import Path
+from conftest import (
+    docs_site_pages, pep_site_pages, pep_site_type, pep_site_version
+)
+from requests_cache import CachedSession
 try:
     from src import main
 except ModuleNotFoundError:
@@ -31,7 +42,7 @@ def test_main_file():
 
 
 def test_whats_new(mock_session):
-    got = main.whats_new(mock_session)
+    got = list(main.whats_new(mock_session))
     header = ('Ссылка на статью', 'Заголовок', 'Редактор, Автор')
     assert isinstance(got, list), (
         'Функция `whats_new` должна возвращать объект типа `list`'
@@ -53,7 +64,7 @@ def test_whats_new(mock_session):
 
 @pytest.mark.skip()
 def test_latest_versions(mock_session):
-    got = main.latest_versions(mock_session)
+    got = list(main.latest_versions(mock_session))
     assert isinstance(got, list), (
         'Функция `latest_versions` должна возвращать объект типа `list`'
     )
@@ -112,6 +123,128 @@ def test_download(monkeypatch, tmp_path, mock_session):
     )
 
 
+def make_zip(*names):
+    buffer = io.BytesIO()
+    with zipfile.ZipFile(buffer, 'w') as archive:
+        for name in names:
+            archive.writestr(name, name * 100)
+    return buffer.getvalue()
+
+
+def test_download_formats(monkeypatch, tmp_path, local_site, caplog):
+    html_zip = make_zip('index.html', 'library/index.html')
+    pages = {
+        '/3.12/download.html': (
+            '<a href="archives/python-3.12-docs-pdf-a4.zip">PDF</a>'
+            '<a href="archives/python-3.12-docs-html.zip">HTML</a>'
+            '<a href="archives/python-3.12-docs-html.zip.sha256">SHA256</a>'
+            '<a href="archives/python-3.12-docs.epub">EPUB</a>'
+        ),
+        '/3.12/archives/python-3.12-docs-pdf-a4.zip': make_zip('a4.pdf'),
+        '/3.12/archives/python-3.12-docs-html.zip': html_zip,
+        '/3.12/archives/python-3.12-docs-html.zip.sha256': (
+            hashlib.sha256(html_zip).hexdigest()
+            + '  python-3.12-docs-html.zip'
+        ),
+        '/3.11/download.html': (
+            '<a href="archives/python-3.11-docs-pdf-a4.zip">PDF</a>'
+        ),
+        '/3.11/archives/python-3.11-docs-pdf-a4.zip': make_zip('a4.pdf'),
+    }
+    requests_log = []
+    url = local_site(pages, requests_log=requests_log)
+    monkeypatch.setattr(main, 'MAIN_DOC_URL', url + '3/')
+    monkeypatch.setattr(main, 'BASE_DIR', tmp_path)
+    caplog.set_level(logging.INFO)
+    cli_args = Namespace(
+        formats=['pdf-a4', 'html'], versions=['3.12', '3.11'], workers=4,
+        bandwidth=1024
+    )
+    assert main.download(CachedSession(backend='memory'), cli_args) is None
+    assert sorted(
+        path.name for path in (tmp_path / 'downloads').glob('*.zip')
+    ) == [
+        'python-3.11-docs-pdf-a4.zip', 'python-3.12-docs-html.zip',
+        'python-3.12-docs-pdf-a4.zip'
+    ], 'Должны загружаться архивы всех запрошенных форматов и версий'
+    assert 'Нет архива в формате html' in caplog.text
+    assert f'Файлов в архиве {tmp_path / "downloads"}' in caplog.text
+    del requests_log[:]
+    main.download(CachedSession(backend='memory'), cli_args)
+    assert '/3.12/archives/python-3.12-docs-html.zip' not in [
+        path for path, _ in requests_log
+    ], 'Архив с совпавшей контрольной суммой не должен запрашиваться'
+
+
+def test_download_missing_archive(monkeypatch, tmp_path, local_site, caplog):
+    pdf_zip = make_zip('a4.pdf')
+    pages = {
+        '/3.12/download.html': (
+            '<a href="archives/python-3.12-docs-pdf-a4.zip">PDF</a>'
+            '<a href="archives/python-3.12-docs-pdf-a4.zip.sha256">SHA</a>'
+            '<a href="archives/python-3.12-docs-html.zip">HTML</a>'
+        ),
+        '/3.12/archives/python-3.12-docs-pdf-a4.zip': pdf_zip,
+        '/3.12/archives/python-3.12-docs-pdf-a4.zip.sha256': 404,
+        '/3.12/archives/python-3.12-docs-html.zip': 404,
+    }
+    url = local_site(pages)
+    monkeypatch.setattr(main, 'MAIN_DOC_URL', url + '3/')
+    monkeypatch.setattr(main, 'BASE_DIR', tmp_path)
+    caplog.set_level(logging.INFO)
+    main.download(CachedSession(backend='memory'), Namespace(
+        formats=['pdf-a4', 'html'], versions=['3.12'], workers=2
+    ))
+    assert [
+        path.name for path in (tmp_path / 'downloads').glob('*.zip')
+    ] == ['python-3.12-docs-pdf-a4.zip'], (
+        'Ошибка загрузки одного архива не должна прерывать загрузку других'
+    )
+    assert 'python-3.12-docs-html.zip' in caplog.text
+    assert 'Контрольная сумма недоступна' in caplog.text, (
+        'Недоступная контрольная сумма должна пропускать проверку архива'
+    )
+
+
+def test_archive(monkeypatch, tmp_path):
+    downloads_dir = tmp_path / 'downloads'
+    downloads_dir.mkdir()
+    with zipfile.ZipFile(
+        downloads_dir / 'python-docs-html.zip', 'w', zipfile.ZIP_DEFLATED
+    ) as archive:
+        archive.writestr(
+            'docs/library/os.html',
+            '<html><head><meta charset="utf-8"></head>'
+            '<body><h1>os — Разное</h1>\n<p>Интерфейсы ОС</p></body></html>'
+        )
+        archive.writestr('docs/objects.inv', 'inventory')
+    monkeypatch.setattr(main, 'BASE_DIR', tmp_path)
+    assert list(main.archive(None, Namespace(member=None, text=False))) == [
+        ('Архив', 'Файл', 'Размер', 'Сжатый размер', 'CRC'),
+        *(
+            (
+                'python-docs-html.zip', info.filename, info.file_size,
+                info.compress_size, f'{info.CRC:08x}'
+            )
+            for info in sorted(
+                zipfile.ZipFile(
+                    downloads_dir / 'python-docs-html.zip'
+                ).infolist(),
+                key=lambda info: info.filename
+            )
+        )
+    ]
+    assert list(main.archive(
+        None, Namespace(member='*/os.html', text=True)
+    )) == [
+        ('Архив', 'Файл', 'Текст'),
+        (
+            'python-docs-html.zip', 'docs/library/os.html',
+            'os — Разное Интерфейсы ОС'
+        ),
+    ], 'Текст HTML-файла из архива должен выводиться без разметки'
+
+
 def test_mode_to_function():
     got = main.MODE_TO_FUNCTION
     assert isinstance(got, dict), (
@@ -123,7 +256,11 @@ def test_mode_to_function():
             f'{name_func} - это строка.'
         )
         assert (
-            name_func in ['whats-new', 'latest-versions', 'download', 'pep']
+            name_func in [
+                'whats-new', 'latest-versions', 'download', 'pep',
+                'pep-dataset', 'pep-search', 'all-versions', 'archive',
+                'serve', 'diff'
+            ]
         ), (
             'В модуле `main.py` в объекте `MODE_TO_FUNCTION` '
             f'нет ключа `{name_func}`'
@@ -134,9 +271,342 @@ def test_mode_to_function():
         )
         assert (
             func.__name__ in [
-                'whats_new', 'latest_versions', 'download', 'pep'
+                'whats_new', 'latest_versions', 'download', 'pep',
+                'pep_dataset', 'pep_search', 'all_versions', 'archive',
+                'serve', 'diff'
             ]
         ), (
             'В модуле `main.py` в объекте `MODE_TO_FUNCTION` '
             f'нет значения {func}'
         )
+
+
+def timed_pep(workers):
+    started = time.monotonic()
+    got = list(
+        main.pep(CachedSession(backend='memory'), Namespace(workers=workers))
+    )
+    return got, time.monotonic() - started
+
+
+def test_pep_workers(monkeypatch, pep_site):
+    monkeypatch.setattr(main, 'PEP_SITE_URL', pep_site(16, delay=0.05))
+    serial, serial_time = timed_pep(1)
+    concurrent, concurrent_time = timed_pep(8)
+    assert concurrent == serial, (
+        'Результат `pep` с несколькими потоками должен совпадать '
+        'с последовательным запуском'
+    )
+    assert serial[-1] == ('Всего', 16)
+    assert concurrent_time < serial_time / 2, (
+        'Параллельная загрузка карточек PEP должна быть быстрее '
+        'последовательной'
+    )
+
+
+def test_whats_new_workers(monkeypatch, whats_new_site):
+    url = whats_new_site(8, delay=0.05)
+    monkeypatch.setattr(main, 'WHATS_NEW_URL', url)
+    timings = {}
+    for workers in (1, 8):
+        started = time.monotonic()
+        got = list(main.whats_new(
+            CachedSession(backend='memory'), Namespace(workers=workers)
+        ))
+        timings[workers] = time.monotonic() - started
+    assert [row[0] for row in got[1:]] == [
+        f'{url}3.{minor}.html' for minor in range(8, 0, -1)
+    ], (
+        'Порядок строк `whats_new` должен совпадать с порядком ссылок '
+        'на главной странице'
+    )
+    assert got[1][1:] == ('What’s New In Python 3.8', 'Editor Editor 3.8')
+    assert timings[8] < timings[1] / 2, (
+        'Параллельная загрузка страниц должна быть быстрее '
+        'последовательной'
+    )
+
+
+def test_parsers_match(monkeypatch, pep_site, whats_new_site):
+    monkeypatch.setattr(main, 'PEP_SITE_URL', pep_site(9))
+    monkeypatch.setattr(main, 'WHATS_NEW_URL', whats_new_site(3))
+    for mode in (main.pep, main.whats_new):
+        got = {
+            parser: list(mode(
+                CachedSession(backend='memory'), Namespace(parser=parser)
+            ))
+            for parser in ('bs4', 'lxml')
+        }
+        assert got['bs4'] == got['lxml'], (
+            f'Результаты `{mode.__name__}` не должны зависеть '
+            'от движка разбора страниц'
+        )
+
+
+def test_pep_incremental(
+    monkeypatch, tmp_path, local_site, pep_card_parser
+):
+    pages = pep_site_pages(9)
+    monkeypatch.setattr(main, 'PEP_SITE_URL', local_site(pages))
+    monkeypatch.setattr(main, 'BASE_DIR', tmp_path)
+    parsed = pep_card_parser.parsed
+    cli_args = Namespace(incremental=True)
+    full = list(main.pep(CachedSession(backend='memory'), cli_args))
+    assert len(parsed) == 9
+    assert list(main.pep(CachedSession(backend='memory'), cli_args)) == full
+    assert len(parsed) == 9, (
+        'Неизменившиеся карточки PEP не должны разбираться повторно'
+    )
+    pages['/pep-0003/'] = pages['/pep-0003/'].replace('Final', 'Draft')
+    got = list(main.pep(
+        CachedSession(backend='memory'),
+        Namespace(incremental=True, refresh=True)
+    ))
+    assert len(parsed) == 10, (
+        'Повторно должна разбираться только изменившаяся карточка'
+    )
+    assert got == list(main.pep(CachedSession(backend='memory')))
+
+
+def test_async_engine(monkeypatch, local_site, whats_new_site):
+    requests_log = []
+    monkeypatch.setattr(
+        main, 'PEP_SITE_URL',
+        local_site(pep_site_pages(12), requests_log=requests_log)
+    )
+    monkeypatch.setattr(main, 'WHATS_NEW_URL', whats_new_site(4))
+    for mode in (main.pep, main.whats_new):
+        session = CachedSession(backend='memory')
+        assert list(mode(
+            session, Namespace(engine='async', workers=50)
+        )) == list(mode(CachedSession(backend='memory'))), (
+            f'Результаты `{mode.__name__}` с движком async должны '
+            'совпадать с обычным запуском'
+        )
+    pep_requests = len(requests_log)
+    session = CachedSession(backend='memory')
+    list(main.pep(session, Namespace(engine='async')))
+    assert len(requests_log) - pep_requests == 13, (
+        'Движок async должен загружать каждую страницу один раз'
+    )
+    list(main.pep(session, Namespace(engine='async')))
+    assert len(requests_log) - pep_requests == 13, (
+        'Свежие страницы из кеша не должны запрашиваться повторно'
+    )
+
+
+def test_pep_dataset(monkeypatch, tmp_path, local_site):
+    monkeypatch.setattr(main, 'PEP_SITE_URL', local_site(pep_site_pages(12)))
+    monkeypatch.setattr(main, 'BASE_DIR', tmp_path)
+    got = list(main.pep_dataset(
+        CachedSession(backend='memory'), Namespace(workers=4)
+    ))
+    assert got[-1] == ('Всего', 12)
+    assert ('Python-Version', 12) in got, (
+        'В индекс должны попадать все поля карточки PEP'
+    )
+    lxml_tmp_path = tmp_path / 'lxml'
+    lxml_tmp_path.mkdir()
+    monkeypatch.setattr(main, 'BASE_DIR', lxml_tmp_path)
+    assert list(main.pep_dataset(
+        CachedSession(backend='memory'), Namespace(parser='lxml')
+    )) == got
+    expected = [
+        number for number in range(1, 13)
+        if number % 3 == 0
+        and pep_site_type(number) == 'Standards Track'
+        and '3.12' in pep_site_version(number)
+    ]
+    for base_dir in (tmp_path, lxml_tmp_path):
+        monkeypatch.setattr(main, 'BASE_DIR', base_dir)
+        found = list(main.pep_search(None, Namespace(filter=[
+            ('Status', 'final'),
+            ('Type', 'Standards Track'),
+            ('Python-Version', '3.12'),
+        ])))
+        assert [row[0] for row in found[1:]] == expected, (
+            'Поиск по полям должен находить карточки со всеми значениями '
+            'фильтров, в том числе в перечислениях через запятую'
+        )
+        assert found[1][1:] == (
+            'PEP 6 – PEP title 6', f'{main.PEP_SITE_URL}pep-0006/',
+            'Final', 'Standards Track', '3.11, 3.12'
+        )
+    found = list(main.pep_search(None, Namespace(query='"Author 7"')))
+    assert [row[0] for row in found[1:]] == [7], (
+        'Полнотекстовый поиск должен искать по всем полям карточки'
+    )
+    assert 'pep-search' in main.OFFLINE_MODES, (
+        'Поиск по локальному индексу не должен создавать сессию с кешем'
+    )
+
+
+@pytest.mark.parametrize('parse', [
+    main.parse_pep_card_status, main.parse_pep_card_status_lxml
+])
+def test_parse_pep_card_status(parse):
+    card = (
+        '<html><body><h1>PEP 1</h1><dl class="field-list rfc2822">'
+        '<dt>Author<span>:</span></dt><dd>Status Quo</dd>'
+        '<dt>Status<span>:</span></dt><dd><abbr>Active</abbr></dd>'
+        '</dl><section><dl><dt>Status</dt><dd>Draft</dd></dl></section>'
+        '</body></html>'
+    )
+    assert parse(card) == 'Active', (
+        'Статус должен браться из списка полей dl.rfc2822 карточки'
+    )
+    with pytest.raises(main.ParserFindTagException):
+        parse(card.replace('<dt>Status', '<dt>Type'))
+
+
+def test_processes(monkeypatch, pep_site, whats_new_site):
+    monkeypatch.setattr(main, 'PEP_SITE_URL', pep_site(9))
+    monkeypatch.setattr(main, 'WHATS_NEW_URL', whats_new_site(4))
+    for mode in (main.pep, main.whats_new):
+        for parser in ('bs4', 'lxml'):
+            assert list(mode(
+                CachedSession(backend='memory'),
+                Namespace(processes=2, workers=4, parser=parser)
+            )) == list(mode(CachedSession(backend='memory'))), (
+                f'Результаты `{mode.__name__}` при разборе в нескольких '
+                'процессах должны совпадать с обычным запуском'
+            )
+
+
+def test_parsed_cache(
+    monkeypatch, tmp_path, local_site, caplog, pep_card_parser
+):
+    pages = pep_site_pages(9)
+    monkeypatch.setattr(main, 'PEP_SITE_URL', local_site(pages))
+    monkeypatch.setattr(main, 'BASE_DIR', tmp_path)
+    cli_args = Namespace(parsed_cache=True)
+    expected = list(main.pep(CachedSession(backend='memory')))
+    parsed = pep_card_parser.parsed
+    parsed.clear()
+    with monkeypatch.context() as patch:
+        assert list(
+            main.pep(CachedSession(backend='memory'), cli_args)
+        ) == expected
+        assert len(parsed) == 9
+        assert list(
+            main.pep(CachedSession(backend='memory'), cli_args)
+        ) == expected
+        assert len(parsed) == 9, (
+            'Страницы с тем же ответом не должны разбираться повторно'
+        )
+        pages['/pep-0003/'] = pages['/pep-0003/'].replace('Final', 'Draft')
+        list(main.pep(CachedSession(backend='memory'), cli_args))
+        assert len(parsed) == 10, (
+            'Повторно должна разбираться только изменившаяся страница'
+        )
+        patch.setattr(main, 'PARSED_RESULTS_VERSION', 2)
+        list(main.pep(CachedSession(backend='memory'), cli_args))
+        assert len(parsed) == 19, (
+            'Новая версия разбора должна сбрасывать кеш результатов'
+        )
+    monkeypatch.setitem(
+        main.PEP_CARD_PARSERS, 'bs4', main.parse_pep_card_status
+    )
+    caplog.set_level('INFO')
+    list(main.pep(
+        CachedSession(backend='memory'),
+        Namespace(parsed_cache=True, processes=2)
+    ))
+    list(main.pep(
+        CachedSession(backend='memory'),
+        Namespace(parsed_cache=True, processes=2)
+    ))
+    assert 'попаданий 9, промахов 0' in caplog.text
+
+
+def test_all_versions(monkeypatch, local_site):
+    pages = {}
+    url = local_site(pages)
+    pages.update(docs_site_pages(url, ['3.12', '3.11', '3.10']))
+    monkeypatch.setattr(main, 'MAIN_DOC_URL', url)
+    got = list(main.all_versions(
+        CachedSession(backend='memory'), Namespace(workers=4)
+    ))
+    assert got == [
+        ('Версии документации', 'Ссылка', 'Заголовок', 'Редактор, автор'),
+        (
+            '3.12', f'{url}3.12/whatsnew/3.12.html',
+            'What’s New In Python 3.12', 'Editor Editor 3.12'
+        ),
+        (
+            '3.12, 3.11', f'{url}3.12/whatsnew/3.11.html',
+            'What’s New In Python 3.11', 'Editor Editor 3.11'
+        ),
+        (
+            '3.12, 3.11, 3.10', f'{url}3.12/whatsnew/3.10.html',
+            'What’s New In Python 3.10', 'Editor Editor 3.10'
+        ),
+        *(
+            (
+                version, f'{url}{version}/archives/python-{version}'
+                '-docs-html.zip',
+                f'Архив документации: python-{version}-docs-html.zip', ''
+            )
+            for version in ('3.12', '3.11', '3.10')
+        ),
+    ], (
+        'Одинаковые статьи разных версий должны выводиться одной строкой '
+        'со списком версий, архивы - по одному на версию'
+    )
+
+
+def test_import_budget():
+    from benchmarks.startup import (
+        LAZY_MODULES, REPEAT, STARTUP_BUDGET_MS, measure_imports
+    )
+    runs = [measure_imports() for _ in range(REPEAT)]
+    loaded = {module.split('.')[0] for module in runs[0]}
+    assert not loaded & set(LAZY_MODULES), (
+        'Импорт `main.py` не должен загружать кеш, tqdm и библиотеки '
+        'форматов вывода'
+    )
+    assert min(timings['main'] for timings in runs) < STARTUP_BUDGET_MS, (
+        'Импорт `main.py` не укладывается в бюджет времени запуска'
+    )
+
+
+def test_diff(monkeypatch, tmp_path, local_site):
+    pages = pep_site_pages(6)
+    monkeypatch.setattr(main, 'PEP_SITE_URL', local_site(pages))
+    monkeypatch.setattr(main, 'BASE_DIR', tmp_path)
+    cli_args = Namespace(snapshot=True)
+    list(main.pep(CachedSession(backend='memory'), cli_args))
+    pages['/pep-0003/'] = pages['/pep-0003/'].replace('Final', 'Draft')
+    pages['/'] = pages['/'].replace('<td>SF</td>', '<td></td>', 1)
+    list(main.pep(CachedSession(backend='memory'), cli_args))
+    got = list(main.diff(None, Namespace(diff_modes=['pep'])))
+    assert got == [
+        ('Режим', 'Ключ', 'Было', 'Стало'),
+        ('pep', main.PEP_SITE_URL + 'pep-0003/', 'Final', 'Draft'),
+    ], 'diff должен выводить только PEP, сменившие статус'
+
+
+def test_diff_failed_card(
+    monkeypatch, tmp_path, local_site, pep_card_parser
+):
+    pages = pep_site_pages(6)
+    monkeypatch.setattr(main, 'PEP_SITE_URL', local_site(pages))
+    monkeypatch.setattr(main, 'BASE_DIR', tmp_path)
+    cli_args = Namespace(snapshot=True)
+    list(main.pep(CachedSession(backend='memory'), cli_args))
+    pep_card_parser.failing = 'PEP title 2<'
+    pages['/pep-0003/'] = pages['/pep-0003/'].replace('Final', 'Draft')
+    list(main.pep(CachedSession(backend='memory'), cli_args))
+    got = list(main.diff(None, Namespace(diff_modes=['pep'])))
+    assert got == [
+        ('Режим', 'Ключ', 'Было', 'Стало'),
+        ('pep', main.PEP_SITE_URL + 'pep-0003/', 'Final', 'Draft'),
+    ], (
+        'Статус из карточки, не совпавший с таблицей, должен попадать в '
+        'diff, а PEP с ошибкой загрузки - сохранять прежний статус'
+    )
+    pep_card_parser.failing = None
+    list(main.pep(CachedSession(backend='memory'), cli_args))
+    assert list(main.diff(None, Namespace(diff_modes=['pep']))) == [
+        ('Режим', 'Ключ', 'Было', 'Стало')
+    ], 'Снова загруженная карточка не должна считаться новой'
@@ -90,3 +90,108 @@ def test_output_file():
     assert hasattr(outputs, 'file_output'), (
         'Напишите функцию `file_output` в модуле `output.py`'
     )
+
+
+def broken_rows(printed, capsys):
+    yield ('Статус', 'Количество')
+    yield ('Active', 1)
+    printed.append(capsys.readouterr().out)
+    raise ConnectionError('PEP 690')
+
+
+def test_control_output_streaming(monkeypatch, tmp_path, capsys):
+    monkeypatch.setattr(outputs, 'BASE_DIR', tmp_path)
+    printed = []
+    with pytest.raises(ConnectionError):
+        outputs.control_output(
+            broken_rows(printed, capsys), cli_args('pep', None)
+        )
+    assert printed == ['Статус Количество\nActive 1\n'], (
+        'Строки должны выводиться в консоль по мере получения'
+    )
+    with pytest.raises(ConnectionError):
+        outputs.control_output(
+            broken_rows(printed, capsys), cli_args('pep', 'file')
+        )
+    output_file, = tmp_path.glob('results/*.csv')
+    assert output_file.read_text(encoding='utf-8').splitlines() == [
+        '"Статус","Количество"', '"Active","1"'
+    ], 'Полученные до сбоя строки должны сохраниться в файле'
+
+
+def read_jsonl(path):
+    import json
+    return [
+        json.loads(line)
+        for line in path.read_text(encoding='utf-8').splitlines()
+    ]
+
+
+def read_csv_gz(path):
+    import gzip
+    with gzip.open(path, 'rt', encoding='utf-8') as f:
+        return f.read().splitlines()
+
+
+def read_csv_zst(path):
+    import zstandard
+    with zstandard.open(path, 'rt', encoding='utf-8') as f:
+        return f.read().splitlines()
+
+
+def read_parquet(path):
+    import pyarrow.parquet as pq
+    return pq.read_table(path)
+
+
+def read_arrow(path):
+    import pyarrow as pa
+    with pa.memory_map(str(path)) as source:
+        return pa.ipc.open_file(source).read_all()
+
+
+PEP_ROWS = [('Статус', 'Количество'), ('Active', 31), ('Final', 290)]
+PEP_CSV = ['"Статус","Количество"', '"Active","31"', '"Final","290"']
+
+
+@pytest.mark.parametrize('output_format, extension, read, expected', [
+    ('jsonl', 'jsonl', read_jsonl, [
+        {'Статус': 'Active', 'Количество': 31},
+        {'Статус': 'Final', 'Количество': 290},
+    ]),
+    ('csv-gz', 'csv.gz', read_csv_gz, PEP_CSV),
+    ('csv-zst', 'csv.zst', read_csv_zst, PEP_CSV),
+])
+def test_control_output_row_formats(
+    monkeypatch, tmp_path, output_format, extension, read, expected
+):
+    monkeypatch.setattr(outputs, 'BASE_DIR', tmp_path)
+    outputs.control_output(iter(PEP_ROWS), cli_args('pep', output_format))
+    output_file, = tmp_path.glob(f'results/pep_*.{extension}')
+    assert read(output_file) == expected, (
+        f'Проверьте содержимое файла для вывода {output_format}'
+    )
+
+
+@pytest.mark.parametrize('output_format, read', [
+    ('parquet', read_parquet),
+    ('arrow', read_arrow),
+])
+def test_control_output_columnar(
+    monkeypatch, tmp_path, output_format, read
+):
+    monkeypatch.setattr(outputs, 'BASE_DIR', tmp_path)
+    monkeypatch.setattr(outputs, 'OUTPUT_BATCH_SIZE', 2)
+    rows = [('Статус', 'Количество')] + [
+        (f'Status {number}', number) for number in range(5)
+    ]
+    outputs.control_output(iter(rows), cli_args('pep', output_format))
+    output_file, = tmp_path.glob(f'results/pep_*.{output_format}')
+    table = read(output_file)
+    assert table.column_names == ['Статус', 'Количество']
+    assert str(table.schema.field('Количество').type) == 'int64', (
+        'Количество PEP должно сохраняться целым числом'
+    )
+    assert table.to_pylist() == [
+        dict(zip(rows[0], row)) for row in rows[1:]
+    ]
@@ -0,0 +1,47 @@
+from src import parsed_cache
+
+
+def fill(path, keys, touch=(), **limits):
+    memo = parsed_cache.ParsedCache(path, 1, **limits)
+    for key in touch:
+        assert memo.get(key)[0]
+    for key in keys:
+        memo.put(key, ('row', key))
+    memo.close()
+
+
+def stored(path):
+    memo = parsed_cache.ParsedCache(path, 1)
+    try:
+        return {
+            key for key in 'abcd' if memo.get(key)[0]
+        }
+    finally:
+        memo.close()
+
+
+def test_parsed_cache_eviction(tmp_path):
+    path = tmp_path / 'parsed.sqlite'
+    fill(path, 'a')
+    fill(path, 'b')
+    fill(path, 'c', touch='a', max_entries=2)
+    assert stored(path) == {'a', 'c'}, (
+        'Вытесняться должны давно не использованные записи'
+    )
+    fill(path, 'd', max_size=1)
+    assert stored(path) == set(), (
+        'Записи должны вытесняться по суммарному объёму'
+    )
+
+
+def test_parsed_cache_key():
+    memo = parsed_cache.ParsedCache(':memory:', 1)
+    key = memo.get_key('main.parse', 'https://peps.python.org/', '"etag"')
+    assert key != memo.get_key(
+        'main.parse', 'https://peps.python.org/', '"other"'
+    )
+    memo.version = 2
+    assert key != memo.get_key(
+        'main.parse', 'https://peps.python.org/', '"etag"'
+    ), 'Ключ должен зависеть от версии разбора'
+    memo.close()
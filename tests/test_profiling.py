@@ -0,0 +1,45 @@
+import json
+from argparse import Namespace
+
+import pytest
+from requests_cache import CachedSession
+try:
+    from src import main, profiling
+except ModuleNotFoundError:
+    assert False, 'Убедитесь что в директории `src` есть файл `profiling.py`'
+except ImportError:
+    assert False, 'Убедитесь что в директории `src` есть файл `profiling.py`'
+
+
+@pytest.fixture
+def profiler():
+    main.PROFILER.start()
+    yield main.PROFILER
+    main.PROFILER.enabled = False
+
+
+def test_profile_pep(monkeypatch, tmp_path, capsys, pep_site, profiler):
+    monkeypatch.setattr(main, 'PEP_SITE_URL', pep_site(6))
+    monkeypatch.setattr(main, 'BASE_DIR', tmp_path)
+    session = CachedSession(backend='memory')
+    list(main.pep(session))
+    list(main.pep(session))
+    stages = {row[0]: row[1] for row in profiler.summary()[1:]}
+    assert stages == {
+        'network (cache miss)': 7,
+        'network (cache hit)': 7,
+        'decode': 14,
+        'parse': 14,
+        'extract': 12,
+    }, 'Профиль должен учитывать каждый этап обработки каждой страницы'
+
+    main.report_profile(Namespace(mode='pep', output=None))
+    captured_out, _ = capsys.readouterr()
+    assert 'network (cache hit) 7' in captured_out
+    trace_files = list((tmp_path / 'profiles').glob('pep_*.json'))
+    assert len(trace_files) == 1
+    trace = json.loads(trace_files[0].read_text(encoding='utf-8'))
+    assert {event['ph'] for event in trace['traceEvents']} == {'X'}, (
+        'Файл профиля должен быть в формате Chrome Trace Event'
+    )
+    assert trace['summary'][0] == list(profiling.SUMMARY_HEADER)
@@ -0,0 +1,112 @@
+import time
+from email.utils import formatdate
+from threading import Thread
+
+import requests
+from requests_cache import CachedSession
+from src import async_engine, scheduler, transport, utils
+
+
+def test_scheduler_rate():
+    host_scheduler = scheduler.Scheduler(rate=20, burst=1)
+    started = time.monotonic()
+    for _ in range(5):
+        host_scheduler.acquire('docs.python.org')
+    host_scheduler.acquire('peps.python.org')
+    assert 0.19 <= time.monotonic() - started < 0.3, (
+        'Запросы к хосту должны идти не быстрее заданной скорости, '
+        'а у каждого хоста должна быть своя корзина токенов'
+    )
+
+
+def test_scheduler_priority():
+    host_scheduler = scheduler.Scheduler(rate=10, burst=1)
+    host_scheduler.acquire('peps.python.org')
+    order = []
+
+    def acquire(priority):
+        host_scheduler.acquire('peps.python.org', priority)
+        order.append(priority)
+
+    threads = [
+        Thread(target=acquire, args=(scheduler.PRIORITY_REVALIDATE,)),
+        Thread(target=acquire, args=(scheduler.PRIORITY_FETCH,)),
+    ]
+    for thread in threads:
+        thread.start()
+        time.sleep(0.02)
+    assert host_scheduler.queue_depth() == 2
+    for thread in threads:
+        thread.join()
+    assert order == [
+        scheduler.PRIORITY_FETCH, scheduler.PRIORITY_REVALIDATE
+    ], (
+        'Новые страницы должны запрашиваться раньше перепроверок кеша'
+    )
+
+
+def test_scheduler_adapts():
+    host_scheduler = scheduler.Scheduler(rate=10)
+    for _ in range(4):
+        host_scheduler.observe('peps.python.org', 0.1, 200)
+    assert host_scheduler.get_stats()[0].rate == 12
+    host_scheduler.observe('peps.python.org', 5, 200)
+    assert host_scheduler.get_stats()[0].rate == 6, (
+        'Рост задержки ответов должен снижать скорость'
+    )
+    host_scheduler.throttled('peps.python.org')
+    assert host_scheduler.get_stats()[0].rate == 3
+
+
+def test_retry_after():
+    now = time.time()
+    assert scheduler.parse_retry_after('120') == 120
+    assert 59 <= scheduler.parse_retry_after(
+        formatdate(now + 60, usegmt=True), now
+    ) <= 60
+    assert scheduler.parse_retry_after('soon') is None
+    host_scheduler = scheduler.Scheduler(rate=100)
+    host_scheduler.throttled('peps.python.org', '1')
+    started = time.monotonic()
+    host_scheduler.acquire('peps.python.org')
+    assert time.monotonic() - started >= 0.95, (
+        'Retry-After должен приостанавливать запросы к хосту'
+    )
+
+
+def test_transport_scheduler(local_site):
+    url = local_site({'/': [429, 'OK']})
+    host_scheduler = scheduler.Scheduler()
+    session = requests.Session()
+    session.mount('http://', transport.TransportAdapter(
+        backoff_factor=0, scheduler=host_scheduler
+    ))
+    assert utils.get_response(session, url).text == 'OK', (
+        'Ответ 429 должен повторяться'
+    )
+    session.mount('https://', session.adapters['http://'])
+    stats = transport.get_scheduler_stats(session)
+    assert [
+        (host_stats.host, host_stats.completed, host_stats.throttled)
+        for host_stats in stats
+    ] == [('127.0.0.1', 1, 1)]
+
+
+def test_async_engine_scheduler(local_site):
+    url = local_site({'/a': 'A', '/b': 'B', '/busy': 429})
+    host_scheduler = scheduler.Scheduler(rate=5, burst=1)
+    session = CachedSession(backend='memory')
+    session.mount('http://', transport.TransportAdapter(
+        scheduler=host_scheduler
+    ))
+    started = time.monotonic()
+    async_engine.prefetch(
+        session, [url + 'a', url + 'b', url + 'busy'], workers=3
+    )
+    assert time.monotonic() - started > 0.3, (
+        'Движок async должен соблюдать темп запросов к хосту'
+    )
+    assert [
+        (host_stats.completed, host_stats.throttled)
+        for host_stats in host_scheduler.get_stats()
+    ] == [(3, 1)], 'Ответы движка async должны учитываться планировщиком'
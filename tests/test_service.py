@@ -0,0 +1,51 @@
+import threading
+import time
+
+import pytest
+import requests
+from src import service
+
+
+@pytest.fixture
+def running_service():
+    started = threading.Event()
+    calls = []
+
+    def pep(session, cli_args):
+        started.wait(5)
+        calls.append('pep')
+        yield ('Статус', 'Количество')
+        yield ('Final', len(calls))
+
+    parser_service = service.ParserService(
+        None, None, {'pep': pep}, interval=0.2
+    )
+    server = service.make_server(parser_service, '127.0.0.1', 0)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    parser_service.start()
+    yield (
+        'http://127.0.0.1:{}/'.format(server.server_address[1]),
+        started, calls
+    )
+    parser_service.stop()
+    server.shutdown()
+    server.server_close()
+
+
+def test_service(running_service):
+    url, started, calls = running_service
+    got = requests.get(url + 'pep')
+    assert got.status_code == 503 and got.headers['Retry-After'], (
+        'Пока данные загружаются, сервис должен отвечать 503'
+    )
+    started.set()
+    while not calls:
+        time.sleep(0.01)
+    time.sleep(0.05)
+    got = requests.get(url + 'pep').json()
+    assert got['rows'][0]['Статус'] == 'Final'
+    assert requests.get(url + 'unknown').status_code == 404
+    assert set(requests.get(url).json()) == {'pep'}
+    time.sleep(0.5)
+    assert len(calls) > 1, 'Данные должны обновляться в фоне по расписанию'
+    assert requests.get(url + 'pep').json()['rows'][0]['Количество'] > 1
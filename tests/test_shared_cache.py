@@ -0,0 +1,70 @@
+import time
+from argparse import Namespace
+from concurrent.futures import ThreadPoolExecutor
+from threading import Thread
+
+from src import configs, shared_cache
+
+
+def test_key_locks(tmp_path):
+    locks = shared_cache.KeyLocks(tmp_path)
+
+    def enter():
+        with locks.lock('a') as waited:
+            return waited
+
+    with ThreadPoolExecutor(max_workers=1) as executor:
+        with locks.lock('a') as waited:
+            assert not waited
+            future = executor.submit(enter)
+            time.sleep(0.1)
+            assert not future.done(), (
+                'Занятый ключ должен ждать освобождения блокировки'
+            )
+        assert future.result()
+    assert not enter()
+
+
+def test_shared_cache_coalesces(tmp_path, local_site):
+    requests_log = []
+    url = local_site(
+        {'/': 'Shared page'}, delay=0.3, requests_log=requests_log
+    )
+    cli_args = Namespace(
+        clear_cache=False, refresh=False, shared_cache=str(tmp_path)
+    )
+    # Отдельные сессии со своими соединениями с кешем, как у процессов.
+    sessions = [configs.configure_session(cli_args) for _ in range(3)]
+    with ThreadPoolExecutor(max_workers=3) as executor:
+        got = list(executor.map(
+            lambda session: session.get(url).text, sessions
+        ))
+    assert got == ['Shared page'] * 3
+    assert len(requests_log) == 1, (
+        'Одновременные запросы одного адреса должны загружаться один раз'
+    )
+    assert sum(session.coalesced for session in sessions) == 2
+    assert (tmp_path / 'http_cache.sqlite').exists(), (
+        'Кеш ответов должен храниться в общем каталоге'
+    )
+    for session in sessions:
+        session.close()
+
+
+def test_shared_cache_redirect(tmp_path, local_site):
+    url = local_site({'/old/': (301, '/new/'), '/new/': 'Moved page'})
+    session = configs.configure_session(Namespace(
+        clear_cache=False, refresh=False, shared_cache=str(tmp_path)
+    ))
+    session.locks.stripes = 1
+    got = []
+    thread = Thread(
+        target=lambda: got.append(session.get(url + 'old/').text),
+        daemon=True
+    )
+    thread.start()
+    thread.join(timeout=5)
+    assert got == ['Moved page'], (
+        'Перенаправление не должно ждать блокировку исходного запроса'
+    )
+    session.close()
@@ -0,0 +1,60 @@
+from src import snapshots
+
+VERSIONS = {'3.13': 'in development', '3.12': 'stable', '3.8': 'security'}
+
+
+def test_snapshot_changes(tmp_path):
+    store = snapshots.SnapshotStore(tmp_path / 'snapshots.sqlite')
+    try:
+        first = store.save('latest-versions', VERSIONS)
+        assert len(store.changes(first)) == len(VERSIONS)
+        second = store.save('latest-versions', {
+            **VERSIONS, '3.8': 'EOL', '3.14': 'in development'
+        })
+        assert store.changes(second) == [
+            ('3.14', None, 'in development'), ('3.8', 'security', 'EOL')
+        ], 'Снимок должен сообщать только изменившиеся ключи'
+        third = store.save('latest-versions', {'3.13': 'stable'})
+        assert store.changes(third) == [
+            ('3.12', 'stable', None),
+            ('3.13', 'in development', 'stable'),
+            ('3.14', 'in development', None),
+            ('3.8', 'EOL', None),
+        ]
+        assert store.load(first) == VERSIONS, (
+            'Из изменений должен восстанавливаться любой прошлый снимок'
+        )
+        assert store.load(third) == {'3.13': 'stable'}
+        assert store.get_latest('latest-versions') == third
+        fourth = store.save(
+            'latest-versions', {'3.13': None, '3.14': None}
+        )
+        assert store.changes(fourth) == [], (
+            'Ключ без значения в запуске должен сохранять прежнее значение'
+        )
+        assert store.load(fourth) == {'3.13': 'stable'}
+        assert store.get_latest('pep') is None
+        rows = store.connection.execute(
+            'SELECT count(*) FROM snapshot_value'
+        ).fetchone()[0]
+        assert rows == len(VERSIONS) + 3, (
+            'Снимок должен записывать только изменения'
+        )
+    finally:
+        store.close()
+
+
+def test_snapshot_changes_use_index(tmp_path):
+    store = snapshots.SnapshotStore(tmp_path / 'snapshots.sqlite')
+    try:
+        for query in (snapshots.SELECT_ADDED, snapshots.SELECT_REMOVED):
+            plan = ' '.join(
+                row[-1] for row in store.connection.execute(
+                    'EXPLAIN QUERY PLAN ' + query, (1,)
+                )
+            )
+            assert 'USING INDEX' in plan, (
+                'Изменения снимка должны читаться по индексу'
+            )
+    finally:
+        store.close()
@@ -0,0 +1,65 @@
+import time
+from threading import Thread
+
+import pytest
+import requests
+try:
+    from src import transport, utils
+except ModuleNotFoundError:
+    assert False, 'Убедитесь что в директории `src` есть файл `transport.py`'
+except ImportError:
+    assert False, 'Убедитесь что в директории `src` есть файл `transport.py`'
+
+
+@pytest.fixture
+def transport_session():
+    session = requests.Session()
+    adapter = transport.TransportAdapter(
+        pool_size=2, timeout=(1, 0.2), retries=2, backoff_factor=0
+    )
+    session.mount('http://', adapter)
+    return session
+
+
+def test_retry_transient_errors(local_site, transport_session):
+    requests_log = []
+    url = local_site(
+        {'/': [503, 502, 'Recovered']}, requests_log=requests_log
+    )
+    got = utils.get_response(transport_session, url)
+    assert got.status_code == 200 and got.text == 'Recovered', (
+        'Временные ошибки 5xx должны повторяться'
+    )
+    assert len(requests_log) == 3
+
+
+def test_read_timeout(local_site, transport_session):
+    url = local_site({'/': 'Too slow'}, delay=0.5)
+    with pytest.raises(ConnectionError):
+        utils.get_response(transport_session, url)
+
+
+def test_connection_reuse(local_site, transport_session):
+    url = local_site({'/': 'Keep-alive'})
+    for _ in range(5):
+        utils.get_response(transport_session, url)
+    assert transport.get_transport_stats(transport_session) is None
+    transport_session.mount('https://', transport_session.adapters['http://'])
+    assert transport.get_transport_stats(transport_session) == (5, 1), (
+        'Запросы к одному хосту должны переиспользовать соединение'
+    )
+
+
+def test_bandwidth_limiter():
+    limiter = transport.BandwidthLimiter(100 * 1024)
+    started = time.monotonic()
+    threads = [
+        Thread(target=limiter.consume, args=(10 * 1024,)) for _ in range(3)
+    ]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert time.monotonic() - started >= 0.29, (
+        'Ограничение скорости должно быть общим для всех потоков'
+    )
@@ -1,8 +1,15 @@
+import hashlib
+import io
+import json
+import zipfile
+import zlib
+
 import pytest
 import requests
 import requests_mock
 import bs4
 from conftest import MAIN_DOC_URL
+from requests_cache import CachedSession
 try:
     from src import utils
 except ModuleNotFoundError:
@@ -54,3 +61,158 @@ def test_get_response(mock_session):
             'делает запрос к странице и возвращает ответ. \n'
             'Кстати: You are breathtaken!'
         )
+
+
+ARCHIVE = bytes(range(256)) * 1024
+
+
+@pytest.fixture
+def archive_site(local_site):
+    requests_log = []
+    url = local_site({'/docs.zip': ARCHIVE}, requests_log=requests_log)
+    return url + 'docs.zip', requests_log
+
+
+def test_download_file(tmp_path, tempfile_session, archive_site):
+    url, requests_log = archive_site
+    file_path = tmp_path / 'docs.zip'
+    assert utils.download_file(tempfile_session, url, file_path, 4096), (
+        'Функция `download_file` должна вернуть True после загрузки'
+    )
+    assert file_path.read_bytes() == ARCHIVE
+    assert not (tmp_path / 'docs.zip.part').exists(), (
+        'Временный файл должен переименовываться после загрузки'
+    )
+    assert not tempfile_session.cache.contains(url=url), (
+        'Архив не должен сохраняться в кеше ответов'
+    )
+    assert not utils.download_file(tempfile_session, url, file_path), (
+        'Актуальный архив не должен загружаться повторно'
+    )
+    assert requests_log[-1][1]['If-None-Match']
+
+
+def test_download_file_resume(tmp_path, tempfile_session, archive_site):
+    url, requests_log = archive_site
+    part_path = tmp_path / 'docs.zip.part'
+    part_path.write_bytes(ARCHIVE[:1000])
+    (tmp_path / 'docs.zip.part.json').write_text(json.dumps({
+        'etag': '"{}"'.format(hashlib.md5(ARCHIVE).hexdigest()),
+        'length': len(ARCHIVE),
+    }))
+    utils.download_file(tempfile_session, url, tmp_path / 'docs.zip')
+    assert requests_log[-1][1]['Range'] == 'bytes=1000-', (
+        'Прерванная загрузка должна продолжаться Range-запросом'
+    )
+    assert (tmp_path / 'docs.zip').read_bytes() == ARCHIVE
+
+
+def test_download_file_restarts_changed(
+    tmp_path, tempfile_session, archive_site
+):
+    url, _ = archive_site
+    part_path = tmp_path / 'docs.zip.part'
+    part_path.write_bytes(b'stale')
+    (tmp_path / 'docs.zip.part.json').write_text(json.dumps({
+        'etag': '"outdated"', 'length': 10,
+    }))
+    utils.download_file(tempfile_session, url, tmp_path / 'docs.zip')
+    assert (tmp_path / 'docs.zip').read_bytes() == ARCHIVE, (
+        'При смене ETag загрузка должна начинаться заново'
+    )
+
+
+def test_download_file_replaces_damaged(
+    tmp_path, tempfile_session, archive_site, local_site
+):
+    url, requests_log = archive_site
+    file_path = tmp_path / 'docs.zip'
+    utils.download_file(tempfile_session, url, file_path)
+    file_path.write_bytes(ARCHIVE[:100])
+    assert utils.download_file(tempfile_session, url, file_path)
+    assert 'If-None-Match' not in requests_log[-1][1], (
+        'Для изменённого файла не нужен условный запрос'
+    )
+    assert file_path.read_bytes() == ARCHIVE
+    file_path.write_bytes(ARCHIVE[:100])
+    forced_url = local_site({'/docs.zip': [304, ARCHIVE]})
+    assert utils.download_file(
+        requests.Session(), forced_url + 'docs.zip', file_path
+    )
+    assert file_path.read_bytes() == ARCHIVE, (
+        'Неожиданный ответ 304 не должен затирать архив пустым телом'
+    )
+
+
+def test_download_file_checksum(tmp_path, tempfile_session, archive_site):
+    url, requests_log = archive_site
+    file_path = tmp_path / 'docs.zip'
+    with pytest.raises(ConnectionError):
+        utils.download_file(
+            tempfile_session, url, file_path, checksum='0' * 64
+        )
+    assert not file_path.exists() and not (
+        tmp_path / 'docs.zip.part'
+    ).exists(), 'Архив с неверной контрольной суммой не должен сохраняться'
+    checksum = hashlib.sha256(ARCHIVE).hexdigest()
+    assert utils.download_file(
+        tempfile_session, url, file_path, checksum=checksum
+    )
+    requests_count = len(requests_log)
+    assert not utils.download_file(
+        tempfile_session, url, file_path, checksum=checksum
+    ), 'Проверенный архив не должен загружаться повторно'
+    assert len(requests_log) == requests_count, (
+        'Для проверенного архива не нужно обращаться к серверу'
+    )
+
+
+def test_download_file_http_error(tmp_path, local_site):
+    url = local_site({'/docs.zip': 416})
+    part_path = tmp_path / 'docs.zip.part'
+    part_path.write_bytes(ARCHIVE)
+    (tmp_path / 'docs.zip.part.json').write_text(json.dumps({
+        'etag': '"complete"', 'length': len(ARCHIVE),
+    }))
+    with pytest.raises(ConnectionError):
+        utils.download_file(
+            requests.Session(), url + 'docs.zip', tmp_path / 'docs.zip'
+        )
+    assert not part_path.exists(), (
+        'Временный файл, отвергнутый ответом 416, должен удаляться'
+    )
+
+
+def test_list_archive(tmp_path):
+    file_path = tmp_path / 'docs.zip'
+    with zipfile.ZipFile(file_path, 'w', zipfile.ZIP_DEFLATED) as archive:
+        archive.writestr('docs/index.html', '<html></html>')
+        archive.writestr('docs/text.txt', 'x' * 1000)
+    got = utils.list_archive(file_path)
+    assert [(name, size) for name, size, _, _ in got] == [
+        ('docs/index.html', 13), ('docs/text.txt', 1000)
+    ]
+    assert got[1][3] == zlib.crc32(b'x' * 1000)
+
+
+def test_async_engine_keeps_revalidation(local_site):
+    requests_log = []
+    url = local_site({'/': 'page'}, requests_log=requests_log)
+    session = CachedSession(backend='memory', always_revalidate=True)
+    got = list(utils.fetch_pages(
+        session, [url], utils.get_text, engine='async'
+    ))
+    assert got == [('page', None)] and len(requests_log) == 1, (
+        'После загрузки движком async страница должна читаться из кеша'
+    )
+    assert session.settings.always_revalidate, (
+        'Движок async не должен менять always_revalidate сессии'
+    )
+
+
+def test_progress_without_terminal(monkeypatch):
+    monkeypatch.setattr('sys.stderr', io.StringIO())
+    rows = iter([1, 2])
+    assert utils.progress(rows, total=2) is rows, (
+        'Без терминала полоса прогресса не должна создаваться'
+    )